@@ -0,0 +1,192 @@
+# Copyright 2025 Booz Allen Hamilton.
+#
+# Booz Allen Hamilton Confidential Information.
+#
+# The contents of this file are the intellectual property of
+# Booz Allen Hamilton, Inc. ("BAH") and are subject to copyright protection
+# under the laws of the United States and other countries.
+#
+# You acknowledge that misappropriation, misuse, or redistribution of content
+# on the file could cause irreparable harm to BAH and/or to third parties.
+#
+# You may not copy, reproduce, distribute, publish, display, execute, modify,
+# create derivative works of, transmit, sell or offer for resale, or in any way
+# exploit any part of this code or program without BAH's express written permission.
+#
+# The contents of this code or program contains code
+# that is itself or was created using artificial intelligence.
+#
+# To the best of our knowledge, this code does not infringe third-party intellectual
+# property rights, contain errors, inaccuracies, bias, or security concerns.
+#
+# However, Booz Allen does not warrant, claim, or provide any implied
+# or express warranty for the aforementioned, nor of merchantability
+# or fitness for purpose.
+#
+# Booz Allen expressly limits liability, whether by contract, tort or in equity
+# for any damage or harm caused by use of this artificial intelligence code or program.
+#
+# Booz Allen is providing this code or program "as is" with the understanding
+# that any separately negotiated standards of performance for said code
+# or program will be met for the duration of any applicable contract under which
+# the code or program is provided.
+
+"""Micro-batching of concurrent calls to a model kept warm on one thread."""
+
+import logging
+import queue
+import threading
+import time
+from collections.abc import Callable
+from concurrent.futures import Future
+
+from .instrumentation import instrumentation
+
+logger = logging.getLogger(__name__)
+
+instrumentation.describe(
+    "aissemble_batches_total", "counter", "Batches run by a micro-batcher"
+)
+instrumentation.describe(
+    "aissemble_batched_items_total",
+    "counter",
+    "Items run by a micro-batcher, divided by batches it is the mean batch size",
+)
+
+
+class MicroBatcher:
+    """Coalesces concurrent requests into batches for one worker thread.
+
+    The first waiting item opens a batch, which closes when `max_batch_size` items
+    are in it or `max_wait_seconds` passed, whichever is first. A single thread runs
+    the batches, so the model behind `run_batch` is only ever used from that thread
+    and stays loaded between requests. Under light load an item waits at most
+    `max_wait_seconds`; under heavy load batches fill up and the per-item cost drops.
+
+    Works for sync callers (`submit(...).result()`) and async ones
+    (`await asyncio.wrap_future(submit(...))`).
+    """
+
+    def __init__(
+        self,
+        run_batch: Callable[[list], list],
+        max_batch_size: int = 8,
+        max_wait_seconds: float = 0.05,
+        name: str = "batcher",
+    ) -> None:
+        """Initialize the batcher, the worker thread starts on the first submit.
+
+        Args:
+            run_batch: runs a list of items and returns one result per item, in order.
+            max_batch_size: most items run in one call.
+            max_wait_seconds: longest an item waits for others to join its batch.
+            name: label of the batcher in the metrics and thread name.
+        """
+        self.run_batch = run_batch
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait_seconds = max_wait_seconds
+        self.name = name
+        self._queue: queue.Queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._thread: threading.Thread | None = None
+        self._closed = False
+        self._batches = 0
+        self._items = 0
+
+    def submit(self, item: object) -> Future:
+        """Queue an item, the future resolves to (result, batch_metrics)."""
+        future: Future = Future()
+        with self._lock:
+            if self._closed:
+                msg = f"{self.name} is closed"
+                raise RuntimeError(msg)
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, name=self.name, daemon=True
+                )
+                self._thread.start()
+            # under the lock, so nothing is queued behind the stop marker of `close`
+            self._queue.put((item, future, time.time()))
+        return future
+
+    def stats(self) -> dict:
+        """Batches run so far and their mean size."""
+        with self._lock:
+            mean = round(self._items / self._batches, 2) if self._batches else None
+            return {
+                "batches_total": self._batches,
+                "items_total": self._items,
+                "mean_batch_size": mean,
+                "queued": self._queue.qsize(),
+            }
+
+    def close(self) -> None:
+        """Finish the queued items and stop the worker thread."""
+        with self._lock:
+            self._closed = True
+            thread = self._thread
+            if thread:
+                self._queue.put(None)
+        if thread:
+            thread.join()
+
+    def _collect(self, first: tuple) -> tuple[list[tuple], bool]:
+        """Gather up to `max_batch_size` items.
+
+        Waits at most `max_wait_seconds` after the first one was queued.
+        """
+        batch = [first]
+        deadline = first[2] + self.max_wait_seconds
+        while len(batch) < self.max_batch_size:
+            try:
+                entry = self._queue.get(timeout=max(0.0, deadline - time.time()))
+            except queue.Empty:
+                break
+            if entry is None:
+                return batch, True
+            batch.append(entry)
+        return batch, False
+
+    def _run(self) -> None:
+        stop = False
+        while not stop:
+            first = self._queue.get()
+            if first is None:
+                break
+            batch, stop = self._collect(first)
+            batch = [
+                entry for entry in batch if entry[1].set_running_or_notify_cancel()
+            ]
+            if not batch:
+                continue
+
+            started = time.time()
+            try:
+                results = self.run_batch([item for item, _, _ in batch])
+                if len(results) != len(batch):
+                    msg = (
+                        f"{self.name} returned {len(results)} results for "
+                        f"{len(batch)} items"
+                    )
+                    raise RuntimeError(msg)
+            except Exception as e:
+                logger.exception(f"{self.name} batch of {len(batch)} failed")
+                for _, future, _ in batch:
+                    future.set_exception(e)
+                continue
+            run_seconds = time.time() - started
+
+            with self._lock:
+                self._batches += 1
+                self._items += len(batch)
+            instrumentation.inc("aissemble_batches_total", batcher=self.name)
+            instrumentation.inc(
+                "aissemble_batched_items_total", len(batch), batcher=self.name
+            )
+            for (_, future, queued_at), result in zip(batch, results, strict=True):
+                batch_metrics = {
+                    "batch_size": len(batch),
+                    "batch_wait_seconds": round(started - queued_at, 3),
+                    "batch_run_seconds": round(run_seconds, 3),
+                }
+                future.set_result((result, batch_metrics))
@@ -0,0 +1,213 @@
+# Copyright 2025 Booz Allen Hamilton.
+#
+# Booz Allen Hamilton Confidential Information.
+#
+# The contents of this file are the intellectual property of
+# Booz Allen Hamilton, Inc. ("BAH") and are subject to copyright protection
+# under the laws of the United States and other countries.
+#
+# You acknowledge that misappropriation, misuse, or redistribution of content
+# on the file could cause irreparable harm to BAH and/or to third parties.
+#
+# You may not copy, reproduce, distribute, publish, display, execute, modify,
+# create derivative works of, transmit, sell or offer for resale, or in any way
+# exploit any part of this code or program without BAH's express written permission.
+#
+# The contents of this code or program contains code
+# that is itself or was created using artificial intelligence.
+#
+# To the best of our knowledge, this code does not infringe third-party intellectual
+# property rights, contain errors, inaccuracies, bias, or security concerns.
+#
+# However, Booz Allen does not warrant, claim, or provide any implied
+# or express warranty for the aforementioned, nor of merchantability
+# or fitness for purpose.
+#
+# Booz Allen expressly limits liability, whether by contract, tort or in equity
+# for any damage or harm caused by use of this artificial intelligence code or program.
+#
+# Booz Allen is providing this code or program "as is" with the understanding
+# that any separately negotiated standards of performance for said code
+# or program will be met for the duration of any applicable contract under which
+# the code or program is provided.
+
+"""In-process instrumentation exposed in the Prometheus text format.
+
+Stage latencies are histograms with a `stage` label, request and job outcomes are
+counters, and gauges are read from callbacks (e.g. worker pool stats) at scrape time.
+Everything lives in this process: with a process worker pool the conversions still
+report their stage timings through the metrics they return to the router.
+"""
+
+import threading
+import time
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
+
+from .preprocessing.metrics_sink import Histogram
+
+# stage name per field of the processing metrics a router gets back from the pipeline
+STAGE_FIELDS = {
+    "probe": "probe_time_seconds",
+    "convert": "ffmpeg_conversion_time_seconds",
+    "encode": "encode_time_seconds",
+    "upload": "s3_upload_time_seconds",
+    "queue_wait": "queue_wait_time_seconds",
+    "end_to_end": "total_processing_time_seconds",
+}
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _labels(labels: dict) -> tuple:
+    return tuple(sorted(labels.items()))
+
+
+def _format_labels(labels: tuple, extra: tuple = ()) -> str:
+    pairs = (*labels, *extra)
+    if not pairs:
+        return ""
+    escaped = (
+        (key, str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n"))
+        for key, value in pairs
+    )
+    return "{" + ",".join(f'{key}="{value}"' for key, value in escaped) + "}"
+
+
+class Instrumentation:
+    """Registry of histograms, counters and callback gauges."""
+
+    def __init__(self) -> None:
+        """Initialize an empty registry."""
+        self._lock = threading.Lock()
+        self._help: dict[str, tuple[str, str]] = {}
+        self._histograms: dict[str, dict[tuple, Histogram]] = {}
+        self._counters: dict[str, dict[tuple, float]] = {}
+        self._gauges: dict[str, Callable[[], dict[tuple, float]]] = {}
+        self._gauge_values: dict[str, dict[tuple, float]] = {}
+
+    def describe(self, name: str, kind: str, help_text: str) -> None:
+        """Register the type and help text of a metric."""
+        self._help[name] = (kind, help_text)
+
+    def observe(self, name: str, seconds: float, **labels: str) -> None:
+        """Add one observation to a histogram."""
+        with self._lock:
+            series = self._histograms.setdefault(name, {})
+            key = _labels(labels)
+            if key not in series:
+                series[key] = Histogram()
+            series[key].observe(seconds)
+
+    def inc(self, name: str, amount: float = 1, **labels: str) -> None:
+        """Increase a counter."""
+        with self._lock:
+            series = self._counters.setdefault(name, {})
+            key = _labels(labels)
+            series[key] = series.get(key, 0) + amount
+
+    def add(self, name: str, amount: float, **labels: str) -> None:
+        """Move an up/down gauge (e.g. +1 when work starts, -1 when it ends)."""
+        with self._lock:
+            series = self._gauge_values.setdefault(name, {})
+            key = _labels(labels)
+            series[key] = series.get(key, 0) + amount
+
+    def gauge(self, name: str, read: Callable[[], dict[tuple, float] | float]) -> None:
+        """Register a gauge read at scrape time.
+
+        `read` returns a value or {label tuple: value}.
+        """
+        self._gauges[name] = read
+
+    @contextmanager
+    def timer(self, name: str, **labels: str) -> Iterator[None]:
+        """Observe the time spent in the block, also when it raises."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start, **labels)
+
+    def render(self) -> str:
+        """All metrics in the Prometheus text exposition format."""
+        lines = []
+
+        def header(name: str, default_kind: str) -> None:
+            kind, help_text = self._help.get(name, (default_kind, name))
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+
+        with self._lock:
+            for name, series in sorted(self._histograms.items()):
+                header(name, "histogram")
+                for key, histogram in sorted(series.items()):
+                    cumulative = 0
+                    for bound, count in zip(
+                        (*histogram.bounds, "+Inf"), histogram.counts, strict=True
+                    ):
+                        cumulative += count
+                        labels = _format_labels(key, (("le", bound),))
+                        lines.append(f"{name}_bucket{labels} {cumulative}")
+                    lines.append(f"{name}_sum{_format_labels(key)} {histogram.sum}")
+                    lines.append(f"{name}_count{_format_labels(key)} {histogram.count}")
+            for name, series in sorted(self._counters.items()):
+                header(name, "counter")
+                for key, value in sorted(series.items()):
+                    lines.append(f"{name}{_format_labels(key)} {value}")
+            for name, series in sorted(self._gauge_values.items()):
+                header(name, "gauge")
+                for key, value in sorted(series.items()):
+                    lines.append(f"{name}{_format_labels(key)} {value}")
+
+        for name, read in sorted(self._gauges.items()):
+            values = read()
+            header(name, "gauge")
+            if not isinstance(values, dict):
+                values = {(): values}
+            for key, value in sorted(values.items()):
+                lines.append(f"{name}{_format_labels(key)} {value}")
+        return "\n".join(lines) + "\n"
+
+    def observe_processing(self, metrics: dict, endpoint: str) -> None:
+        """Record the stage timings of one processed file from its pipeline metrics."""
+        for stage, field in STAGE_FIELDS.items():
+            value = metrics.get(field)
+            if isinstance(value, int | float) and not (
+                metrics.get("cache_hit") and stage in ("convert", "upload")
+            ):
+                self.observe("aissemble_stage_duration_seconds", value, stage=stage)
+        self.inc(
+            "aissemble_processed_files_total",
+            endpoint=endpoint,
+            conversion_path=metrics.get("conversion_path") or "unknown",
+        )
+
+
+instrumentation = Instrumentation()
+instrumentation.describe(
+    "aissemble_stage_duration_seconds",
+    "histogram",
+    "Duration of pipeline stages (probe, convert, encode, upload, queue_wait, "
+    "end_to_end, transcribe_submit, transcribe_wait)",
+)
+instrumentation.describe(
+    "aissemble_processed_files_total",
+    "counter",
+    "Files processed by endpoint and conversion path",
+)
+instrumentation.describe(
+    "aissemble_failed_requests_total",
+    "counter",
+    "Processing requests that failed, by endpoint and status code",
+)
+instrumentation.describe(
+    "aissemble_transcription_jobs_total",
+    "counter",
+    "Finished transcription jobs by outcome",
+)
+instrumentation.describe(
+    "aissemble_transcription_jobs_in_flight",
+    "gauge",
+    "Transcription jobs submitted or polled right now",
+)
@@ -0,0 +1,171 @@
+# Copyright 2025 Booz Allen Hamilton.
+#
+# Booz Allen Hamilton Confidential Information.
+#
+# The contents of this file are the intellectual property of
+# Booz Allen Hamilton, Inc. ("BAH") and are subject to copyright protection
+# under the laws of the United States and other countries.
+#
+# You acknowledge that misappropriation, misuse, or redistribution of content
+# on the file could cause irreparable harm to BAH and/or to third parties.
+#
+# You may not copy, reproduce, distribute, publish, display, execute, modify,
+# create derivative works of, transmit, sell or offer for resale, or in any way
+# exploit any part of this code or program without BAH's express written permission.
+#
+# The contents of this code or program contains code
+# that is itself or was created using artificial intelligence.
+#
+# To the best of our knowledge, this code does not infringe third-party intellectual
+# property rights, contain errors, inaccuracies, bias, or security concerns.
+#
+# However, Booz Allen does not warrant, claim, or provide any implied
+# or express warranty for the aforementioned, nor of merchantability
+# or fitness for purpose.
+#
+# Booz Allen expressly limits liability, whether by contract, tort or in equity
+# for any damage or harm caused by use of this artificial intelligence code or program.
+#
+# Booz Allen is providing this code or program "as is" with the understanding
+# that any separately negotiated standards of performance for said code
+# or program will be met for the duration of any applicable contract under which
+# the code or program is provided.
+
+"""In-process registry of background jobs submitted through the job API."""
+
+import asyncio
+import logging
+import os
+import time
+import uuid
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass, field
+from enum import StrEnum
+
+logger = logging.getLogger(__name__)
+
+
+class JobStatus(StrEnum):
+    """Lifecycle of a job."""
+
+    QUEUED = "queued"
+    RUNNING = "running"
+    SUCCEEDED = "succeeded"
+    FAILED = "failed"
+
+
+@dataclass
+class Job:
+    """State of a single background job."""
+
+    id: str
+    kind: str
+    status: JobStatus = JobStatus.QUEUED
+    created_at: float = field(default_factory=time.time)
+    updated_at: float = field(default_factory=time.time)
+    progress: dict = field(default_factory=dict)
+    result: dict | None = None
+    error: str | None = None
+    # bumped on every update so event streams can tell what they already sent
+    version: int = 0
+    _changed: asyncio.Event = field(default_factory=asyncio.Event, repr=False)
+
+    @property
+    def finished(self) -> bool:
+        """True once the job succeeded or failed."""
+        return self.status in (JobStatus.SUCCEEDED, JobStatus.FAILED)
+
+    def to_dict(self) -> dict:
+        """Public view of the job."""
+        return {
+            "id": self.id,
+            "kind": self.kind,
+            "status": self.status,
+            "created_at": self.created_at,
+            "updated_at": self.updated_at,
+            "progress": self.progress,
+            "result": self.result,
+            "error": self.error,
+        }
+
+
+class JobRegistry:
+    """Keeps track of jobs and runs their work as asyncio tasks.
+
+    Jobs are only touched from the event loop, the blocking parts of the work are
+    expected to be dispatched to a worker pool by the job itself. Finished jobs are
+    dropped after `JOB_TTL_SECONDS` (default 3600).
+    """
+
+    def __init__(self, ttl_seconds: float | None = None) -> None:
+        """Initialize an empty registry."""
+        self.ttl_seconds = ttl_seconds or float(
+            os.environ.get("JOB_TTL_SECONDS", "3600")
+        )
+        self._jobs: dict[str, Job] = {}
+        # strong references so running tasks aren't garbage collected
+        self._tasks: set[asyncio.Task] = set()
+
+    def _evict_expired(self) -> None:
+        """Drop finished jobs older than the ttl."""
+        cutoff = time.time() - self.ttl_seconds
+        expired = [
+            job_id
+            for job_id, job in self._jobs.items()
+            if job.finished and job.updated_at < cutoff
+        ]
+        for job_id in expired:
+            del self._jobs[job_id]
+
+    def create(self, kind: str, **progress) -> Job:
+        """Register a new queued job."""
+        self._evict_expired()
+        job = Job(id=uuid.uuid4().hex, kind=kind, progress=progress)
+        self._jobs[job.id] = job
+        return job
+
+    def get(self, job_id: str) -> Job | None:
+        """Look up a job by id."""
+        return self._jobs.get(job_id)
+
+    def update(self, job: Job, **changes) -> None:
+        """Apply changes to a job and wake up anyone waiting on it."""
+        for name, value in changes.items():
+            setattr(job, name, value)
+        job.updated_at = time.time()
+        job.version += 1
+        changed, job._changed = job._changed, asyncio.Event()
+        changed.set()
+
+    async def wait_for_update(self, job: Job, version: int, timeout: float) -> bool:
+        """Wait until the job changes past `version`.
+
+        Returns:
+            False if nothing changed within `timeout` seconds.
+        """
+        if job.version != version:
+            return True
+        try:
+            await asyncio.wait_for(job._changed.wait(), timeout)
+        except TimeoutError:
+            return False
+        return True
+
+    def run_in_background(
+        self, job: Job, work: Callable[[Job], Awaitable[dict]]
+    ) -> None:
+        """Run `work(job)` as a task and record its result or error on the job."""
+
+        async def runner() -> None:
+            self.update(job, status=JobStatus.RUNNING)
+            try:
+                result = await work(job)
+            except Exception as e:
+                logger.exception(f"Job {job.id} ({job.kind}) failed")
+                self.update(job, status=JobStatus.FAILED, error=str(e))
+            else:
+                self.update(job, status=JobStatus.SUCCEEDED, result=result)
+
+        task = asyncio.create_task(runner())
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
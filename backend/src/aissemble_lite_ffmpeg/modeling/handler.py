@@ -31,8 +31,15 @@
 # or program will be met for the duration of any applicable contract under which
 # the code or program is provided.
 
-"""aissemble_lite_ffmpeg custom handler."""
+"""aissemble_lite_ffmpeg handler: speech to text over the Open Inference Protocol."""
 
+import json
+import logging
+import os
+import threading
+import time
+
+import numpy as np
 from aissemble_open_inference_protocol_shared.handlers.dataplane import (
     DataplaneHandler,
 )
@@ -43,23 +50,163 @@ from aissemble_open_inference_protocol_shared.types.dataplane import (
     MetadataTensor,
     ModelMetadataResponse,
     ModelReadyResponse,
+    RequestInput,
     ResponseOutput,
     TensorData,
 )
 
+from ..batching import MicroBatcher
+from ..instrumentation import instrumentation
+from ..preprocessing.ffmpeg_handler import SAMPLE_RATE
+from ..preprocessing.local_transcribe import decode_pcm, load_engine, pcm_to_audio
+
+logger = logging.getLogger(__name__)
+
+# datatypes accepted as audio samples, and the factor that scales them to [-1, 1)
+SAMPLE_SCALES = {
+    Datatype.FP32: 1.0,
+    Datatype.FP64: 1.0,
+    Datatype.INT16: 1 / 32768,
+    Datatype.INT32: 1 / 32768,
+}
+
 
 class InferenceHandler(DataplaneHandler):
-    """Example of custom handler.
+    """Transcribes audio with a speech model kept warm in the process.
+
+    The model (`MODEL_ENGINE`, default faster-whisper) is loaded from `MODEL_PATH` on a
+    background thread at startup and warmed up with one inference; `model_ready`
+    reports ready only after that. Each input is either
+
+    - a PCM audio tensor: 16kHz mono samples, FP32/FP64 in [-1, 1] or INT16 PCM values,
+      shape `[samples]` for one clip or `[clips, samples]` for several, or
+    - BYTES of S3 URIs, shape `[clips]`, decoded with ffmpeg (any accepted format).
+
+    Every clip goes through a `MicroBatcher`, so clips of concurrent requests share
+    model calls: a batch closes at `INFERENCE_MAX_BATCH_SIZE` clips (default 8) or
+    `INFERENCE_MAX_WAIT_MS` (default 20) after its first clip. The response has a
+    `transcript` output (BYTES, one text per clip) and a `segments` output (BYTES,
+    json list of `{start, end, text}` per clip).
 
-    This is an example of a simple custom handler that can be
-     used with the aiSSEMBLE Open Inference Protocol FastAPI implementation.
     For more information, reference the aiSSEMBLE Open Inference Protocol FastAPI README
      (https://github.com/boozallen/aissemble-open-inference-protocol/blob/dev/aissemble-open-inference-protocol-fastapi/README.md).
     """
 
     def __init__(self):
-        """Init function."""
+        """Init function, the model is loaded by `load`."""
         super().__init__()
+        self.model_path = os.environ.get("MODEL_PATH")
+        self.engine_spec = os.environ.get("MODEL_ENGINE", "faster-whisper")
+        self.max_batch_size = int(os.environ.get("INFERENCE_MAX_BATCH_SIZE", "8"))
+        self.max_wait_seconds = (
+            float(os.environ.get("INFERENCE_MAX_WAIT_MS", "20")) / 1000
+        )
+        # longest wait for a clip's result, and longest audio decoded from an S3 URI
+        self.timeout_seconds = float(os.environ.get("INFERENCE_TIMEOUT_SECONDS", "300"))
+        self.max_seconds = float(os.environ.get("INFERENCE_MAX_AUDIO_SECONDS", "1800"))
+        self.engine = None
+        self.batcher: MicroBatcher | None = None
+        self.load_error: str | None = None
+        self._ready = threading.Event()
+        self._load_lock = threading.Lock()
+        self._loader: threading.Thread | None = None
+
+    def load(self) -> None:
+        """Start loading the model in the background, once; no-op without MODEL_PATH."""
+        with self._load_lock:
+            if self._loader is not None or not self.model_path:
+                return
+            self._loader = threading.Thread(
+                target=self._load, name="model-load", daemon=True
+            )
+            self._loader.start()
+
+    def _load(self) -> None:
+        start = time.time()
+        try:
+            engine = load_engine(self.engine_spec, self.model_path)
+            # warm up, the first call of a model is slow (allocations, lazy init)
+            engine.transcribe_batch([np.zeros(SAMPLE_RATE, dtype=np.float32)])
+        except Exception as e:
+            logger.exception(
+                f"Loading {self.engine_spec} model {self.model_path} failed"
+            )
+            self.load_error = str(e)
+            return
+        self.engine = engine
+        self.batcher = MicroBatcher(
+            engine.transcribe_batch,
+            max_batch_size=self.max_batch_size,
+            max_wait_seconds=self.max_wait_seconds,
+            name="inference",
+        )
+        self._ready.set()
+        logger.info(f"model {self.model_path} ready in {time.time() - start:.1f}s")
+
+    def model_load(self, model_name: str) -> bool:  # noqa: ARG002
+        """Start loading the model, see `load`."""
+        self.load()
+        return self.model_path is not None
+
+    def close(self) -> None:
+        """Stop the batcher after the queued clips."""
+        if self.batcher:
+            self.batcher.close()
+
+    def _decode(self, name: str, source: str) -> np.ndarray:
+        """Float32 16kHz samples of an S3 object."""
+        # only S3, a path would let callers read files of the server
+        if not source.startswith("s3://"):
+            msg = f"input ('{name}'): BYTES data must be S3 URIs, got {source!r}"
+            raise ValueError(msg)
+        try:
+            return pcm_to_audio(decode_pcm(source, self.max_seconds))
+        except (FileNotFoundError, RuntimeError) as e:
+            # ValueError, so the OIP app answers 422 instead of 500
+            msg = f"input ('{name}'): {e}"
+            raise ValueError(msg) from e
+
+    def _clips(self, tensor: RequestInput) -> list[np.ndarray]:
+        """Float32 16kHz clips of one input tensor."""
+        sample_rate = (
+            getattr(tensor.parameters, "sample_rate", None)
+            if tensor.parameters
+            else None
+        )
+        if sample_rate not in (None, SAMPLE_RATE):
+            msg = (
+                f"input ('{tensor.name}'): audio must be sampled at "
+                f"{SAMPLE_RATE} Hz, got {sample_rate}"
+            )
+            raise ValueError(msg)
+
+        if tensor.datatype == Datatype.BYTES:
+            return [
+                self._decode(
+                    tensor.name, s.decode() if isinstance(s, bytes) else str(s)
+                )
+                for s in np.ravel(tensor.data.root)
+            ]
+        if tensor.datatype not in SAMPLE_SCALES:
+            msg = (
+                f"input ('{tensor.name}'): unsupported datatype "
+                f"{tensor.datatype.value}, use FP32, INT16 or BYTES"
+            )
+            raise TypeError(msg)
+
+        samples = (
+            np.asarray(tensor.data.root, dtype=np.float32)
+            * SAMPLE_SCALES[tensor.datatype]
+        )
+        if len(tensor.shape) == 1:
+            return [samples.reshape(-1)]
+        if len(tensor.shape) == 2:
+            return list(samples.reshape(tensor.shape))
+        msg = (
+            f"input ('{tensor.name}'): shape must be [samples] or "
+            f"[clips, samples], got {tensor.shape}"
+        )
+        raise ValueError(msg)
 
     def infer(
             self,
@@ -67,18 +214,51 @@ class InferenceHandler(DataplaneHandler):
             model_name: str,
             model_version: str | None = None,
     ) -> InferenceResponse:
-        """Example infer function."""
+        """Transcribe every clip of the inputs, batched with concurrent requests.
+
+        Blocks until the clips are transcribed, the OIP routes run it on the threadpool
+        (see `webapp.run_infer_routes_on_threads`).
+        """
+        self.load()
+        # waits out a load in progress, not one that failed or never started
+        loading = self.model_path and not self.load_error
+        if not self._ready.wait(timeout=self.timeout_seconds if loading else 0):
+            reason = self.load_error or (
+                "still loading" if self.model_path else "MODEL_PATH is not set"
+            )
+            msg = f"Model {model_name} is not ready: {reason}"
+            raise RuntimeError(msg)
+
+        clips = [clip for tensor in payload.inputs for clip in self._clips(tensor)]
+        with instrumentation.timer(
+            "aissemble_stage_duration_seconds", stage="inference"
+        ):
+            # submitted one by one to share batches with clips of other requests
+            futures = [self.batcher.submit(clip) for clip in clips]
+            segments = [
+                future.result(timeout=self.timeout_seconds)[0] for future in futures
+            ]
+
+        transcripts = [
+            " ".join(s["text"] for s in clip if s["text"]) for clip in segments
+        ]
         return InferenceResponse(
             model_name=model_name,
             model_version=model_version,
             id=payload.id,
             outputs=[
                 ResponseOutput(
-                    name=model_name,
-                    shape=[1, 2],
+                    name="transcript",
+                    shape=[len(clips)],
                     datatype=Datatype.BYTES,
-                    data=TensorData(root=["Hello", "World"]),
-                )
+                    data=TensorData(root=transcripts),
+                ),
+                ResponseOutput(
+                    name="segments",
+                    shape=[len(clips)],
+                    datatype=Datatype.BYTES,
+                    data=TensorData(root=[json.dumps(clip) for clip in segments]),
+                ),
             ],
         )
 
@@ -87,17 +267,18 @@ class InferenceHandler(DataplaneHandler):
             model_name: str,
             model_version: str | None = None,
     ) -> ModelMetadataResponse:
-        """Example model metadata function."""
+        """Model metadata: audio in, transcripts out."""
         input_tensors = [
-            MetadataTensor(name="input", datatype=Datatype.BYTES, shape=[1, 2])
+            MetadataTensor(name="audio", datatype=Datatype.FP32, shape=[-1, -1]),
         ]
         output_tensors = [
-            MetadataTensor(name="output", datatype=Datatype.BYTES, shape=[1, 2])
+            MetadataTensor(name="transcript", datatype=Datatype.BYTES, shape=[-1]),
+            MetadataTensor(name="segments", datatype=Datatype.BYTES, shape=[-1]),
         ]
         return ModelMetadataResponse(
             name=model_name,
             versions=[model_version] if model_version else None,
-            platform="placeholder_platform",
+            platform=getattr(self.engine, "name", self.engine_spec),
             inputs=input_tensors,
             outputs=output_tensors,
         )
@@ -107,5 +288,5 @@ class InferenceHandler(DataplaneHandler):
             model_name: str,
             model_version: str | None = None,  # noqa: ARG002
     ) -> ModelReadyResponse:
-        """Example model ready function."""
-        return ModelReadyResponse(name=model_name, ready=True)
+        """Ready once the model is loaded and warmed up."""
+        return ModelReadyResponse(name=model_name, ready=self._ready.is_set())
@@ -0,0 +1,67 @@
+# Copyright 2025 Booz Allen Hamilton.
+#
+# Booz Allen Hamilton Confidential Information.
+#
+# The contents of this file are the intellectual property of
+# Booz Allen Hamilton, Inc. ("BAH") and are subject to copyright protection
+# under the laws of the United States and other countries.
+#
+# You acknowledge that misappropriation, misuse, or redistribution of content
+# on the file could cause irreparable harm to BAH and/or to third parties.
+#
+# You may not copy, reproduce, distribute, publish, display, execute, modify,
+# create derivative works of, transmit, sell or offer for resale, or in any way
+# exploit any part of this code or program without BAH's express written permission.
+#
+# The contents of this code or program contains code
+# that is itself or was created using artificial intelligence.
+#
+# To the best of our knowledge, this code does not infringe third-party intellectual
+# property rights, contain errors, inaccuracies, bias, or security concerns.
+#
+# However, Booz Allen does not warrant, claim, or provide any implied
+# or express warranty for the aforementioned, nor of merchantability
+# or fitness for purpose.
+#
+# Booz Allen expressly limits liability, whether by contract, tort or in equity
+# for any damage or harm caused by use of this artificial intelligence code or program.
+#
+# Booz Allen is providing this code or program "as is" with the understanding
+# that any separately negotiated standards of performance for said code
+# or program will be met for the duration of any applicable contract under which
+# the code or program is provided.
+
+"""boto3 client construction shared by the s3 and transcribe handlers."""
+
+import logging
+import os
+import time
+
+import boto3
+from botocore.client import BaseClient
+from botocore.config import Config
+
+logger = logging.getLogger(__name__)
+
+
+def client_config() -> Config:
+    """Connection pool settings for boto3 clients.
+
+    botocore keeps 10 connections per client by default, fewer than the multipart
+    upload threads and transcribe polls a shared client serves at once. keep-alive
+    stops idle pooled connections from being dropped between requests.
+    """
+    return Config(
+        max_pool_connections=int(os.getenv("AWS_MAX_POOL_CONNECTIONS", "50")),
+        tcp_keepalive=os.getenv("AWS_TCP_KEEPALIVE", "true").lower() == "true",
+    )
+
+
+def create_client(service_name: str, region: str, **kwargs) -> BaseClient:
+    """Create a boto3 client with `client_config`, logging how long it took."""
+    start = time.time()
+    client = boto3.client(
+        service_name, region_name=region, config=client_config(), **kwargs
+    )
+    logger.info(f"created {service_name} client in {time.time() - start:.3f}s")
+    return client
@@ -0,0 +1,372 @@
+# Copyright 2025 Booz Allen Hamilton.
+#
+# Booz Allen Hamilton Confidential Information.
+#
+# The contents of this file are the intellectual property of
+# Booz Allen Hamilton, Inc. ("BAH") and are subject to copyright protection
+# under the laws of the United States and other countries.
+#
+# You acknowledge that misappropriation, misuse, or redistribution of content
+# on the file could cause irreparable harm to BAH and/or to third parties.
+#
+# You may not copy, reproduce, distribute, publish, display, execute, modify,
+# create derivative works of, transmit, sell or offer for resale, or in any way
+# exploit any part of this code or program without BAH's express written permission.
+#
+# The contents of this code or program contains code
+# that is itself or was created using artificial intelligence.
+#
+# To the best of our knowledge, this code does not infringe third-party intellectual
+# property rights, contain errors, inaccuracies, bias, or security concerns.
+#
+# However, Booz Allen does not warrant, claim, or provide any implied
+# or express warranty for the aforementioned, nor of merchantability
+# or fitness for purpose.
+#
+# Booz Allen expressly limits liability, whether by contract, tort or in equity
+# for any damage or harm caused by use of this artificial intelligence code or program.
+#
+# Booz Allen is providing this code or program "as is" with the understanding
+# that any separately negotiated standards of performance for said code
+# or program will be met for the duration of any applicable contract under which
+# the code or program is provided.
+
+"""Chunked transcription of long audio, with partial results as chunks finish.
+
+The converted PCM is cut into chunks of about CHUNKED_CHUNK_SECONDS, each cut placed in
+the quietest 20ms frame shortly before the target length so words are not split. Chunks
+are transcribed concurrently (the warm local engine, or one Transcribe job each) while
+the rest of the file is still being decoded, and their segments are shifted by the
+chunk's offset into one transcript. The first text is ready after one chunk instead of
+after the whole file.
+"""
+
+import asyncio
+import logging
+import os
+import threading
+import time
+import uuid
+from collections.abc import AsyncIterator, Iterable, Iterator
+from pathlib import Path
+
+import numpy as np
+
+from ..instrumentation import instrumentation
+from .ffmpeg_handler import SAMPLE_RATE, SAMPLE_WIDTH, wav_header
+from .input_handler import shared_input_handler
+from .local_transcribe import (
+    PCM_BYTES_PER_SECOND,
+    LocalTranscriptionService,
+    pcm_stream,
+    transcript_document,
+)
+from .silence import (
+    FRAME_BYTES,
+    FRAME_SAMPLES,
+    ORIGINAL_TIMELINE,
+    load_offset_map,
+    remap_segments,
+    to_original_time,
+)
+from .transcribe import shared_transcription_service, transcription_output_uri
+
+logger = logging.getLogger(__name__)
+
+
+def chunk_pcm(
+    pcm_blocks: Iterable[bytes], chunk_seconds: float, search_seconds: float
+) -> Iterator[tuple[int, bytes]]:
+    """Cut a 16kHz mono s16le PCM stream into chunks at quiet points.
+
+    Each chunk ends in the quietest 20ms frame of its last `search_seconds`, at most
+    `chunk_seconds` after it started; the last chunk is whatever remains. Memory is
+    bounded by one chunk.
+
+    Yields:
+        Tuples of (offset of the chunk in samples, chunk PCM).
+    """
+    chunk_frames = max(1, round(chunk_seconds * SAMPLE_RATE / FRAME_SAMPLES))
+    search_frames = min(
+        max(1, round(search_seconds * SAMPLE_RATE / FRAME_SAMPLES)), chunk_frames - 1
+    )
+    chunk_bytes = chunk_frames * FRAME_BYTES
+    buffer = bytearray()
+    offset = 0
+    for block in pcm_blocks:
+        buffer += block
+        while len(buffer) >= chunk_bytes:
+            first = chunk_frames - search_frames
+            # a copy, a numpy view would keep the buffer from being resized
+            window = bytes(buffer[first * FRAME_BYTES : chunk_bytes])
+            frames = (
+                np.frombuffer(window, dtype="<i2")
+                .reshape(-1, FRAME_SAMPLES)
+                .astype(np.float32)
+            )
+            energy = np.mean(frames * frames, axis=1)
+            # the latest of equally quiet frames keeps chunks long in digital silence
+            quietest = len(energy) - 1 - int(np.argmin(energy[::-1]))
+            # cut in the middle of that frame
+            cut = (first + quietest) * FRAME_BYTES + FRAME_BYTES // 2
+            yield offset, bytes(buffer[:cut])
+            offset += cut // SAMPLE_WIDTH
+            del buffer[:cut]
+    if buffer:
+        yield offset, bytes(buffer)
+
+
+def transcript_segments(document: dict, duration_seconds: float) -> list[dict]:
+    """`{start, end, text}` segments of an AWS Transcribe output json.
+
+    Falls back to one segment spanning the audio when the output has no
+    `audio_segments`.
+    """
+    results = document.get("results", {})
+    if results.get("audio_segments"):
+        return [
+            {
+                "start": float(segment["start_time"]),
+                "end": float(segment["end_time"]),
+                "text": segment["transcript"],
+            }
+            for segment in results["audio_segments"]
+        ]
+    text = " ".join(
+        t["transcript"] for t in results.get("transcripts", []) if t["transcript"]
+    )
+    return [{"start": 0.0, "end": duration_seconds, "text": text}] if text else []
+
+
+class ChunkedTranscriber:
+    """Transcribes an S3 media file in chunks and reports each chunk as it finishes.
+
+    Uses the backend of TRANSCRIPTION_BACKEND: the local engine gets the chunks straight
+    from memory (and batches them), with AWS every chunk is uploaded as a wav and
+    transcribed by its own job.
+
+    Configured with environment variables:
+    - CHUNKED_CHUNK_SECONDS: longest chunk (default: 60)
+    - CHUNKED_SEARCH_SECONDS: how far before the longest length a cut may move to find
+      a quiet point (default: 5)
+    - CHUNKED_MAX_CONCURRENT: chunks decoded ahead and transcribed at once, this bounds
+      the PCM held in memory (default: 8)
+    """
+
+    def __init__(self) -> None:
+        """Initialize the transcriber from the environment."""
+        self.chunk_seconds = float(os.environ.get("CHUNKED_CHUNK_SECONDS", "60"))
+        self.search_seconds = float(os.environ.get("CHUNKED_SEARCH_SECONDS", "5"))
+        self.max_concurrent = int(os.environ.get("CHUNKED_MAX_CONCURRENT", "8"))
+
+    async def transcribe_chunk(
+        self, name: str, index: int, pcm: bytes, semaphore: asyncio.Semaphore, tag: str
+    ) -> tuple[list[dict], dict]:
+        """Transcribe one chunk with the configured backend.
+
+        Args:
+            name: file stem, the chunk's wav is uploaded as `<name>_chunk<index>.wav`
+                and deleted with its transcript once the segments are read.
+            index: position of the chunk in the file.
+            pcm: the chunk audio.
+            semaphore: Limits the Transcribe jobs running at once.
+            tag: Job name suffix shared by the chunks of a file.
+
+        Returns:
+            The chunk's segments, relative to its start, and the backend metrics.
+        """
+        service, _ = await asyncio.to_thread(shared_transcription_service)
+        if isinstance(service, LocalTranscriptionService):
+            return await service.segments_async(pcm)
+
+        s3_handler = shared_input_handler()[0].s3_handler
+        uri, _ = await asyncio.to_thread(
+            s3_handler.upload_stream, [pcm], f"{name}_chunk{index:04d}", wav_header
+        )
+        seconds = len(pcm) / PCM_BYTES_PER_SECOND
+        try:
+            result = await service.transcribe_s3_file_async(
+                uri, semaphore, duration_seconds=seconds, tag=f"{tag}-{index:04d}"
+            )
+            if not result.success:
+                raise RuntimeError(result.error)
+            document = await asyncio.to_thread(
+                s3_handler.get_json, result.s3_output_uri
+            )
+            return transcript_segments(document, seconds), result.metrics
+        finally:
+            # only the stitched transcript is kept
+            await asyncio.to_thread(
+                s3_handler.delete, [uri, transcription_output_uri(uri)]
+            )
+
+    async def stream(self, s3_uri: str) -> AsyncIterator[dict]:
+        """Transcribe an S3 media file chunk by chunk.
+
+        Yields a `chunk` event (segments on the file's timeline) or `error` event per
+        chunk in completion order, then a final `transcript` event with the stitched
+        transcript, which is also stored where a Transcribe job would put it. Times of
+        silence trimmed audio are mapped back to the original with its offset map.
+
+        Args:
+            s3_uri: S3 URI of the media file (e.g., s3://bucket/key.mp4).
+        """
+        start_time = time.time()
+        name = Path(s3_uri).stem
+        tag = uuid.uuid4().hex[:8]
+        loop = asyncio.get_running_loop()
+        chunks = asyncio.Queue()
+        events = asyncio.Queue()
+        # chunks decoded but not transcribed yet, acquired by the decoding thread
+        budget = threading.Semaphore(self.max_concurrent)
+        jobs = asyncio.Semaphore(self.max_concurrent)
+        stop = threading.Event()
+        state = {"decode_error": None, "chunks": 0}
+        tasks = []
+
+        def decode() -> None:
+            """Runs on a thread: cut the PCM into chunks and hand them to the loop."""
+            pieces = chunk_pcm(
+                pcm_stream(s3_uri), self.chunk_seconds, self.search_seconds
+            )
+            try:
+                for piece in pieces:
+                    while not budget.acquire(timeout=0.2):
+                        if stop.is_set():
+                            return
+                    loop.call_soon_threadsafe(chunks.put_nowait, piece)
+            except Exception as e:
+                loop.call_soon_threadsafe(chunks.put_nowait, e)
+            finally:
+                # stops ffmpeg if the client went away
+                pieces.close()
+                if not stop.is_set():
+                    loop.call_soon_threadsafe(chunks.put_nowait, None)
+
+        async def run_chunk(index: int, offset: int, pcm: bytes) -> None:
+            start = offset / SAMPLE_RATE
+            end = start + len(pcm) / PCM_BYTES_PER_SECOND
+            if offset_map:
+                breakpoints = offset_map["breakpoints"]
+                position = {
+                    "index": index,
+                    "start_seconds": round(to_original_time(start, breakpoints), 3),
+                    "end_seconds": round(to_original_time(end, breakpoints), 3),
+                }
+            else:
+                position = {
+                    "index": index,
+                    "start_seconds": round(start, 3),
+                    "end_seconds": round(end, 3),
+                }
+            try:
+                with instrumentation.timer(
+                    "aissemble_stage_duration_seconds", stage="transcribe_chunk"
+                ):
+                    segments, metrics = await self.transcribe_chunk(
+                        name, index, pcm, jobs, tag
+                    )
+            except Exception as e:
+                await events.put({"event": "error", **position, "error": str(e)})
+                return
+            finally:
+                budget.release()
+            segments = [
+                {
+                    **segment,
+                    "start": round(segment["start"] + start, 3),
+                    "end": round(segment["end"] + start, 3),
+                }
+                for segment in segments
+            ]
+            if offset_map:
+                segments = remap_segments(segments, offset_map)
+            event = {
+                "event": "chunk",
+                **position,
+                "text": " ".join(s["text"] for s in segments if s["text"]),
+                "segments": segments,
+                "metrics": metrics,
+                "elapsed_seconds": round(time.time() - start_time, 3),
+            }
+            await events.put(event)
+
+        async def dispatch() -> None:
+            while (item := await chunks.get()) is not None:
+                if isinstance(item, Exception):
+                    state["decode_error"] = item
+                    continue
+                tasks.append(asyncio.create_task(run_chunk(state["chunks"], *item)))
+                state["chunks"] += 1
+            await asyncio.gather(*tasks)
+
+        # audio uploaded with SILENCE_TRIM is reported on the timeline of the original
+        offset_map = await asyncio.to_thread(
+            load_offset_map, shared_input_handler()[0].s3_handler, s3_uri
+        )
+        decoder = asyncio.create_task(asyncio.to_thread(decode))
+        dispatcher = asyncio.create_task(dispatch())
+        dispatcher.add_done_callback(lambda _: events.put_nowait(None))
+
+        done = {}
+        first_text_seconds = None
+        try:
+            while (event := await events.get()) is not None:
+                done[event["index"]] = event
+                if event["event"] == "chunk" and first_text_seconds is None:
+                    first_text_seconds = event["elapsed_seconds"]
+                    instrumentation.observe(
+                        "aissemble_stage_duration_seconds",
+                        first_text_seconds,
+                        stage="chunked_first_text",
+                    )
+                yield event
+            await decoder
+
+            failed = sorted(
+                index for index, event in done.items() if event["event"] == "error"
+            )
+            error = state["decode_error"]
+            success = error is None and not failed
+            segments = [
+                segment
+                for index in sorted(done)
+                if done[index]["event"] == "chunk"
+                for segment in done[index]["segments"]
+            ]
+            transcript = transcript_document(name, segments)
+            if offset_map:
+                transcript[ORIGINAL_TIMELINE] = True
+            output_uri = None
+            if success:
+                output_uri = transcription_output_uri(s3_uri)
+                s3_handler = shared_input_handler()[0].s3_handler
+                try:
+                    await asyncio.to_thread(s3_handler.put_json, output_uri, transcript)
+                except RuntimeError as e:
+                    output_uri, success, error = None, False, e
+            instrumentation.inc(
+                "aissemble_transcription_jobs_total",
+                outcome="completed" if success else "failed",
+            )
+            yield {
+                "event": "transcript",
+                "s3_uri": s3_uri,
+                "success": success,
+                "error": str(error) if error else None,
+                "s3_output_uri": output_uri,
+                "chunks": state["chunks"],
+                "failed_chunks": failed,
+                "audio_seconds": max(
+                    (event["end_seconds"] for event in done.values()), default=0.0
+                ),
+                "time_to_first_text_seconds": first_text_seconds,
+                "total_time_seconds": round(time.time() - start_time, 3),
+                "transcript": transcript,
+            }
+        finally:
+            # client went away: stop decoding and drop the chunks in flight
+            stop.set()
+            dispatcher.cancel()
+            for task in tasks:
+                task.cancel()
@@ -0,0 +1,239 @@
+# Copyright 2025 Booz Allen Hamilton.
+#
+# Booz Allen Hamilton Confidential Information.
+#
+# The contents of this file are the intellectual property of
+# Booz Allen Hamilton, Inc. ("BAH") and are subject to copyright protection
+# under the laws of the United States and other countries.
+#
+# You acknowledge that misappropriation, misuse, or redistribution of content
+# on the file could cause irreparable harm to BAH and/or to third parties.
+#
+# You may not copy, reproduce, distribute, publish, display, execute, modify,
+# create derivative works of, transmit, sell or offer for resale, or in any way
+# exploit any part of this code or program without BAH's express written permission.
+#
+# The contents of this code or program contains code
+# that is itself or was created using artificial intelligence.
+#
+# To the best of our knowledge, this code does not infringe third-party intellectual
+# property rights, contain errors, inaccuracies, bias, or security concerns.
+#
+# However, Booz Allen does not warrant, claim, or provide any implied
+# or express warranty for the aforementioned, nor of merchantability
+# or fitness for purpose.
+#
+# Booz Allen expressly limits liability, whether by contract, tort or in equity
+# for any damage or harm caused by use of this artificial intelligence code or program.
+#
+# Booz Allen is providing this code or program "as is" with the understanding
+# that any separately negotiated standards of performance for said code
+# or program will be met for the duration of any applicable contract under which
+# the code or program is provided.
+
+"""Content-addressed cache of conversions already uploaded to s3."""
+
+import functools
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Iterable, Iterator
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+# metrics of the original conversion that are still true for a cache hit
+CACHED_METRICS = (
+    "input_file_size_bytes",
+    "input_file_size_mb",
+    "output_file_size_bytes",
+    "output_file_size_mb",
+    "size_reduction_percent",
+    "silence_removed_seconds",
+    "silence_bytes_saved",
+    "silence_cuts",
+    "silence_offset_map_uri",
+)
+
+HASH_CHUNK_SIZE = 1024 * 1024
+
+
+def hash_file(file_path: str) -> str:
+    """sha256 of a file, read in chunks."""
+    hasher = hashlib.sha256()
+    with Path(file_path).open("rb") as f:
+        while block := f.read(HASH_CHUNK_SIZE):
+            hasher.update(block)
+    return hasher.hexdigest()
+
+
+def hashing(chunks: Iterable[bytes], hasher: "hashlib._Hash") -> Iterator[bytes]:
+    """Pass chunks through while feeding them to `hasher`.
+
+    The digest is ready once the stream ends.
+    """
+    for chunk in chunks:
+        hasher.update(chunk)
+        yield chunk
+
+
+class ConversionCache:
+    """Maps input content hash + conversion parameters to the uploaded s3 object.
+
+    Entries are kept in LRU order and bounded by count and by the total size of the
+    referenced outputs. The index is persisted as json on local disk so it survives
+    restarts; evicting an entry only forgets it, the s3 object is left alone. The index
+    is read again when another process replaced the file, e.g. process pool workers see
+    what the app process stored (workers only read, see `store` and `evict` below).
+    """
+
+    def __init__(
+        self,
+        index_path: str | None = None,
+        max_entries: int | None = None,
+        max_bytes: int | None = None,
+    ):
+        """Open the cache, loading the index from disk if there is one."""
+        self.index_path = Path(
+            index_path
+            or os.getenv("CONVERSION_CACHE_INDEX", "output/cache/conversion_index.json")
+        )
+        self.max_entries = max_entries or int(
+            os.getenv("CONVERSION_CACHE_MAX_ENTRIES", "10000")
+        )
+        # 0 means no size bound
+        self.max_bytes = (
+            max_bytes
+            if max_bytes is not None
+            else int(float(os.getenv("CONVERSION_CACHE_MAX_GB", "0")) * 1024**3)
+        )
+        self._lock = threading.Lock()
+        self._entries: OrderedDict[str, dict] = OrderedDict()
+        self._total_bytes = 0
+        self._index_mtime = None
+        self._load()
+
+    @staticmethod
+    def _key(digest: str, params: str) -> str:
+        return f"{digest}:{params}"
+
+    def _load(self) -> None:
+        if not self.index_path.exists():
+            return
+        try:
+            self._index_mtime = self.index_path.stat().st_mtime_ns
+            with self.index_path.open() as f:
+                self._entries = OrderedDict(json.load(f))
+            self._total_bytes = sum(
+                e["metrics"].get("output_file_size_bytes", 0)
+                for e in self._entries.values()
+            )
+            logger.info(
+                f"loaded {len(self._entries)} conversion cache entries from "
+                f"{self.index_path}"
+            )
+        except Exception as e:
+            logger.warning(
+                f"ignoring unreadable conversion cache index {self.index_path}: {e}"
+            )
+            self._entries = OrderedDict()
+            self._total_bytes = 0
+
+    def _refresh(self) -> None:
+        """Load the index again if another process wrote it since."""
+        try:
+            index_mtime = self.index_path.stat().st_mtime_ns
+        except FileNotFoundError:
+            return
+        if index_mtime != self._index_mtime:
+            self._load()
+
+    def _save(self) -> None:
+        """Write the index atomically so a crash never leaves a half written file."""
+        self.index_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.index_path.with_suffix(f".{os.getpid()}.tmp")
+        with tmp_path.open("w") as f:
+            json.dump(self._entries, f, separators=(",", ":"))
+        tmp_path.replace(self.index_path)
+        self._index_mtime = self.index_path.stat().st_mtime_ns
+
+    def _pop(self, key: str) -> None:
+        entry = self._entries.pop(key)
+        self._total_bytes -= entry["metrics"].get("output_file_size_bytes", 0)
+
+    def lookup(self, digest: str, params: str) -> dict | None:
+        """Return the cached entry ({'s3_uri', 'metrics'}) and mark it recently used."""
+        key = self._key(digest, params)
+        with self._lock:
+            self._refresh()
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            self._entries.move_to_end(key)
+            entry["last_used"] = time.time()
+            return dict(entry)
+
+    def store(self, digest: str, params: str, s3_uri: str, metrics: dict) -> None:
+        """Remember the upload of a conversion, evicting LRU entries over the limits."""
+        entry = {
+            "s3_uri": s3_uri,
+            "metrics": {
+                **{name: metrics[name] for name in CACHED_METRICS if name in metrics},
+                # the format section is enough for callers (e.g. duration), the
+                # stream details are large
+                "input_metadata": {
+                    "format": metrics.get("input_metadata", {}).get("format", {})
+                },
+            },
+            "created_at": time.time(),
+            "last_used": time.time(),
+        }
+        key = self._key(digest, params)
+        with self._lock:
+            self._refresh()
+            if key in self._entries:
+                self._pop(key)
+            self._entries[key] = entry
+            self._total_bytes += entry["metrics"].get("output_file_size_bytes", 0)
+            while len(self._entries) > self.max_entries or (
+                self.max_bytes
+                and self._total_bytes > self.max_bytes
+                and len(self._entries) > 1
+            ):
+                self._pop(next(iter(self._entries)))
+            self._save()
+
+    def evict(self, digest: str, params: str) -> None:
+        """Forget an entry, e.g. when its s3 object no longer exists."""
+        key = self._key(digest, params)
+        with self._lock:
+            self._refresh()
+            if key in self._entries:
+                self._pop(key)
+                self._save()
+
+
+@functools.cache
+def default_cache() -> ConversionCache:
+    """Process wide cache instance."""
+    return ConversionCache()
+
+
+def store(digest: str, params: str, s3_uri: str, metrics: dict) -> None:
+    """`store` on the process wide cache.
+
+    Module level so process pool workers can hand the call to the parent.
+    """
+    default_cache().store(digest, params, s3_uri, metrics)
+
+
+def evict(digest: str, params: str) -> None:
+    """`evict` on the process wide cache.
+
+    Module level so process pool workers can hand the call to the parent.
+    """
+    default_cache().evict(digest, params)
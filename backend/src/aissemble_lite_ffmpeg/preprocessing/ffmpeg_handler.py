@@ -1,20 +1,266 @@
+import contextlib
+import math
 import os
+import re
+import shutil
+import struct
+import tempfile
+import threading
 import time
+import wave
 import ffmpeg
 import logging
 
+from collections import deque
+from collections.abc import Iterable, Iterator
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
 logger = logging.getLogger(__name__)
 
+# output format expected by aws transcribe: 16kHz, mono, 16-bit PCM
+SAMPLE_RATE = 16000
+CHANNELS = 1
+SAMPLE_WIDTH = 2
+WAV_HEADER_SIZE = 44
+
+# size of the reads from ffmpeg stdout when streaming
+STREAM_CHUNK_SIZE = int(os.getenv('FFMPEG_STREAM_CHUNK_BYTES', str(64 * 1024)))
+# bound on the stderr lines kept for parsing the input description (inputs with many
+# metadata tags print a lot)
+MAX_INPUT_INFO_LINES = 500
+
+# inputs at least this long are split by time range and the segments converted by
+# parallel ffmpeg processes
+PARALLEL_CONVERSION_MIN_SECONDS = float(
+    os.getenv('PARALLEL_CONVERSION_MIN_SECONDS', '1200')
+)
+# shortest segment worth its own process, limits splitting inputs near the threshold
+PARALLEL_SEGMENT_MIN_SECONDS = float(os.getenv('PARALLEL_SEGMENT_MIN_SECONDS', '300'))
+# decoded before each segment start and dropped
+SEGMENT_PREROLL_SAMPLES = SAMPLE_RATE // 2
+# max segments per input, defaults to the cpus this process may run on
+SEGMENT_WORKERS = int(os.getenv('FFMPEG_SEGMENT_WORKERS', '0')) or (
+    len(os.sched_getaffinity(0))
+    if hasattr(os, 'sched_getaffinity')
+    else os.cpu_count() or 1
+)
+
+
+def wav_header(data_size: int) -> bytes:
+    """Build the 44 byte WAV header for `data_size` bytes of 16kHz mono 16-bit PCM.
+
+    ffmpeg can't seek back to fill in the RIFF/data sizes when it writes to a pipe, so
+    streamed output is produced as raw PCM and the header is written by us once the size
+    is known.
+    """
+    byte_rate = SAMPLE_RATE * CHANNELS * SAMPLE_WIDTH
+    return struct.pack(
+        '<4sI4s4sIHHIIHH4sI',
+        b'RIFF', data_size + WAV_HEADER_SIZE - 8, b'WAVE',
+        b'fmt ', 16, 1, CHANNELS, SAMPLE_RATE, byte_rate,
+        CHANNELS * SAMPLE_WIDTH, SAMPLE_WIDTH * 8,
+        b'data', data_size
+    )
+
+
+def conversion_metrics(
+    convert_duration: float, input_size_bytes: int, output_size_bytes: int
+) -> dict:
+    """Timing and size metrics reported for every conversion."""
+    size_ratio = output_size_bytes / input_size_bytes if input_size_bytes > 0 else 1
+    return {
+        'ffmpeg_conversion_time_seconds': round(convert_duration, 3),
+        'input_file_size_bytes': input_size_bytes,
+        'input_file_size_mb': round(input_size_bytes / (1024 * 1024), 2),
+        'output_file_size_bytes': output_size_bytes,
+        'output_file_size_mb': round(output_size_bytes / (1024 * 1024), 2),
+        'size_reduction_percent': round((1 - size_ratio) * 100, 2),
+    }
+
+
+OPUS_BITRATE = os.getenv('OPUS_BITRATE', '32k')
+# upload formats transcribe accepts: uncompressed wav, lossless flac, lossy ogg/opus
+# (speech stays intelligible at 24-32k)
+OUTPUT_FORMATS = {
+    'pcm': {'extension': '.wav'},
+    'flac': {
+        'extension': '.flac',
+        'ffmpeg_args': {'format': 'flac', 'acodec': 'flac', 'compression_level': 5},
+    },
+    'opus': {
+        'extension': '.ogg',
+        'ffmpeg_args': {
+            'format': 'ogg',
+            'acodec': 'libopus',
+            'audio_bitrate': OPUS_BITRATE,
+            'application': 'voip',
+        },
+    },
+}
+
+# stderr lines describing the input, printed by ffmpeg before it starts converting
+_INPUT_RE = re.compile(r"^Input #0, (?P<format_name>.+), from '(?P<filename>.*)':$")
+_DURATION_RE = re.compile(
+    r'Duration: (?:(?P<h>\d+):(?P<m>\d+):(?P<s>[\d.]+)|N/A)(?:, start: '
+    r'(?P<start>-?[\d.]+))?(?:, bitrate: (?P<bitrate>\d+) kb/s)?'
+)
+_STREAM_RE = re.compile(
+    r'^\s*Stream #0:(?P<index>\d+)(?:\[\w+\])?(?:\((?P<language>\w+)\))?: '
+    r'(?P<codec_type>\w+): (?P<codec_name>\w+)(?P<details>.*)$'
+)
+_CHANNEL_LAYOUTS = {
+    'mono': 1, 'stereo': 2, '2.1': 3, 'quad': 4, '4.0': 4,
+    '5.0': 5, '5.1': 6, '6.1': 7, '7.1': 8,
+}
+
+
+def parse_input_info(lines: Iterable[str]) -> dict:
+    """Build ffprobe shaped metadata from the input description ffmpeg logs at start.
+
+    The result has the `format` and `streams` sections. Only the fields ffmpeg prints
+    are filled in: format name, duration, start time and bit rate, and per stream the
+    codec, sample rate and channels (audio) or dimensions (video). Values keep
+    ffprobe's types, e.g. `duration` and `sample_rate` are strings.
+    """
+    format_info = {}
+    streams = []
+    for line in lines:
+        if line.startswith(('Stream mapping:', 'Output #')):
+            break
+        if match := _INPUT_RE.match(line):
+            format_info['filename'] = match['filename']
+            format_info['format_name'] = match['format_name']
+        elif (
+            (match := _DURATION_RE.search(line))
+            and line.lstrip().startswith('Duration:')
+        ):
+            if match['s'] is not None:
+                hours, minutes = int(match['h']), int(match['m'])
+                seconds = hours * 3600 + minutes * 60 + float(match['s'])
+                format_info['duration'] = f"{seconds:.6f}"
+            if match['start'] is not None:
+                format_info['start_time'] = match['start']
+            if match['bitrate'] is not None:
+                format_info['bit_rate'] = str(int(match['bitrate']) * 1000)
+        elif match := _STREAM_RE.match(line):
+            stream = {
+                'index': int(match['index']),
+                'codec_type': match['codec_type'].lower(),
+                'codec_name': match['codec_name'],
+            }
+            details = match['details']
+            if stream['codec_type'] == 'audio':
+                if sample_rate := re.search(r', (\d+) Hz', details):
+                    stream['sample_rate'] = sample_rate[1]
+                if channels := re.search(r' Hz, (\d+) channels', details):
+                    stream['channels'] = int(channels[1])
+                elif layout := re.search(r' Hz, ([\w.]+)', details):
+                    stream['channels'] = _CHANNEL_LAYOUTS.get(layout[1])
+                    stream['channel_layout'] = layout[1]
+            elif stream['codec_type'] == 'video' and (
+                size := re.search(r', (\d+)x(\d+)', details)
+            ):
+                stream['width'], stream['height'] = int(size[1]), int(size[2])
+            if bit_rate := re.search(r', (\d+) kb/s', details):
+                stream['bit_rate'] = str(int(bit_rate[1]) * 1000)
+            if match['language']:
+                stream['tags'] = {'language': match['language']}
+            streams.append(stream)
+
+    format_info['nb_streams'] = len(streams)
+    return {'format': format_info, 'streams': streams}
+
+
 class FfmpegHandler():
-    def __init__(self):
+    def __init__(self, output_codec: str | None = None):
+        """Set up conversions uploading `output_codec`, OUTPUT_CODEC by default."""
         logger.info('initializing ffmpeg object')
+        # codec of the uploaded audio, the conversion itself always produces pcm first
+        self.output_codec = output_codec or os.getenv('OUTPUT_CODEC', 'flac')
+        if self.output_codec not in OUTPUT_FORMATS:
+            raise ValueError(
+                f"Unsupported output codec: {self.output_codec}. Supported codecs: "
+                f"{set(OUTPUT_FORMATS)}"
+            )
+
+    @property
+    def output_extension(self) -> str:
+        """Extension of the uploaded files, e.g. `.flac`."""
+        return OUTPUT_FORMATS[self.output_codec]['extension']
+
+    @property
+    def conversion_params(self) -> str:
+        """Identifies the output format, part of the conversion cache key."""
+        if self.output_codec == 'pcm':
+            return f'pcm_s16le-{SAMPLE_RATE}-{CHANNELS}'
+        if self.output_codec == 'opus':
+            return f'opus-{OPUS_BITRATE}-{SAMPLE_RATE}-{CHANNELS}'
+        return f'{self.output_codec}-{SAMPLE_RATE}-{CHANNELS}'
+
+    def is_output_format(self, input_metadata: dict) -> bool:
+        """True when probed input already is a 16kHz mono pcm_s16le wav.
+
+        Such input can be uploaded without re-encoding.
+        """
+        if 'wav' not in input_metadata['format'].get('format_name', '').split(','):
+            return False
+        streams = input_metadata['streams']
+        if len(streams) != 1:
+            return False
+        stream = streams[0]
+        return (stream.get('codec_type') == 'audio'
+                and stream.get('codec_name') == 'pcm_s16le'
+                and int(stream.get('sample_rate', 0)) == SAMPLE_RATE
+                and stream.get('channels') == CHANNELS)
+
+    def wav_metadata(self, file_path: str) -> dict | None:
+        """Read ffprobe shaped metadata of a PCM wav from its header, without ffprobe.
+
+        Returns None for wavs the `wave` module can't read (compressed or float
+        samples), those go through ffmpeg.
+        """
+        try:
+            with wave.open(file_path, 'rb') as wav:
+                channels, sample_width, sample_rate, frames = (
+                    wav.getnchannels(),
+                    wav.getsampwidth(),
+                    wav.getframerate(),
+                    wav.getnframes(),
+                )
+        except (wave.Error, EOFError):
+            return None
+
+        duration = frames / sample_rate if sample_rate else 0
+        codec_name = f'pcm_s{sample_width * 8}le' if sample_width > 1 else 'pcm_u8'
 
-    def convert_to_wav(self, input_file) -> tuple[str, dict]:
+        return {
+            'format': {
+                'filename': file_path,
+                'format_name': 'wav',
+                'duration': f'{duration:.6f}',
+                'size': str(Path(file_path).stat().st_size),
+                'bit_rate': str(sample_rate * channels * sample_width * 8),
+                'nb_streams': 1,
+            },
+            'streams': [{
+                'index': 0,
+                'codec_type': 'audio',
+                'codec_name': codec_name,
+                'sample_rate': str(sample_rate),
+                'channels': channels,
+                'bits_per_sample': sample_width * 8,
+            }],
+        }
+
+    def convert_to_wav(
+        self, input_file: str, metadata: dict | None = None
+    ) -> tuple[str, dict]:
         """This function will accept a file and convert it into a wav file and return a new file
         Args:
             input_file: Path to input file
+            metadata: optional dict filled with the input metadata ffmpeg logs while
+                converting, saves a separate ffprobe run
             
         Returns:
             Tuple of (output_filename, metrics_dict)        
@@ -31,26 +277,29 @@ class FfmpegHandler():
             logger.info(f"Converting {input_file} ({input_size_mb:.2f} MB) to WAV format")
 
             convert_start = time.time()
-            ffmpeg.input(input_file).output(
+            stream = ffmpeg.input(input_file).output(
                 output_name,
                 ar=16000, # 16kHz sample rate
                 ac=1, # mono channel 
                 acodec='pcm_s16le' # 16-bit PCM
-            ).run(overwrite_output=True)
+            )
+            if metadata is None:
+                stream.run(overwrite_output=True)
+            else:
+                _, stderr = stream.global_args('-hide_banner', '-nostats').run(
+                    overwrite_output=True, capture_stderr=True
+                )
+                metadata.update(parse_input_info(stderr.decode(errors='replace').splitlines()))
+                metadata['format']['size'] = str(input_size_bytes)
             convert_duration = time.time() - convert_start
 
             output_size_bytes = os.path.getsize(output_name)
             output_size_mb = output_size_bytes / (1024 * 1024)
 
-            metrics = {
-                'ffmpeg_conversion_time_seconds': round(convert_duration, 3),
-                'input_file_size_bytes': input_size_bytes,
-                'input_file_size_mb': round(input_size_mb, 2),
-                'output_file_size_bytes': output_size_bytes,
-                'output_file_size_mb': round(output_size_mb, 2),
-                'size_reduction_percent': round((1 - output_size_bytes/input_size_bytes) * 100, 2) if input_size_bytes > 0 else 0
-            }
-            
+            metrics = conversion_metrics(
+                convert_duration, input_size_bytes, output_size_bytes
+            )
+
             logger.info(f"Conversion complete: {output_name} ({convert_duration:.2f}s, {output_size_mb:.2f} MB)")
             return output_name, metrics
         
@@ -58,6 +307,401 @@ class FfmpegHandler():
             logger.error(f"Ffmpeg conversion failed - {input_file}: {str(e)}")
             raise RuntimeError(f"FFmpeg conversion failed for {input_file}: {str(e)}")
 
+    def stream_to_pcm(
+        self, source: str | Iterable[bytes], metadata: dict | None = None
+    ) -> Iterator[bytes]:
+        """Run ffmpeg and yield 16kHz mono s16le PCM from `pipe:1` while it converts.
+
+        `source` is either a file path that ffmpeg reads itself, or an iterable of
+        chunks that is piped into ffmpeg stdin (`pipe:0`) by a feeder thread while the
+        caller consumes the output, so at most a few chunks are held in memory
+        regardless of the input size. Piped input has to be readable without seeking
+        (webm/mkv, mp3, wav, faststart mp4).
+
+        When `metadata` is given, ffmpeg logs at info level and the input description it
+        prints before converting is parsed into it once the conversion finished, so no
+        separate ffprobe run is needed.
+
+        Args:
+            source: path to the input file or iterable of raw bytes of the uploaded
+                media file
+            metadata: optional dict filled with ffprobe shaped input metadata
+
+        Yields:
+            Blocks of raw PCM audio
+        """
+        piped = not isinstance(source, str)
+        log_args = (
+            ('-loglevel', 'error') if metadata is None else ('-hide_banner', '-nostats')
+        )
+        stream = (
+            ffmpeg.input('pipe:0' if piped else source)
+            .output(
+                'pipe:1',
+                format='s16le',
+                ar=SAMPLE_RATE,
+                ac=CHANNELS,
+                acodec='pcm_s16le',
+            )
+            .global_args(*log_args)
+        )
+        input_info = [] if metadata is not None else None
+        pcm_bytes = 0
+        for block in self._run_pipe(stream, source if piped else None, input_info):
+            pcm_bytes += len(block)
+            yield block
+        if not pcm_bytes:
+            # e.g. piped mp4/m4a with the index at the end, ffmpeg finds no readable
+            # samples but exits 0
+            raise RuntimeError(
+                f"ffmpeg produced no audio for {'piped input' if piped else source}"
+            )
+
+        if metadata is not None:
+            metadata.update(parse_input_info(input_info))
+            if not piped and Path(source).is_file():
+                metadata['format']['size'] = str(Path(source).stat().st_size)
+
+    def encode(self, pcm_blocks: Iterable[bytes]) -> Iterator[bytes]:
+        """Encode raw 16kHz mono s16le PCM to the output codec through an ffmpeg pipe.
+
+        Written to a pipe, the flac STREAMINFO header has no total sample count (ffmpeg
+        can't seek back to fill it in), which decoders and transcribe treat as unknown
+        length.
+        """
+        stream = (
+            ffmpeg.input('pipe:0', format='s16le', ar=SAMPLE_RATE, ac=CHANNELS)
+            .output('pipe:1', **OUTPUT_FORMATS[self.output_codec]['ffmpeg_args'])
+            .global_args('-loglevel', 'error')
+        )
+        yield from self._run_pipe(stream, pcm_blocks)
+
+    def encode_file(self, wav_filepath: str) -> str:
+        """Encode a converted wav to the output codec next to it, return its path."""
+        output_name = str(Path(wav_filepath).with_suffix(self.output_extension))
+        try:
+            (
+                ffmpeg.input(wav_filepath)
+                .output(output_name, **OUTPUT_FORMATS[self.output_codec]['ffmpeg_args'])
+                .global_args('-loglevel', 'error')
+                .run(overwrite_output=True, capture_stderr=True)
+            )
+        except ffmpeg.Error as e:
+            Path(output_name).unlink(missing_ok=True)
+            raise RuntimeError(
+                f"FFmpeg {self.output_codec} encoding failed for {wav_filepath}: "
+                f"{e.stderr.decode(errors='replace').strip()}"
+            ) from e
+        return output_name
+
+    def _run_pipe(
+        self,
+        stream: ffmpeg.nodes.OutputStream,
+        chunks: Iterable[bytes] | None = None,
+        input_info: list | None = None,
+    ) -> Iterator[bytes]:
+        """Run an ffmpeg stream spec writing to `pipe:1`, yield its stdout as it runs.
+
+        `chunks`, if given, are written to ffmpeg stdin by a feeder thread. stderr is
+        drained on its own thread, its last lines go into the error message; with
+        `input_info` the lines are also collected there (bounded) for
+        `parse_input_info`.
+        """
+        process = stream.run_async(
+            pipe_stdin=chunks is not None, pipe_stdout=True, pipe_stderr=True
+        )
+        feed_errors = []
+        stderr_tail = deque(maxlen=20)
+
+        def feed() -> None:
+            try:
+                for chunk in chunks:
+                    process.stdin.write(chunk)
+            except BrokenPipeError:
+                # ffmpeg exited early, the return code tells us why
+                pass
+            except Exception as e:
+                feed_errors.append(e)
+                process.kill()
+            finally:
+                with contextlib.suppress(BrokenPipeError):
+                    process.stdin.close()
+
+        def drain_stderr() -> None:
+            for line in process.stderr:
+                line = line.decode(errors='replace').rstrip()
+                stderr_tail.append(line)
+                if input_info is not None and len(input_info) < MAX_INPUT_INFO_LINES:
+                    input_info.append(line)
+
+        threads = [
+            threading.Thread(target=drain_stderr, name='ffmpeg-stderr', daemon=True)
+        ]
+        if chunks is not None:
+            threads.append(
+                threading.Thread(target=feed, name='ffmpeg-feeder', daemon=True)
+            )
+        for thread in threads:
+            thread.start()
+
+        try:
+            while block := process.stdout.read(STREAM_CHUNK_SIZE):
+                yield block
+            process.wait()
+        finally:
+            # consumer stopped early or something went wrong, don't leave ffmpeg running
+            if process.poll() is None:
+                process.kill()
+                process.wait()
+            for thread in threads:
+                thread.join()
+
+        if feed_errors:
+            raise RuntimeError(
+                f"reading input stream failed: {feed_errors[0]}"
+            ) from feed_errors[0]
+        if process.returncode != 0:
+            raise RuntimeError(
+                f"ffmpeg exited with code {process.returncode}: "
+                f"{' | '.join(stderr_tail)}"
+            )
+
+    def segment_count(self, duration: float | None) -> int:
+        """Number of parallel segments for an input of `duration` seconds.
+
+        1 means a single ffmpeg run.
+        """
+        if not duration or duration < PARALLEL_CONVERSION_MIN_SECONDS:
+            return 1
+        return max(
+            1, min(SEGMENT_WORKERS, math.floor(duration / PARALLEL_SEGMENT_MIN_SECONDS))
+        )
+
+    def segmented_pcm(
+        self, input_file: str, duration: float, segments: int
+    ) -> Iterator[bytes]:
+        """Convert `input_file` as `segments` time ranges in parallel ffmpeg processes.
+
+        The PCM is yielded in order.
+
+        Segment boundaries are whole output samples. Each segment seeks with an input
+        `-ss` (ffmpeg decodes from the packet before it and drops samples up to the
+        exact position) to a short pre-roll before its start and is cut with `-t`; the
+        pre-roll is dropped and the rest trimmed or zero padded to its exact sample
+        count, so the concatenation has no gap or overlap and lines up with a single
+        pass conversion. The last segment runs to the end of the input. Segments are
+        converted to temp files while earlier ones are being yielded.
+
+        Args:
+            input_file: path to the input file, must be seekable
+            duration: input duration in seconds (probed)
+            segments: number of segments, see `segment_count`
+
+        Yields:
+            Blocks of raw 16kHz mono s16le PCM
+        """
+        bounds = [
+            round(duration * SAMPLE_RATE * i / segments) for i in range(segments + 1)
+        ]
+        # audio decoded before each cut and dropped, lets decoder (e.g. the mp3 bit
+        # reservoir) and resampler settle
+        prerolls = [min(bound, SEGMENT_PREROLL_SAMPLES) for bound in bounds]
+        tmp_dir = tempfile.mkdtemp(prefix='ffmpeg-segments-')
+        processes = []
+        stopped = threading.Event()
+
+        def convert(index: int) -> str:
+            output = str(Path(tmp_dir) / f'{index}.pcm')
+            preroll = prerolls[index]
+            input_args = (
+                {'ss': f'{(bounds[index] - preroll) / SAMPLE_RATE:.6f}'}
+                if index
+                else {}
+            )
+            output_args = {
+                'format': 's16le',
+                'ar': SAMPLE_RATE,
+                'ac': CHANNELS,
+                'acodec': 'pcm_s16le',
+            }
+            if index < segments - 1:
+                output_args['t'] = (
+                    f'{(bounds[index + 1] - bounds[index] + preroll) / SAMPLE_RATE:.6f}'
+                )
+            if stopped.is_set():
+                raise RuntimeError('segment conversion cancelled')
+            process = (
+                ffmpeg.input(input_file, **input_args)
+                .output(output, **output_args)
+                .global_args('-loglevel', 'error', '-nostdin')
+                .run_async(pipe_stderr=True, overwrite_output=True)
+            )
+            processes.append(process)
+            if stopped.is_set():
+                process.kill()
+            _, stderr = process.communicate()
+            if process.returncode != 0:
+                raise RuntimeError(
+                    f"ffmpeg exited with code {process.returncode} on segment "
+                    f"{index}: {stderr.decode(errors='replace').strip()}"
+                )
+            return output
+
+        executor = ThreadPoolExecutor(
+            max_workers=segments, thread_name_prefix='ffmpeg-segment'
+        )
+        futures = [executor.submit(convert, index) for index in range(segments)]
+        try:
+            for index, future in enumerate(futures):
+                segment_path = future.result()
+                # the last segment keeps whatever ffmpeg produced
+                expected = (
+                    (bounds[index + 1] - bounds[index]) * SAMPLE_WIDTH
+                    if index < segments - 1
+                    else None
+                )
+                written = 0
+                with Path(segment_path).open('rb') as segment:
+                    segment.seek(prerolls[index] * SAMPLE_WIDTH)
+                    while block := segment.read(STREAM_CHUNK_SIZE):
+                        if expected is not None:
+                            block = block[:expected - written]
+                            if not block:
+                                break
+                        written += len(block)
+                        yield block
+                if expected is not None and written < expected:
+                    # the resampler can come up a few samples short at a cut, keep the
+                    # timeline aligned
+                    yield bytes(expected - written)
+                Path(segment_path).unlink()
+        finally:
+            # consumer stopped early or a segment failed, don't leave ffmpeg running
+            stopped.set()
+            for process in processes:
+                if process.poll() is None:
+                    process.kill()
+            executor.shutdown(wait=True, cancel_futures=True)
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+
+    def convert_to_wav_segmented(
+        self, input_file: str, duration: float, segments: int
+    ) -> tuple[str, dict]:
+        """`convert_to_wav` for long inputs, run as `segments` parallel ffmpeg runs.
+
+        Args:
+            input_file: Path to input file
+            duration: input duration in seconds
+            segments: number of segments
+
+        Returns:
+            Tuple of (output_filename, metrics_dict)
+        """
+        output_name = f'{Path(input_file).stem}_converted.wav'
+        input_size_bytes = Path(input_file).stat().st_size
+        logger.info(
+            f"Converting {input_file} ({input_size_bytes / (1024 * 1024):.2f} MB) "
+            f"to WAV format in {segments} segments"
+        )
+
+        try:
+            convert_start = time.time()
+            data_size = self.write_wav(
+                self.segmented_pcm(input_file, duration, segments), output_name
+            )
+            convert_duration = time.time() - convert_start
+        except Exception as e:
+            logger.error(f"Ffmpeg segmented conversion failed - {input_file}: {e}")
+            Path(output_name).unlink(missing_ok=True)
+            raise RuntimeError(f"FFmpeg conversion failed for {input_file}: {e}") from e
+
+        metrics = {
+            **conversion_metrics(
+                convert_duration, input_size_bytes, data_size + WAV_HEADER_SIZE
+            ),
+            'ffmpeg_segment_count': segments,
+        }
+
+        logger.info(
+            f"Conversion complete: {output_name} ({convert_duration:.2f}s, "
+            f"{metrics['output_file_size_mb']:.2f} MB)"
+        )
+        return output_name, metrics
+
+    def wav_pcm(self, file_path: str) -> Iterator[bytes]:
+        """Yield the sample data of a pcm wav in blocks."""
+        with wave.open(file_path, 'rb') as wav:
+            frames_per_block = max(
+                1, STREAM_CHUNK_SIZE // (wav.getsampwidth() * wav.getnchannels())
+            )
+            while block := wav.readframes(frames_per_block):
+                yield block
+
+    def write_wav(self, pcm_blocks: Iterable[bytes], output_name: str) -> int:
+        """Write PCM blocks as a wav file, returns the data size in bytes."""
+        with Path(output_name).open('wb') as out:
+            # reserve room for the header, it is rewritten once the data size is known
+            out.write(wav_header(0))
+            data_size = 0
+            for block in pcm_blocks:
+                out.write(block)
+                data_size += len(block)
+            out.seek(0)
+            out.write(wav_header(data_size))
+        return data_size
+
+    def stream_to_wav(
+        self,
+        chunks: Iterable[bytes],
+        output_name: str | None = None,
+        metadata: dict | None = None,
+    ) -> tuple[str, dict]:
+        """Convert a stream of input chunks to a wav file without spooling it to disk.
+
+        Args:
+            chunks: iterable of raw bytes of the uploaded media file
+            output_name: optional output path, defaults to a temp file
+            metadata: optional dict filled with the input metadata, see `stream_to_pcm`
+
+        Returns:
+            Tuple of (output_filename, metrics_dict)
+        """
+        input_size = {'bytes': 0}
+
+        def counted() -> Iterator[bytes]:
+            for chunk in chunks:
+                input_size['bytes'] += len(chunk)
+                yield chunk
+
+        if output_name is None:
+            fd, output_name = tempfile.mkstemp(suffix='_converted.wav')
+            os.close(fd)
+
+        try:
+            convert_start = time.time()
+            data_size = self.write_wav(
+                self.stream_to_pcm(counted(), metadata), output_name
+            )
+            convert_duration = time.time() - convert_start
+        except Exception as e:
+            logger.error(f"Ffmpeg streaming conversion failed: {e}")
+            Path(output_name).unlink(missing_ok=True)
+            raise RuntimeError(f"FFmpeg streaming conversion failed: {e}") from e
+
+        metrics = conversion_metrics(
+            convert_duration, input_size['bytes'], data_size + WAV_HEADER_SIZE
+        )
+
+        logger.info(
+            f"Streaming conversion complete: {output_name} "
+            f"({convert_duration:.2f}s, {metrics['output_file_size_mb']:.2f} MB)"
+        )
+        return output_name, metrics
+
     def probe_file(self, file_path: str)->dict:
         """ Use ffmpeg probe to get metadata """
-        return ffmpeg.probe(file_path)
\ No newline at end of file
+        try:
+            return ffmpeg.probe(file_path)
+        except ffmpeg.Error as e:
+            last_line = e.stderr.decode(errors='replace').strip().splitlines()[-1:]
+            raise RuntimeError(f"ffprobe failed for {file_path}: {last_line}") from e
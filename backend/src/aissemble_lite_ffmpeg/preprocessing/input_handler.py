@@ -1,32 +1,83 @@
-import json
+import hashlib
 import logging
 import os
 from pathlib import Path
 import time
-import subprocess
+import threading
+from collections.abc import Iterable, Iterator
 
-from .ffmpeg_handler import FfmpegHandler
+from . import conversion_cache
+from .conversion_cache import default_cache, hash_file, hashing
+from .ffmpeg_handler import (
+    SAMPLE_WIDTH,
+    WAV_HEADER_SIZE,
+    FfmpegHandler,
+    conversion_metrics,
+    wav_header,
+)
+from . import metrics_sink
 from .s3_handler import S3Handler
+from .silence import OFFSET_MAP_SUFFIX, SilenceTrimmer
+from ..worker_pool import run_in_parent
 
 ACCEPTABLE_TYPES = {'.mp3', '.mp4', '.wav', '.m4a', '.flac', '.avi', '.webm'}  # Use set for O(1) lookup
 
 logger = logging.getLogger(__name__)
 
+_shared_lock = threading.Lock()
+_shared_handler = None
+
 class InputHandler():
-    def __init__(self):
+    def __init__(self, s3_handler: S3Handler | None = None):
         self.ffmpeg_handler = FfmpegHandler()
-        self.s3_handler = S3Handler()
-        self.output_dir = Path("output/metrics")
-        self.output_dir.mkdir(parents=True, exist_ok=True)
+        self.s3_handler = s3_handler or S3Handler()
         self.save_metrics = os.getenv('SAVE_METRICS', 'true').lower() == 'true' # make it boolean by adding comperative operator
+        # overlap ffmpeg conversion and s3 multipart upload instead of writing a temp
+        # wav first
+        self.pipelined_upload = os.getenv('PIPELINED_UPLOAD', 'true').lower() == 'true'
+        # upload wavs that already are 16kHz mono pcm_s16le as is instead of
+        # re-encoding them
+        self.wav_passthrough = os.getenv('WAV_PASSTHROUGH', 'true').lower() == 'true'
+        # take input_metadata from the conversion run instead of a separate ffprobe pass
+        self.single_pass_probe = (
+            os.getenv('SINGLE_PASS_PROBE', 'true').lower() == 'true'
+        )
+        # convert long inputs as parallel time range segments, inputs from this size on
+        # are probed for their duration
+        self.parallel_conversion = (
+            os.getenv('PARALLEL_CONVERSION', 'true').lower() == 'true'
+        )
+        self.parallel_min_bytes = int(
+            float(os.getenv('PARALLEL_CONVERSION_MIN_MB', '5')) * 1024 * 1024
+        )
+        # cut long silences out of the converted audio before upload and transcription
+        self.silence_trim = os.getenv('SILENCE_TRIM', 'false').lower() == 'true'
+        # how s3:// sources are read, presigned (ffmpeg reads a presigned url) or ranged
+        # (ranged GETs piped into ffmpeg)
+        self.s3_ingest_mode = os.getenv('S3_INGEST_MODE', 'presigned')
+        # reuse earlier uploads of identical content
+        self.conversion_cache = (
+            default_cache()
+            if os.getenv('CONVERSION_CACHE', 'true').lower() == 'true'
+            else None
+        )
+
+    @property
+    def conversion_params(self) -> str:
+        """Output format plus trimming settings, part of the conversion cache key."""
+        if self.silence_trim:
+            return f'{self.ffmpeg_handler.conversion_params}-{SilenceTrimmer().params}'
+        return self.ffmpeg_handler.conversion_params
 
     def _check_file_extension(self, file_path: str):
         # check if file exists, raise error if not found
         if not os.path.exists(file_path):
             raise FileNotFoundError(f'File not found: {file_path}')
 
-        file_path_obj = Path(file_path)
-        extension = file_path_obj.suffix
+        self._check_extension(file_path)
+
+    def _check_extension(self, filename: str) -> None:
+        extension = Path(filename).suffix
 
         if extension not in ACCEPTABLE_TYPES:
             raise ValueError(f"Unsupported file type: {extension}. Supported files: {ACCEPTABLE_TYPES}")
@@ -44,72 +95,619 @@ class InputHandler():
             'streams': streams_info
         }
 
-    def _ensure_wav(self, input_file_path):
+    def _timed_probe(self, file_path: str) -> tuple[dict, float]:
+        """`_probe_file` plus the seconds it took, reported as probe_time_seconds."""
+        probe_start = time.time()
+        input_metadata = self._probe_file(file_path=file_path)
+        return input_metadata, time.time() - probe_start
+
+    def _duration(self, input_metadata: dict | None) -> float | None:
+        """Duration in seconds from probed metadata, None if unknown."""
+        try:
+            return float(input_metadata['format']['duration'])
+        except (TypeError, KeyError, ValueError):
+            return None
+
+    def _ensure_wav(
+        self, input_file_path: str, metadata: dict | None = None
+    ) -> tuple[str, dict]:
         """This function accepts an input file and returns .wav format. Always to ensure it is standardized."""
-        output, metrics = self.ffmpeg_handler.convert_to_wav(input_file_path)
+        output, metrics = self.ffmpeg_handler.convert_to_wav(input_file_path, metadata)
         
         return output, metrics
     
     def _save_metrics(self, metrics: dict, filename: str, s3_uri:str)->None:
         """
-        This function will accept metrics from the filename and its s3 uri and write
-        them to the output directory
+        This function will hand metrics from the filename and its s3 uri to the
+        background sink, which appends them to rotating JSONL files in the output
+        directory. In a process pool worker they go to the sink of the parent, so
+        /audio/metrics sees them.
         """
-        filename_stem = Path(filename).stem
-        metrics_filename = f"{filename_stem}.json"
-        metrics_path = self.output_dir / metrics_filename
-
-        full_metrics = {
-            'filename': filename,
-            's3_uri': s3_uri,
-            'metrics': metrics
+        if self.save_metrics:
+            run_in_parent(metrics_sink.record, filename, s3_uri, metrics)
+
+    def _cached_result(self, digest: str, start_time: float) -> tuple[str, dict] | None:
+        """Return (s3_uri, metrics) of an earlier conversion of the same content.
+
+        Only if its s3 object still exists.
+        """
+        params = self.conversion_params
+        entry = self.conversion_cache.lookup(digest, params)
+        if entry is None:
+            return None
+        if not self.s3_handler.exists(entry['s3_uri']):
+            run_in_parent(conversion_cache.evict, digest, params)
+            return None
+
+        logger.info(f"conversion cache hit for {digest}: {entry['s3_uri']}")
+        metrics = {
+            'total_processing_time_seconds': round(time.time() - start_time, 3),
+            **entry['metrics'],
+            'ffmpeg_conversion_time_seconds': 0,
+            's3_upload_time_seconds': 0,
+            's3_upload_speed_mbps': 0,
+            'input_sha256': digest,
+            'cache_hit': True,
+            'conversion_path': 'cache',
         }
+        return entry['s3_uri'], metrics
 
-        with open(metrics_path, 'w') as f:
-            json.dump(full_metrics, f, indent=2)
+    def _pipelined_upload(
+        self,
+        source: str | Iterable[bytes],
+        original_filename: str,
+        metadata: dict | None = None,
+        segments: int = 1,
+        duration: float | None = None,
+        trimmer: SilenceTrimmer | None = None,
+        input_size_bytes: int | None = None,
+    ) -> tuple[str, dict]:
+        """Convert and upload at the same time.
 
-        logger.info(f'metrics saved to {metrics_path}')
+        The PCM coming out of ffmpeg is cut into parts and pushed through s3 multipart
+        upload while the conversion is still running, nothing is written to local disk.
+        `source` can also be a url ffmpeg reads itself, its size is passed as
+        `input_size_bytes`.
+        """
+        if input_size_bytes is not None:
+            input_size = {'bytes': input_size_bytes}
+        elif isinstance(source, str):
+            input_size = {'bytes': Path(source).stat().st_size}
+        else:
+            input_size = {'bytes': 0}
+            chunks = source
 
-    def process_input(self, input: str, original_filename: str) -> tuple[str, dict]:
-        """This function ensures the file is in .wav format and gets a uri from the s3
-            bucket so that we can pass a uri to the aws transcribe function.
+            def counted() -> Iterator[bytes]:
+                for chunk in chunks:
+                    input_size['bytes'] += len(chunk)
+                    yield chunk
 
-            FFmpegHandler class is used to convert the audio as well as standardize the
-            audio input for the highest quality. 
-        
+            source = counted()
+
+        convert_time = {}
+
+        def pcm() -> Iterator[bytes]:
+            convert_start = time.time()
+            if segments > 1:
+                yield from self.ffmpeg_handler.segmented_pcm(source, duration, segments)
+            else:
+                yield from self.ffmpeg_handler.stream_to_pcm(source, metadata)
+            convert_time['seconds'] = time.time() - convert_start
+
+        pcm_blocks = trimmer.trim(pcm()) if trimmer else pcm()
+        s3_uri, s3_metrics = self._upload_pcm(pcm_blocks, original_filename)
+        ffmpeg_metrics = conversion_metrics(
+            convert_time['seconds'],
+            input_size['bytes'],
+            s3_metrics['output_file_size_bytes'],
+        )
+        if segments > 1:
+            ffmpeg_metrics['ffmpeg_segment_count'] = segments
+        return s3_uri, {**ffmpeg_metrics, **s3_metrics}
+
+    def _passthrough_upload(
+        self,
+        input_file_path: str,
+        original_filename: str,
+        trimmer: SilenceTrimmer | None = None,
+    ) -> tuple[str, dict]:
+        """Upload an input that already has the output sample format, no resampling.
+
+        With a compressed output codec the pcm frames are only encoded.
         """
-        start_time = time.time()
-        wav_filepath = None
+        if trimmer or self.ffmpeg_handler.output_codec != 'pcm':
+            pcm_blocks = self.ffmpeg_handler.wav_pcm(input_file_path)
+            s3_uri, s3_metrics = self._upload_pcm(
+                trimmer.trim(pcm_blocks) if trimmer else pcm_blocks, original_filename
+            )
+        else:
+            s3_uri, s3_metrics = self.s3_handler.upload_file(
+                file_path=input_file_path, original_filename=original_filename
+            )
+            s3_metrics['output_codec'] = 'pcm'
+
+        if not s3_uri:
+            raise RuntimeError(f"Failed to upload {input_file_path} to S3")
+
+        size_bytes = Path(input_file_path).stat().st_size
+        logger.info(
+            f'{input_file_path} is already 16kHz mono pcm wav, uploaded without '
+            'conversion'
+        )
+        ffmpeg_metrics = conversion_metrics(
+            0, size_bytes, s3_metrics['output_file_size_bytes']
+        )
+        return s3_uri, {
+            **ffmpeg_metrics,
+            **s3_metrics,
+            'conversion_path': 'passthrough',
+        }
+
+    def _upload_pcm(
+        self, pcm_blocks: Iterable[bytes], original_filename: str
+    ) -> tuple[str, dict]:
+        """Stream PCM to s3 in the output codec, as wav or encoded on the way."""
+        if self.ffmpeg_handler.output_codec == 'pcm':
+            s3_uri, s3_metrics = self.s3_handler.upload_stream(
+                pcm_blocks, original_filename, header_factory=wav_header
+            )
+            return s3_uri, {**s3_metrics, 'output_codec': 'pcm'}
+
+        pcm_size = {'bytes': 0}
+
+        def counted() -> Iterator[bytes]:
+            for block in pcm_blocks:
+                pcm_size['bytes'] += len(block)
+                yield block
+
+        encoded = self.ffmpeg_handler.encode(counted())
+        s3_uri, s3_metrics = self.s3_handler.upload_stream(
+            encoded, original_filename, extension=self.ffmpeg_handler.output_extension
+        )
+        return s3_uri, {
+            **s3_metrics,
+            **self._codec_metrics(WAV_HEADER_SIZE + pcm_size['bytes'], s3_metrics),
+        }
+
+    def _codec_metrics(
+        self, wav_size_bytes: int, s3_metrics: dict, encode_seconds: float | None = None
+    ) -> dict:
+        """What the compressed output saved compared to uploading the wav.
+
+        The upload time saving is estimated from the measured upload throughput. For
+        streamed uploads that is taken from the part timings, the total upload time also
+        includes waiting on ffmpeg and the encoder.
+        """
+        saved_bytes = wav_size_bytes - s3_metrics['output_file_size_bytes']
+        parts = s3_metrics.get('s3_part_timings') or [{
+            'size_bytes': s3_metrics['output_file_size_bytes'],
+            'upload_time_seconds': s3_metrics['s3_upload_time_seconds'],
+        }]
+        upload_seconds = sum(p['upload_time_seconds'] for p in parts)
+        bytes_per_second = (
+            sum(p['size_bytes'] for p in parts) / upload_seconds
+            if upload_seconds > 0
+            else 0
+        )
+        metrics = {
+            'output_codec': self.ffmpeg_handler.output_codec,
+            'pcm_size_bytes': wav_size_bytes,
+            'codec_size_saved_bytes': saved_bytes,
+            'estimated_upload_time_saved_seconds': round(
+                saved_bytes / bytes_per_second, 3
+            )
+            if bytes_per_second
+            else None,
+        }
+        if encode_seconds is not None:
+            metrics['encode_time_seconds'] = round(encode_seconds, 3)
+        logger.info(
+            f"{metrics['output_codec']} output saved {saved_bytes} bytes over wav"
+        )
+        return metrics
+
+    def _trim_wav(self, wav_filepath: str, trimmer: SilenceTrimmer) -> None:
+        """Rewrite a converted wav with long silences removed."""
+        trimmed_path = Path(f'{wav_filepath}.trimmed')
+        try:
+            pcm = self.ffmpeg_handler.wav_pcm(wav_filepath)
+            self.ffmpeg_handler.write_wav(trimmer.trim(pcm), str(trimmed_path))
+            trimmed_path.replace(wav_filepath)
+        finally:
+            trimmed_path.unlink(missing_ok=True)
+
+    def _silence_metrics(self, trimmer: SilenceTrimmer, s3_uri: str) -> dict:
+        """Store the offset map next to the uploaded wav and report what was removed."""
+        offset_map_uri = self.s3_handler.upload_json(
+            s3_uri, OFFSET_MAP_SUFFIX, trimmer.offset_map()
+        )
+        logger.info(
+            f'removed {trimmer.removed_seconds:.1f}s of silence in '
+            f'{len(trimmer.breakpoints)} cuts, offset map at {offset_map_uri}'
+        )
+        return {
+            'silence_removed_seconds': round(trimmer.removed_seconds, 3),
+            'silence_bytes_saved': trimmer.removed_samples * SAMPLE_WIDTH,
+            'silence_cuts': len(trimmer.breakpoints),
+            'silence_offset_map_uri': offset_map_uri,
+        }
+
+    def _convert_and_upload(
+        self,
+        source: str | Iterable[bytes],
+        original_filename: str,
+        metadata: dict | None = None,
+        segments: int = 1,
+        duration: float | None = None,
+        trimmer: SilenceTrimmer | None = None,
+    ) -> tuple[str, dict]:
+        """Convert a file path or chunk stream to wav and upload it.
+
+        Returns (s3_uri, ffmpeg + s3 metrics).
+
+        When `metadata` is given it is filled with the input metadata ffmpeg reports
+        while converting. With `segments` > 1 a file path of `duration` seconds is
+        converted as parallel segments. With a `trimmer` long silences are cut from the
+        converted audio before the upload. The upload is encoded to the handler's output
+        codec (OUTPUT_CODEC, flac by default).
+        """
+        if self.pipelined_upload:
+            s3_uri, metrics = self._pipelined_upload(
+                source, original_filename, metadata, segments, duration, trimmer
+            )
+            return s3_uri, {**metrics, 'conversion_path': 'transcode'}
+
+        wav_filepath = upload_path = None
         try:
-            # check if input extension is in acceptable types
-            self._check_file_extension(input)
+            if segments > 1:
+                wav_filepath, ffmpeg_metrics = (
+                    self.ffmpeg_handler.convert_to_wav_segmented(
+                        source, duration, segments
+                    )
+                )
+            elif isinstance(source, str):
+                wav_filepath, ffmpeg_metrics = self._ensure_wav(source, metadata)
+            else:
+                wav_filepath, ffmpeg_metrics = self.ffmpeg_handler.stream_to_wav(
+                    source, metadata=metadata
+                )
+
+            if trimmer:
+                self._trim_wav(wav_filepath, trimmer)
+                ffmpeg_metrics.update(
+                    conversion_metrics(
+                        ffmpeg_metrics['ffmpeg_conversion_time_seconds'],
+                        ffmpeg_metrics['input_file_size_bytes'],
+                        Path(wav_filepath).stat().st_size,
+                    )
+                )
 
-            input_metadata = self._probe_file(file_path=input)
+            if self.ffmpeg_handler.output_codec == 'pcm':
+                upload_path = wav_filepath
+                codec_metrics = {'output_codec': 'pcm'}
+            else:
+                encode_start = time.time()
+                upload_path = self.ffmpeg_handler.encode_file(wav_filepath)
+                encode_seconds = time.time() - encode_start
+                ffmpeg_metrics.update(
+                    conversion_metrics(
+                        ffmpeg_metrics['ffmpeg_conversion_time_seconds'],
+                        ffmpeg_metrics['input_file_size_bytes'],
+                        Path(upload_path).stat().st_size,
+                    )
+                )
 
-            wav_filepath, ffmpeg_metrics = self._ensure_wav(input)
-            
-            s3_uri, s3_metrics = self.s3_handler.upload_file(file_path=wav_filepath, original_filename=original_filename)
+            s3_uri, s3_metrics = self.s3_handler.upload_file(
+                file_path=upload_path, original_filename=original_filename
+            )
 
             if not s3_uri:
-                raise RuntimeError(f"Failed to upload {wav_filepath} to S3")
-            
-            total_time = time.time() - start_time
+                raise RuntimeError(f"Failed to upload {upload_path} to S3")
 
-            metrics = {
-                'total_processing_time_seconds': round(total_time, 3),
-                'input_metadata': input_metadata,
+            if upload_path != wav_filepath:
+                codec_metrics = self._codec_metrics(
+                    Path(wav_filepath).stat().st_size, s3_metrics, encode_seconds
+                )
+
+            return s3_uri, {
                 **ffmpeg_metrics,
-                **s3_metrics
+                **s3_metrics,
+                **codec_metrics,
+                'conversion_path': 'transcode',
             }
 
-            self._save_metrics(metrics, original_filename, s3_uri)
-
-            return s3_uri, metrics
-        
         finally:
-            if wav_filepath and os.path.exists(wav_filepath):
-                try:
-                    os.unlink(wav_filepath)
-                    logger.info(f"cleaned up temp WAV file: {wav_filepath}")
-                except Exception as e:
-                    logger.warning(f"Failed to clean up {wav_filepath}, {str(e)}")
\ No newline at end of file
+            for temp_path in {wav_filepath, upload_path}:
+                if temp_path and Path(temp_path).exists():
+                    try:
+                        Path(temp_path).unlink()
+                        logger.info(f"cleaned up temp file: {temp_path}")
+                    except Exception as e:
+                        logger.warning(f"Failed to clean up {temp_path}, {e}")
+
+    def process_input(
+        self, input: str, original_filename: str, input_digest: str | None = None
+    ) -> tuple[str, dict]:
+        """This function ensures the file is in .wav format and gets a uri from the s3
+        bucket so that we can pass a uri to the aws transcribe function.
+
+        FFmpegHandler class is used to convert the audio as well as standardize the
+        audio input for the highest quality.
+
+        `input_digest` is the sha256 of the input when the caller already computed it
+        while receiving the upload; if identical content was converted before, the
+        existing s3 object is returned without running ffmpeg or uploading again.
+
+        With SILENCE_TRIM on, long silences are cut from the converted audio before the
+        upload and an offset map back to the original timeline is stored next to the
+        wav.
+        """
+        if input.startswith('s3://'):
+            return self.process_s3_input(input, original_filename)
+
+        start_time = time.time()
+
+        # check if input extension is in acceptable types
+        self._check_file_extension(input)
+
+        if self.conversion_cache:
+            input_digest = input_digest or hash_file(input)
+            cached = self._cached_result(input_digest, start_time)
+            if cached:
+                return cached
+
+        probe_time = None
+        if not self.single_pass_probe:
+            input_metadata, probe_time = self._timed_probe(input)
+        elif Path(input).suffix == '.wav':
+            # pcm wav headers are read in python, the passthrough check needs them
+            input_metadata = self.ffmpeg_handler.wav_metadata(input)
+        else:
+            input_metadata = None
+
+        if (
+            input_metadata is None
+            and self.parallel_conversion
+            and Path(input).stat().st_size >= self.parallel_min_bytes
+        ):
+            # splitting by time range needs the duration before converting
+            input_metadata, probe_time = self._timed_probe(input)
+
+        duration = self._duration(input_metadata)
+        segments = (
+            self.ffmpeg_handler.segment_count(duration)
+            if self.parallel_conversion
+            else 1
+        )
+
+        trimmer = SilenceTrimmer() if self.silence_trim else None
+
+        if (
+            input_metadata
+            and self.wav_passthrough
+            and self.ffmpeg_handler.is_output_format(input_metadata)
+        ):
+            s3_uri, stage_metrics = self._passthrough_upload(
+                input, original_filename, trimmer
+            )
+        elif segments > 1:
+            s3_uri, stage_metrics = self._convert_and_upload(
+                input,
+                original_filename,
+                segments=segments,
+                duration=duration,
+                trimmer=trimmer,
+            )
+        elif input_metadata:
+            s3_uri, stage_metrics = self._convert_and_upload(
+                input, original_filename, trimmer=trimmer
+            )
+        else:
+            input_metadata = {}
+            s3_uri, stage_metrics = self._convert_and_upload(
+                input, original_filename, input_metadata, trimmer=trimmer
+            )
+
+        if trimmer:
+            stage_metrics.update(self._silence_metrics(trimmer, s3_uri))
+        if probe_time is not None:
+            stage_metrics['probe_time_seconds'] = round(probe_time, 3)
+
+        total_time = time.time() - start_time
+
+        metrics = {
+            'total_processing_time_seconds': round(total_time, 3),
+            'input_metadata': input_metadata,
+            **stage_metrics
+        }
+
+        if self.conversion_cache:
+            metrics['input_sha256'] = input_digest
+            run_in_parent(
+                conversion_cache.store,
+                input_digest,
+                self.conversion_params,
+                s3_uri,
+                metrics,
+            )
+
+        self._save_metrics(metrics, original_filename, s3_uri)
+
+        return s3_uri, metrics
+
+    def process_s3_input(
+        self, s3_uri: str, original_filename: str | None = None
+    ) -> tuple[str, dict]:
+        """Server side variant of `process_input` for media that already is in s3.
+
+        The object is read by ffmpeg straight from s3 and the output is uploaded while
+        it converts, the media never goes through the client and is never copied to
+        local disk as a whole. With S3_INGEST_MODE=presigned (default) ffmpeg gets a
+        short lived presigned url and reads it with http range requests itself, so it
+        can seek (mp4 with the index at the end, parallel segments). With
+        S3_INGEST_MODE=ranged the object is fetched with ranged GETs and piped into
+        ffmpeg stdin, for setups where ffmpeg can't reach s3, limited to streamable
+        containers.
+
+        Cache entries are keyed by the object ETag instead of a content hash, which
+        would need a full read. The output is always uploaded pipelined and wavs are
+        always transcoded.
+        """
+        start_time = time.time()
+        original_filename = original_filename or Path(s3_uri).name
+
+        self._check_extension(s3_uri)
+        head = self.s3_handler.head(s3_uri)
+        input_digest = f"etag:{head['etag']}"
+
+        if self.conversion_cache:
+            cached = self._cached_result(input_digest, start_time)
+            if cached:
+                s3_uri_out, metrics = cached
+                metrics['input_etag'] = head['etag']
+                metrics.pop('input_sha256', None)
+                return s3_uri_out, metrics
+
+        trimmer = SilenceTrimmer() if self.silence_trim else None
+        input_metadata = {}
+        segments, duration, probe_time = 1, None, None
+        if self.s3_ingest_mode == 'ranged':
+            source = self.s3_handler.iter_object(s3_uri, head['size'], head['etag'])
+        else:
+            source = self.s3_handler.presigned_url(s3_uri)
+
+        try:
+            if (
+                isinstance(source, str)
+                and self.parallel_conversion
+                and head['size'] >= self.parallel_min_bytes
+            ):
+                input_metadata, probe_time = self._timed_probe(source)
+                duration = self._duration(input_metadata)
+                segments = self.ffmpeg_handler.segment_count(duration)
+            # a probed input already has its metadata, otherwise the conversion run
+            # fills the empty dict in
+            s3_uri_out, stage_metrics = self._pipelined_upload(
+                source,
+                original_filename,
+                None if probe_time is not None else input_metadata,
+                segments,
+                duration,
+                trimmer,
+                input_size_bytes=head['size'],
+            )
+        except Exception as e:
+            # ffmpeg errors quote the input, don't hand out the presigned url
+            message = (
+                str(e).replace(source, s3_uri) if isinstance(source, str) else str(e)
+            )
+            raise RuntimeError(message) from e
+        stage_metrics['conversion_path'] = 'transcode'
+        if probe_time is not None:
+            stage_metrics['probe_time_seconds'] = round(probe_time, 3)
+        if input_metadata.get('format') is not None:
+            input_metadata['format']['size'] = str(head['size'])
+            input_metadata['format']['filename'] = s3_uri
+        if trimmer:
+            stage_metrics.update(self._silence_metrics(trimmer, s3_uri_out))
+
+        metrics = {
+            'total_processing_time_seconds': round(time.time() - start_time, 3),
+            'input_metadata': input_metadata,
+            **stage_metrics,
+            'input_etag': head['etag'],
+        }
+
+        if self.conversion_cache:
+            run_in_parent(
+                conversion_cache.store,
+                input_digest,
+                self.conversion_params,
+                s3_uri_out,
+                metrics,
+            )
+
+        self._save_metrics(metrics, original_filename, s3_uri_out)
+
+        return s3_uri_out, metrics
+
+    def process_stream(
+        self, chunks: Iterable[bytes], original_filename: str
+    ) -> tuple[str, dict]:
+        """Streaming variant of `process_input`.
+
+        The upload chunks are piped straight into ffmpeg instead of being written to a
+        temp file first, so memory stays bounded to a few chunks regardless of the input
+        size. `input_metadata` comes from what ffmpeg logs about the piped input (no
+        size, and no duration for containers that only store it at the end). The content
+        hash is computed as the chunks stream through; it is only known once the
+        conversion is done, so this path populates the conversion cache but can't skip
+        work.
+        """
+        start_time = time.time()
+
+        self._check_extension(original_filename)
+
+        hasher = hashlib.sha256()
+        input_metadata = {}
+        trimmer = SilenceTrimmer() if self.silence_trim else None
+        s3_uri, stage_metrics = self._convert_and_upload(
+            hashing(chunks, hasher), original_filename, input_metadata, trimmer=trimmer
+        )
+        if trimmer:
+            stage_metrics.update(self._silence_metrics(trimmer, s3_uri))
+
+        total_time = time.time() - start_time
+
+        metrics = {
+            'total_processing_time_seconds': round(total_time, 3),
+            'input_metadata': input_metadata,
+            **stage_metrics
+        }
+
+        if self.conversion_cache:
+            metrics['input_sha256'] = hasher.hexdigest()
+            run_in_parent(
+                conversion_cache.store,
+                metrics['input_sha256'],
+                self.conversion_params,
+                s3_uri,
+                metrics,
+            )
+
+        self._save_metrics(metrics, original_filename, s3_uri)
+
+        return s3_uri, metrics
+
+
+def shared_input_handler() -> tuple[InputHandler, float]:
+    """Process wide handler, created on first use so its s3 connection pool is reused.
+
+    Returns the handler and the seconds spent creating it during this call (0 once it
+    exists).
+    """
+    global _shared_handler
+    with _shared_lock:
+        if _shared_handler is not None:
+            return _shared_handler, 0.0
+        start_time = time.time()
+        _shared_handler = InputHandler()
+        return _shared_handler, time.time() - start_time
+
+
+def process_file(
+    file_path: str, filename: str, input_digest: str | None = None
+) -> tuple[str, dict]:
+    """Blocking pipeline for a file, module level so process pools can pickle it."""
+    handler, creation_time = shared_input_handler()
+    s3_uri, metrics = handler.process_input(file_path, filename, input_digest)
+    metrics['client_creation_time_seconds'] = round(creation_time, 3)
+    return s3_uri, metrics
+
+
+def process_chunks(chunks: Iterable[bytes], filename: str) -> tuple[str, dict]:
+    """Run the blocking pipeline for a stream of upload chunks."""
+    handler, creation_time = shared_input_handler()
+    s3_uri, metrics = handler.process_stream(chunks, filename)
+    metrics['client_creation_time_seconds'] = round(creation_time, 3)
+    return s3_uri, metrics
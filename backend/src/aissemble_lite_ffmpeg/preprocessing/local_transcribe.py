@@ -0,0 +1,522 @@
+# Copyright 2025 Booz Allen Hamilton.
+#
+# Booz Allen Hamilton Confidential Information.
+#
+# The contents of this file are the intellectual property of
+# Booz Allen Hamilton, Inc. ("BAH") and are subject to copyright protection
+# under the laws of the United States and other countries.
+#
+# You acknowledge that misappropriation, misuse, or redistribution of content
+# on the file could cause irreparable harm to BAH and/or to third parties.
+#
+# You may not copy, reproduce, distribute, publish, display, execute, modify,
+# create derivative works of, transmit, sell or offer for resale, or in any way
+# exploit any part of this code or program without BAH's express written permission.
+#
+# The contents of this code or program contains code
+# that is itself or was created using artificial intelligence.
+#
+# To the best of our knowledge, this code does not infringe third-party intellectual
+# property rights, contain errors, inaccuracies, bias, or security concerns.
+#
+# However, Booz Allen does not warrant, claim, or provide any implied
+# or express warranty for the aforementioned, nor of merchantability
+# or fitness for purpose.
+#
+# Booz Allen expressly limits liability, whether by contract, tort or in equity
+# for any damage or harm caused by use of this artificial intelligence code or program.
+#
+# Booz Allen is providing this code or program "as is" with the understanding
+# that any separately negotiated standards of performance for said code
+# or program will be met for the duration of any applicable contract under which
+# the code or program is provided.
+
+"""Local transcription engine, an in-process alternative to AWS Transcribe.
+
+A speech model is loaded once and kept warm on the thread of a `MicroBatcher`, which
+coalesces concurrent requests into batches. Audio goes to the model as the 16kHz mono
+PCM `FfmpegHandler` produces, straight from memory, so a short clip is transcribed in
+seconds without a job queue or a round trip through S3.
+"""
+
+import asyncio
+import bisect
+import importlib
+import logging
+import os
+import threading
+import time
+from collections.abc import Callable, Iterator
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+import numpy as np
+
+from ..batching import MicroBatcher
+from ..instrumentation import instrumentation
+from .ffmpeg_handler import CHANNELS, SAMPLE_RATE
+from .transcribe import TranscriptionResult, transcription_output_uri
+
+if TYPE_CHECKING:
+    from .input_handler import InputHandler
+
+logger = logging.getLogger(__name__)
+
+_shared_lock = threading.Lock()
+_shared_service: "LocalTranscriptionService | None" = None
+
+# bytes per second of the PCM FfmpegHandler produces (s16le)
+PCM_BYTES_PER_SECOND = SAMPLE_RATE * CHANNELS * 2
+
+
+class FasterWhisperEngine:
+    """Whisper model run with faster-whisper (CTranslate2) on the CPU.
+
+    Needs the optional dependency: `pip install aissemble-lite-ffmpeg[local]`.
+
+    The clips of a batch are decoded together: each clip is cut into speech windows of
+    at most 30s (the model's input length) with the Silero VAD, and the windows of all
+    clips go through faster-whisper's `BatchedInferencePipeline`, which encodes and
+    decodes `LOCAL_TRANSCRIBE_DECODE_BATCH_SIZE` windows per model call.
+
+    Configured with environment variables:
+    - LOCAL_TRANSCRIBE_MODEL: model size or path of a converted model (default: base.en)
+    - LOCAL_TRANSCRIBE_COMPUTE_TYPE: CTranslate2 compute type (default: int8)
+    - LOCAL_TRANSCRIBE_THREADS: CPU threads of the model (default: 0, CTranslate2 picks)
+    - LOCAL_TRANSCRIBE_BEAM_SIZE: beam size (default: 1, greedy decoding)
+    - LOCAL_TRANSCRIBE_DECODE_BATCH_SIZE: windows per model call (default: 8)
+    """
+
+    name = "faster-whisper"
+
+    # shorter speech windows are dropped, keeps the window starts apart (see below)
+    min_window_seconds = 0.1
+
+    def __init__(self, model_path: str | None = None) -> None:
+        """Load the model, this is the slow part and happens once per process.
+
+        Args:
+            model_path: model size or path, LOCAL_TRANSCRIBE_MODEL if not given.
+        """
+        try:
+            from faster_whisper import BatchedInferencePipeline, WhisperModel
+        except ImportError as e:
+            msg = (
+                "The local transcription engine needs faster-whisper: "
+                "pip install aissemble-lite-ffmpeg[local]"
+            )
+            raise RuntimeError(msg) from e
+
+        self.model_name = model_path or os.environ.get(
+            "LOCAL_TRANSCRIBE_MODEL", "base.en"
+        )
+        self.beam_size = int(os.environ.get("LOCAL_TRANSCRIBE_BEAM_SIZE", "1"))
+        self.language = os.environ.get("LOCAL_TRANSCRIBE_LANGUAGE", "en")
+        self.decode_batch_size = int(
+            os.environ.get("LOCAL_TRANSCRIBE_DECODE_BATCH_SIZE", "8")
+        )
+        start = time.time()
+        self.model = WhisperModel(
+            self.model_name,
+            device="cpu",
+            compute_type=os.environ.get("LOCAL_TRANSCRIBE_COMPUTE_TYPE", "int8"),
+            cpu_threads=int(os.environ.get("LOCAL_TRANSCRIBE_THREADS", "0")),
+        )
+        self.pipeline = BatchedInferencePipeline(self.model)
+        logger.info(f"loaded {self.model_name} in {time.time() - start:.1f}s")
+
+    def speech_windows(self, audio: np.ndarray) -> list[tuple[int, int]]:
+        """`(start, end)` samples of the speech in a clip, each window at most 30s.
+
+        Consecutive speech regions are merged while they fit in one window, so the
+        model sees as few, as full windows as the pauses allow.
+        """
+        from faster_whisper.vad import VadOptions, get_speech_timestamps
+
+        max_samples = self.model.feature_extractor.chunk_length * SAMPLE_RATE
+        regions = get_speech_timestamps(
+            audio,
+            VadOptions(max_speech_duration_s=self.model.feature_extractor.chunk_length),
+        )
+        windows: list[tuple[int, int]] = []
+        for region in regions:
+            if windows and region["end"] - windows[-1][0] <= max_samples:
+                windows[-1] = (windows[-1][0], region["end"])
+            else:
+                windows.append((region["start"], region["end"]))
+        min_samples = self.min_window_seconds * SAMPLE_RATE
+        return [(start, end) for start, end in windows if end - start >= min_samples]
+
+    def transcribe_batch(self, audios: list[np.ndarray]) -> list[list[dict]]:
+        """Transcribe float32 16kHz mono clips, returns the segments of each clip.
+
+        The speech windows of all clips are transcribed in batched model calls, then
+        the segments are mapped back to their clip and made relative to its start.
+        """
+        results: list[list[dict]] = [[] for _ in audios]
+        # window starts in the concatenated clips, in seconds, with their clip
+        starts: list[float] = []
+        owners: list[tuple[int, float]] = []
+        clip_timestamps = []
+        offset = 0
+        for index, audio in enumerate(audios):
+            for start, end in self.speech_windows(audio):
+                starts.append((offset + start) / SAMPLE_RATE)
+                owners.append((index, offset / SAMPLE_RATE))
+                clip_timestamps.append(
+                    {
+                        "start": (offset + start) / SAMPLE_RATE,
+                        "end": (offset + end) / SAMPLE_RATE,
+                    }
+                )
+            offset += len(audio)
+        if not clip_timestamps:
+            return results
+
+        segments, _ = self.pipeline.transcribe(
+            np.concatenate(audios),
+            language=self.language,
+            beam_size=self.beam_size,
+            clip_timestamps=clip_timestamps,
+            batch_size=self.decode_batch_size,
+            without_timestamps=False,
+        )
+        frames_per_second = self.model.frames_per_second
+        for segment in segments:
+            # seek is the window start in frames, rounded down, and windows start at
+            # least min_window_seconds apart
+            start = segment.seek / frames_per_second + self.min_window_seconds / 2
+            window = bisect.bisect_right(starts, start)
+            index, clip_start = owners[window - 1]
+            results[index].append(
+                {
+                    "start": round(max(segment.start - clip_start, 0.0), 3),
+                    "end": round(max(segment.end - clip_start, 0.0), 3),
+                    "text": segment.text.strip(),
+                }
+            )
+        return results
+
+
+# engines by LOCAL_TRANSCRIBE_ENGINE value, others are imported as "module:factory"
+ENGINES: dict[str, Callable[[str | None], object]] = {
+    "faster-whisper": FasterWhisperEngine,
+}
+
+
+def load_engine(spec: str, model_path: str | None = None) -> object:
+    """Create the engine named by `spec`.
+
+    Args:
+        spec: a name from `ENGINES`, or "module:factory" for another engine (e.g. a
+            whisper.cpp binding) whose factory takes the model path and returns an
+            object with a `name` and `transcribe_batch(audios) -> segments per audio`.
+        model_path: model to load, the engine's default if not given.
+    """
+    if spec in ENGINES:
+        return ENGINES[spec](model_path)
+    module_name, _, factory = spec.partition(":")
+    if not factory:
+        msg = (
+            f"Unknown transcription engine: {spec}. Use one of {sorted(ENGINES)} "
+            "or module:factory"
+        )
+        raise ValueError(msg)
+    return getattr(importlib.import_module(module_name), factory)(model_path)
+
+
+def _input_handler() -> "InputHandler":
+    # imported here, input_handler pulls in the s3 client setup
+    from .input_handler import shared_input_handler
+
+    return shared_input_handler()[0]
+
+
+def pcm_stream(source: str) -> Iterator[bytes]:
+    """Yield 16kHz mono s16le PCM of a local file or S3 object as ffmpeg produces it.
+
+    S3 objects are read the way `/audio/process/s3` reads them (S3_INGEST_MODE).
+    """
+    handler = _input_handler()
+    reader = source
+    if source.startswith("s3://"):
+        head = handler.s3_handler.head(source)
+        if handler.s3_ingest_mode == "ranged":
+            reader = handler.s3_handler.iter_object(source, head["size"], head["etag"])
+        else:
+            reader = handler.s3_handler.presigned_url(source)
+
+    try:
+        yield from handler.ffmpeg_handler.stream_to_pcm(reader)
+    except RuntimeError as e:
+        # ffmpeg errors quote the input, don't hand out the presigned url
+        message = str(e).replace(reader, source) if isinstance(reader, str) else str(e)
+        raise RuntimeError(message) from e
+
+
+def decode_pcm(source: str, max_seconds: float) -> bytes:
+    """Convert a local file or S3 object to PCM in memory, see `pcm_stream`.
+
+    Raises:
+        ValueError: If the audio is longer than `max_seconds`.
+    """
+    limit = int(max_seconds * PCM_BYTES_PER_SECOND)
+    pcm = bytearray()
+    blocks = pcm_stream(source)
+    try:
+        for block in blocks:
+            pcm += block
+            if len(pcm) > limit:
+                msg = f"Audio longer than {max_seconds:g}s: {source}"
+                raise ValueError(msg)
+    finally:
+        # stops ffmpeg when the limit was hit
+        blocks.close()
+    return bytes(pcm)
+
+
+def pcm_to_audio(pcm: bytes) -> np.ndarray:
+    """s16le PCM to the float32 samples in [-1, 1) speech models take."""
+    return np.frombuffer(pcm, dtype=np.int16).astype(np.float32) / 32768.0
+
+
+def transcript_document(name: str, segments: list[dict]) -> dict:
+    """Transcript in the shape of an AWS Transcribe output json.
+
+    Only `results.transcripts` and `results.audio_segments` are filled, so readers of
+    Transcribe output work with both backends.
+    """
+    return {
+        "jobName": name,
+        "status": "COMPLETED",
+        "results": {
+            "transcripts": [
+                {"transcript": " ".join(s["text"] for s in segments if s["text"])}
+            ],
+            "audio_segments": [
+                {
+                    "id": index,
+                    "transcript": segment["text"],
+                    "start_time": f"{segment['start']:.3f}",
+                    "end_time": f"{segment['end']:.3f}",
+                }
+                for index, segment in enumerate(segments)
+            ],
+        },
+    }
+
+
+class LocalTranscriptionService:
+    """Transcription backend running a local engine, drop-in for `TranscriptionService`.
+
+    Configured with environment variables:
+    - LOCAL_TRANSCRIBE_ENGINE: engine to load (default: faster-whisper)
+    - LOCAL_TRANSCRIBE_BATCH_SIZE: most clips run through the model at once (default: 4)
+    - LOCAL_TRANSCRIBE_BATCH_WAIT_MS: longest a clip waits for others to batch with
+      (default: 50)
+    - LOCAL_TRANSCRIBE_MAX_CONCURRENT: clips decoded and queued at once (default: 8)
+    - LOCAL_TRANSCRIBE_MAX_SECONDS: longest audio accepted, it is held in memory
+      (default: 1800)
+    - LOCAL_TRANSCRIBE_UPLOAD_OUTPUT: store transcripts of S3 inputs where Transcribe
+      would put them (default: true)
+    """
+
+    def __init__(self, engine: object | None = None) -> None:
+        """Initialize the service and load the engine.
+
+        Args:
+            engine: Engine to use instead of loading LOCAL_TRANSCRIBE_ENGINE (e.g. a
+                fake in tests).
+        """
+        self.engine = engine or load_engine(
+            os.environ.get("LOCAL_TRANSCRIBE_ENGINE", "faster-whisper")
+        )
+        self.max_concurrent_jobs = int(
+            os.environ.get("LOCAL_TRANSCRIBE_MAX_CONCURRENT", "8")
+        )
+        # bounds the uploads decoded at once by /transcribe/upload
+        self.slots = asyncio.Semaphore(self.max_concurrent_jobs)
+        self.max_seconds = float(os.environ.get("LOCAL_TRANSCRIBE_MAX_SECONDS", "1800"))
+        self.upload_output = (
+            os.environ.get("LOCAL_TRANSCRIBE_UPLOAD_OUTPUT", "true").lower() == "true"
+        )
+        batch_wait_ms = float(os.environ.get("LOCAL_TRANSCRIBE_BATCH_WAIT_MS", "50"))
+        self.batcher = MicroBatcher(
+            self.engine.transcribe_batch,
+            max_batch_size=int(os.environ.get("LOCAL_TRANSCRIBE_BATCH_SIZE", "4")),
+            max_wait_seconds=batch_wait_ms / 1000,
+            name="local_transcribe",
+        )
+
+    @property
+    def cache_params(self) -> str:
+        """Settings that change the transcript, part of the result cache key."""
+        settings = (
+            self.engine.name,
+            getattr(self.engine, "model_name", None),
+            getattr(self.engine, "language", None),
+        )
+        return "-".join(["local", *(str(setting) for setting in settings if setting)])
+
+    def decode(self, source: str) -> bytes:
+        """Convert a local file or S3 object to PCM in memory, see `decode_pcm`."""
+        return decode_pcm(source, self.max_seconds)
+
+    async def segments_async(self, pcm: bytes) -> tuple[list[dict], dict]:
+        """Run PCM through the batched engine.
+
+        Returns:
+            The `{start, end, text}` segments of the audio and the batching metrics.
+        """
+        with instrumentation.timer(
+            "aissemble_stage_duration_seconds", stage="local_transcribe"
+        ):
+            return await asyncio.wrap_future(self.batcher.submit(pcm_to_audio(pcm)))
+
+    async def transcribe_pcm_async(
+        self, pcm: bytes, name: str, output_uri: str | None = None
+    ) -> TranscriptionResult:
+        """Transcribe 16kHz mono s16le PCM held in memory.
+
+        Args:
+            pcm: the audio, as produced by `FfmpegHandler.stream_to_pcm`.
+            name: reported as the result's `s3_uri` (the S3 URI or uploaded filename).
+            output_uri: S3 URI the transcript json is stored at, not stored if not
+                given.
+
+        Returns:
+            TranscriptionResult with the transcript inline and the batching metrics.
+        """
+        audio_seconds = len(pcm) / PCM_BYTES_PER_SECOND
+        try:
+            segments, batch_metrics = await self.segments_async(pcm)
+            transcript = transcript_document(Path(name).stem, segments)
+            if output_uri:
+                s3_handler = _input_handler().s3_handler
+                await asyncio.to_thread(s3_handler.put_json, output_uri, transcript)
+        except Exception as e:
+            instrumentation.inc("aissemble_transcription_jobs_total", outcome="failed")
+            return TranscriptionResult(s3_uri=name, success=False, error=str(e))
+
+        instrumentation.inc("aissemble_transcription_jobs_total", outcome="completed")
+        run_seconds = batch_metrics["batch_run_seconds"]
+        # audio seconds transcribed per second of model time, shared by the batch
+        realtime_factor = round(audio_seconds / run_seconds, 1) if run_seconds else None
+        return TranscriptionResult(
+            s3_uri=name,
+            success=True,
+            s3_output_uri=output_uri,
+            transcript=transcript,
+            metrics={
+                "engine": self.engine.name,
+                "audio_seconds": round(audio_seconds, 3),
+                **batch_metrics,
+                "realtime_factor": realtime_factor,
+            },
+        )
+
+    async def transcribe_s3_file_async(
+        self,
+        s3_uri: str,
+        semaphore: asyncio.Semaphore,
+        duration_seconds: float | None = None,  # noqa: ARG002
+        poller: object | None = None,  # noqa: ARG002
+        tag: str | None = None,  # noqa: ARG002
+    ) -> TranscriptionResult:
+        """Transcribe a media file from S3 with the local engine.
+
+        Same signature as `TranscriptionService.transcribe_s3_file_async`, the
+        polling arguments are ignored. The transcript is returned inline and, with
+        LOCAL_TRANSCRIBE_UPLOAD_OUTPUT, stored at the URI Transcribe would use.
+
+        Args:
+            s3_uri: S3 URI of the media file (e.g., s3://bucket/key.flac).
+            semaphore: Limits the number of files decoded and queued at once.
+            duration_seconds: Unused, the audio is decoded anyway.
+            poller: Unused.
+            tag: Unused.
+
+        Returns:
+            TranscriptionResult with status, transcript and output path.
+        """
+        async with semaphore:
+            instrumentation.add("aissemble_transcription_jobs_in_flight", 1)
+            try:
+                decode_start = time.time()
+                try:
+                    pcm = await asyncio.to_thread(self.decode, s3_uri)
+                except Exception as e:
+                    instrumentation.inc(
+                        "aissemble_transcription_jobs_total", outcome="failed"
+                    )
+                    return TranscriptionResult(
+                        s3_uri=s3_uri, success=False, error=str(e)
+                    )
+                decode_seconds = time.time() - decode_start
+
+                output_uri = (
+                    transcription_output_uri(s3_uri) if self.upload_output else None
+                )
+                result = await self.transcribe_pcm_async(pcm, s3_uri, output_uri)
+                if result.success:
+                    result.metrics["decode_seconds"] = round(decode_seconds, 3)
+                return result
+            finally:
+                instrumentation.add("aissemble_transcription_jobs_in_flight", -1)
+
+    async def transcribe_all_async(
+        self,
+        s3_uris: list[str],
+        on_result: Callable[[TranscriptionResult], None] | None = None,
+        durations: dict[str, float] | None = None,
+    ) -> list[TranscriptionResult]:
+        """Transcribe multiple media files from S3 concurrently.
+
+        Args:
+            s3_uris: List of S3 URIs to transcribe.
+            on_result: Optional callback invoked as each file finishes.
+            durations: Unused, accepted for `TranscriptionService` compatibility.
+
+        Returns:
+            List of TranscriptionResult in the same order as `s3_uris`.
+        """
+        semaphore = asyncio.Semaphore(self.max_concurrent_jobs)
+        durations = durations or {}
+
+        async def transcribe(s3_uri: str) -> TranscriptionResult:
+            result = await self.transcribe_s3_file_async(
+                s3_uri, semaphore, duration_seconds=durations.get(s3_uri)
+            )
+            if on_result:
+                on_result(result)
+            return result
+
+        return list(await asyncio.gather(*(transcribe(uri) for uri in s3_uris)))
+
+    def close(self) -> None:
+        """Stop the batcher thread after the queued clips."""
+        self.batcher.close()
+
+
+def shared_local_service() -> tuple[LocalTranscriptionService, float]:
+    """Process wide local service, so the model is loaded once and stays warm.
+
+    Returns:
+        The service and the seconds spent creating it during this call (0 once it
+        exists).
+    """
+    global _shared_service
+    with _shared_lock:
+        if _shared_service is not None:
+            return _shared_service, 0.0
+        start = time.time()
+        _shared_service = LocalTranscriptionService()
+        return _shared_service, time.time() - start
+
+
+def close_shared_local_service() -> None:
+    """Stop the batcher of the shared service, if one was created."""
+    with _shared_lock:
+        service = _shared_service
+    if service is not None:
+        service.close()
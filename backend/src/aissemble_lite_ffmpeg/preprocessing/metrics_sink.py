@@ -0,0 +1,288 @@
+# Copyright 2025 Booz Allen Hamilton.
+#
+# Booz Allen Hamilton Confidential Information.
+#
+# The contents of this file are the intellectual property of
+# Booz Allen Hamilton, Inc. ("BAH") and are subject to copyright protection
+# under the laws of the United States and other countries.
+#
+# You acknowledge that misappropriation, misuse, or redistribution of content
+# on the file could cause irreparable harm to BAH and/or to third parties.
+#
+# You may not copy, reproduce, distribute, publish, display, execute, modify,
+# create derivative works of, transmit, sell or offer for resale, or in any way
+# exploit any part of this code or program without BAH's express written permission.
+#
+# The contents of this code or program contains code
+# that is itself or was created using artificial intelligence.
+#
+# To the best of our knowledge, this code does not infringe third-party intellectual
+# property rights, contain errors, inaccuracies, bias, or security concerns.
+#
+# However, Booz Allen does not warrant, claim, or provide any implied
+# or express warranty for the aforementioned, nor of merchantability
+# or fitness for purpose.
+#
+# Booz Allen expressly limits liability, whether by contract, tort or in equity
+# for any damage or harm caused by use of this artificial intelligence code or program.
+#
+# Booz Allen is providing this code or program "as is" with the understanding
+# that any separately negotiated standards of performance for said code
+# or program will be met for the duration of any applicable contract under which
+# the code or program is provided.
+
+"""Buffered background writer for per request metrics."""
+
+import bisect
+import contextlib
+import functools
+import json
+import logging
+import os
+import queue
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+# stage timings aggregated into histograms
+STAGE_FIELDS = (
+    "total_processing_time_seconds",
+    "ffmpeg_conversion_time_seconds",
+    "s3_upload_time_seconds",
+    "s3_upload_tail_seconds",
+    "encode_time_seconds",
+    "client_creation_time_seconds",
+)
+# upper bounds of the histogram buckets in seconds, x2.5 steps from 10ms to 30min
+# fmt: off
+BUCKETS = (
+    0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 1800,
+)
+# fmt: on
+
+_STOP = object()
+
+
+class Histogram:
+    """Fixed bucket histogram of one stage timing."""
+
+    def __init__(self, bounds: tuple = BUCKETS):
+        """Empty histogram with buckets up to each of `bounds`."""
+        self.bounds = bounds
+        # last bucket holds everything above the largest bound
+        self.counts = [0] * (len(bounds) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        """Count one timing."""
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def quantile(self, q: float) -> float | None:
+        """Estimate by linear interpolation in the bucket the quantile falls into."""
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for index, bucket_count in enumerate(self.counts):
+            if bucket_count and seen + bucket_count >= rank:
+                lower = self.bounds[index - 1] if index > 0 else 0.0
+                upper = (
+                    self.bounds[index] if index < len(self.bounds) else self.bounds[-1]
+                )
+                return round(lower + (upper - lower) * (rank - seen) / bucket_count, 4)
+            seen += bucket_count
+        return self.bounds[-1]
+
+    def to_dict(self) -> dict:
+        """Count, sum, quantiles and cumulative bucket counts."""
+        cumulative = 0
+        buckets = {}
+        for bound, bucket_count in zip(
+            (*self.bounds, "+Inf"), self.counts, strict=True
+        ):
+            cumulative += bucket_count
+            buckets[str(bound)] = cumulative
+        return {
+            "count": self.count,
+            "sum": round(self.sum, 4),
+            "p50": self.quantile(0.5),
+            "p95": self.quantile(0.95),
+            "p99": self.quantile(0.99),
+            "buckets": buckets,
+        }
+
+
+class MetricsSink:
+    """Appends metrics records to rotating JSONL segments from a background thread.
+
+    `record` only puts the record on a bounded queue, it never waits for disk; when the
+    queue is full the record is dropped and counted instead. The writer thread buffers
+    records and writes them out once `flush_records` are pending or `flush_seconds`
+    passed, starts a new segment once the current one reaches `max_segment_bytes` and
+    deletes its oldest segments beyond `max_segments` (segment names carry the pid, so
+    processes sharing the directory keep their own). Stage timings are aggregated into
+    histograms as records arrive.
+    """
+
+    def __init__(
+        self,
+        directory: str | None = None,
+        max_segment_bytes: int | None = None,
+        max_segments: int | None = None,
+        flush_records: int | None = None,
+        flush_seconds: float | None = None,
+        max_queued: int | None = None,
+    ):
+        """Start the writer thread, unset limits come from the METRICS_* variables."""
+        self.directory = Path(directory or os.getenv("METRICS_DIR", "output/metrics"))
+        self.max_segment_bytes = max_segment_bytes or int(
+            float(os.getenv("METRICS_SEGMENT_MB", "16")) * 1024 * 1024
+        )
+        self.max_segments = max_segments or int(os.getenv("METRICS_MAX_SEGMENTS", "20"))
+        self.flush_records = flush_records or int(
+            os.getenv("METRICS_FLUSH_RECORDS", "100")
+        )
+        self.flush_seconds = flush_seconds or float(
+            os.getenv("METRICS_FLUSH_SECONDS", "5")
+        )
+        self._queue = queue.Queue(
+            maxsize=max_queued or int(os.getenv("METRICS_MAX_QUEUED", "10000"))
+        )
+        self._lock = threading.Lock()
+        self._histograms = {field: Histogram() for field in STAGE_FIELDS}
+        self._segment: Path | None = None
+        self._segment_bytes = 0
+        self._segment_seq = 0
+        self.recorded = 0
+        self.dropped = 0
+        self.written = 0
+        self._stopping = threading.Event()
+        self._thread = threading.Thread(
+            target=self._run, name="metrics-sink", daemon=True
+        )
+        self._thread.start()
+
+    def record(self, filename: str, s3_uri: str, metrics: dict) -> None:
+        """Queue one request's metrics, returns right away."""
+        # shallow copy, callers keep adding fields to their dict while the writer
+        # serializes it
+        record = {
+            "timestamp": time.time(),
+            "filename": filename,
+            "s3_uri": s3_uri,
+            "metrics": dict(metrics),
+        }
+        try:
+            self._queue.put_nowait(record)
+        except queue.Full:
+            with self._lock:
+                self.dropped += 1
+            logger.warning(f"metrics queue full, dropped record for {filename}")
+            return
+        with self._lock:
+            self.recorded += 1
+
+    def histograms(self) -> dict:
+        """Aggregated stage timings of everything recorded since the process started."""
+        with self._lock:
+            return {
+                "records": self.recorded,
+                "dropped": self.dropped,
+                "written": self.written,
+                "stages": {
+                    field: histogram.to_dict()
+                    for field, histogram in self._histograms.items()
+                },
+            }
+
+    def close(self, timeout: float = 10) -> None:
+        """Write out what is still buffered and stop the writer thread.
+
+        Waits at most `timeout` seconds, also when the queue is full.
+        """
+        deadline = time.monotonic() + timeout
+        # the writer stops once the queue ran dry, even if the marker doesn't fit
+        self._stopping.set()
+        with contextlib.suppress(queue.Full):
+            self._queue.put(_STOP, timeout=timeout)
+        self._thread.join(max(0.0, deadline - time.monotonic()))
+
+    def _observe(self, metrics: dict) -> None:
+        with self._lock:
+            for field, histogram in self._histograms.items():
+                value = metrics.get(field)
+                if isinstance(value, int | float):
+                    histogram.observe(value)
+
+    def _run(self) -> None:
+        buffer = []
+        deadline = time.monotonic() + self.flush_seconds
+        while True:
+            try:
+                item = self._queue.get(timeout=max(0.0, deadline - time.monotonic()))
+            except queue.Empty:
+                item = None
+            if item is not None and item is not _STOP:
+                self._observe(item["metrics"])
+                buffer.append(json.dumps(item, separators=(",", ":"), default=str))
+            if item is _STOP or (self._stopping.is_set() and self._queue.empty()):
+                self._flush(buffer)
+                return
+            if len(buffer) >= self.flush_records or time.monotonic() >= deadline:
+                self._flush(buffer)
+                buffer = []
+                deadline = time.monotonic() + self.flush_seconds
+
+    def _flush(self, lines: list[str]) -> None:
+        if not lines:
+            return
+        try:
+            if self._segment is None or self._segment_bytes >= self.max_segment_bytes:
+                self._rotate()
+            data = ("\n".join(lines) + "\n").encode()
+            with self._segment.open("ab") as f:
+                f.write(data)
+            self._segment_bytes += len(data)
+            with self._lock:
+                self.written += len(lines)
+        except Exception as e:
+            # losing metrics is better than killing the writer thread
+            logger.warning(f"failed to write {len(lines)} metrics records: {e}")
+
+    def _rotate(self) -> None:
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self._segment_seq += 1
+        timestamp = datetime.now().strftime("%Y%m%d-%H%M%S")
+        pid = os.getpid()
+        self._segment = (
+            self.directory / f"metrics-{timestamp}-{pid}-{self._segment_seq:04d}.jsonl"
+        )
+        self._segment_bytes = 0
+        # only this process' segments, other workers may write to the same directory
+        segments = sorted(
+            self.directory.glob(f"metrics-????????-??????-{pid}-*.jsonl"),
+            key=lambda p: p.stat().st_mtime,
+        )
+        for old_segment in segments[: max(0, len(segments) - self.max_segments + 1)]:
+            old_segment.unlink(missing_ok=True)
+            logger.info(f"removed old metrics segment {old_segment}")
+
+
+@functools.cache
+def default_sink() -> MetricsSink:
+    """Process wide sink instance."""
+    return MetricsSink()
+
+
+def record(filename: str, s3_uri: str, metrics: dict) -> None:
+    """`record` on the process wide sink.
+
+    Module level so process pool workers can hand the call to the parent.
+    """
+    default_sink().record(filename, s3_uri, metrics)
@@ -1,20 +1,88 @@
+from collections import deque
+from collections.abc import Callable, Iterable, Iterator
+from concurrent.futures import ThreadPoolExecutor, wait
+from datetime import datetime
+from itertools import islice
 from pathlib import Path
+import json
 import re
+import threading
 import time
-import boto3
+import uuid
 import os
 import logging
-from typing import Optional
+
+from .aws_clients import create_client
 
 logger = logging.getLogger(__name__)
 
+# s3 rejects multipart parts smaller than 5 MB (except the last one)
+MIN_PART_SIZE = 5 * 1024 * 1024
+
+# content types of the formats the service uploads
+CONTENT_TYPES = {
+    '.wav': 'audio/wav',
+    '.flac': 'audio/flac',
+    '.ogg': 'audio/ogg',
+    '.json': 'application/json',
+}
+
 
 class S3Handler():
-    def __init__(self, bucket_name: Optional[str] = None, region: Optional[str] = None):
-        # initialize boto3 s3 client
+    def __init__(
+        self,
+        bucket_name: str | None = None,
+        region: str | None = None,
+        s3_client: object | None = None,
+    ):
+        # initialize boto3 s3 client, pass one in to share its connection pool
         self.bucket_name = bucket_name or os.getenv('S3_BUCKET_NAME', 'aissemble-transcribe')
         self.region = region or os.getenv('AWS_REGION', 'us-east-1')
-        self.s3_client = boto3.client('s3', region_name = self.region)
+        # S3_ENDPOINT_URL points the client at a local stand-in like MinIO
+        self.s3_client = s3_client or create_client(
+            's3', self.region, endpoint_url=os.getenv('S3_ENDPOINT_URL')
+        )
+        self.part_size = max(
+            MIN_PART_SIZE,
+            int(float(os.getenv('S3_MULTIPART_PART_SIZE_MB', '8')) * 1024 * 1024),
+        )
+        self.upload_concurrency = int(os.getenv('S3_MULTIPART_CONCURRENCY', '4'))
+        # reading s3 sources: ranged GET size and ranges fetched ahead, expiry of the
+        # urls handed to ffmpeg
+        self.range_size = int(float(os.getenv('S3_INGEST_RANGE_MB', '8')) * 1024 * 1024)
+        self.download_concurrency = int(os.getenv('S3_INGEST_CONCURRENCY', '4'))
+        self.presign_expires_seconds = int(
+            os.getenv('S3_PRESIGN_EXPIRES_SECONDS', '900')
+        )
+
+    def _build_key(
+        self,
+        original_filename: str | None = None,
+        file_path: str | None = None,
+        extension: str | None = None,
+    ) -> str:
+        """Build a unique `input/` key for an upload.
+
+        The key is a timestamp, a random suffix and the sanitized original filename.
+        The suffix keeps uploads with the same basename in the same second (e.g. batch
+        items) apart. The extension is the one of the uploaded output (`file_path`),
+        `extension` or `.wav`.
+        """
+        if original_filename:
+            base_name = Path(original_filename).stem
+            # keep only alphanumeric, hyphens, and underscores
+            base_name = re.sub(r'[^\w\-]', '_', base_name)
+            # replace multiple underscores with single underscore
+            base_name = re.sub(r'_+', '_', base_name)
+            # remove leading/trailing underscores
+            base_name = base_name.strip('_')
+            extension = extension or (Path(file_path).suffix if file_path else '.wav')
+            filename = f"{base_name}{extension}"
+        else:
+            filename = Path(file_path).name
+
+        timestamp = datetime.now().strftime("%Y%m%d-%H%M%S")
+        return f"input/{timestamp}-{uuid.uuid4().hex[:6]}_{filename}"
 
 
     def upload_file(self, file_path: str, original_filename: str = None) -> tuple[str, dict]:
@@ -27,32 +95,19 @@ class S3Handler():
             Tuple of (s3_uri, metrics_dict)
         """
         try:
-            from datetime import datetime
-
             # collect metrics
             file_size_bytes = os.path.getsize(file_path)
             file_size_mb = file_size_bytes / (1024 * 1024)
 
-            if original_filename:
-                base_name = Path(original_filename).stem
-                # keep only alphanumeric, hyphens, and underscores
-                base_name = re.sub(r'[^\w\-]', '_', base_name)
-                # replace multiple underscores with single underscore
-                base_name = re.sub(r'_+', '_', base_name)
-                # remove leading/trailing underscores
-                base_name = base_name.strip('_')
-                filename = f"{base_name}.wav"
-            else:
-                filename = Path(file_path).name
-
-            timestamp = datetime.now().strftime("%Y%m%d-%H%M%S")
-            s3_key = f"input/{timestamp}_{filename}"
+            s3_key = self._build_key(original_filename, file_path)
             
             logger.info(f"uploading {file_path} to s3://{self.bucket_name}/{s3_key}")
 
             # time upload
             upload_start = time.time()
-            self.s3_client.upload_file(file_path, self.bucket_name, s3_key)
+            self.s3_client.upload_file(
+                file_path, self.bucket_name, s3_key, ExtraArgs=self._extra_args(s3_key)
+            )
             upload_duration = time.time() - upload_start
 
             upload_speed_mbps = file_size_mb / upload_duration if upload_duration > 0 else 0
@@ -71,4 +126,315 @@ class S3Handler():
 
         except Exception as e:
             logger.error(f'Error in s3 upload. file: {file_path}. error: {str(e)}')
-            raise RuntimeError(f"Failed to upload to s3: {str(e)}")
\ No newline at end of file
+            raise RuntimeError(f"Failed to upload to s3: {e}") from e
+
+    def _extra_args(self, s3_key: str) -> dict:
+        """ContentType for the key extension, so objects are served with that type."""
+        content_type = CONTENT_TYPES.get(Path(s3_key).suffix.lower())
+        return {'ContentType': content_type} if content_type else {}
+
+    @staticmethod
+    def sibling_uri(s3_uri: str, suffix: str) -> str:
+        """URI next to the object at `s3_uri`, extension replaced by `suffix`."""
+        bucket, _, key = s3_uri.removeprefix('s3://').partition('/')
+        return f's3://{bucket}/{key.rsplit(".", 1)[0]}{suffix}'
+
+    def upload_json(self, s3_uri: str, suffix: str, data: dict) -> str:
+        """Store `data` as json next to the object at `s3_uri`, see `sibling_uri`."""
+        return self.put_json(self.sibling_uri(s3_uri, suffix), data)
+
+    def put_json(self, s3_uri: str, data: dict) -> str:
+        """Store `data` as a json object at `s3_uri`."""
+        bucket, _, key = s3_uri.removeprefix('s3://').partition('/')
+        try:
+            self.s3_client.put_object(
+                Bucket=bucket,
+                Key=key,
+                Body=json.dumps(data).encode(),
+                ContentType='application/json',
+            )
+        except Exception as e:
+            logger.error(f'Error uploading {s3_uri}. error: {e}')
+            raise RuntimeError(f"Failed to upload to s3: {e}") from e
+        return s3_uri
+
+    def read(self, s3_uri: str) -> tuple[bytes, str]:
+        """Body and ETag of an object, for small objects like json outputs."""
+        bucket, _, key = s3_uri.removeprefix('s3://').partition('/')
+        try:
+            response = self.s3_client.get_object(Bucket=bucket, Key=key)
+        except Exception as e:
+            logger.error(f'Error reading {s3_uri}. error: {e}')
+            raise FileNotFoundError(f"S3 object not available: {s3_uri} ({e})") from e
+        return response['Body'].read(), response['ETag'].strip('"')
+
+    def get_json(self, s3_uri: str) -> dict:
+        """Read a json object, e.g. a transcribe output."""
+        return json.loads(self.read(s3_uri)[0])
+
+    def head(self, s3_uri: str) -> dict:
+        """Size and ETag of an object."""
+        bucket, _, key = s3_uri.removeprefix('s3://').partition('/')
+        try:
+            response = self.s3_client.head_object(Bucket=bucket, Key=key)
+        except Exception as e:
+            logger.error(f'Error reading {s3_uri}. error: {e}')
+            raise FileNotFoundError(f"S3 object not available: {s3_uri} ({e})") from e
+        return {'size': response['ContentLength'], 'etag': response['ETag'].strip('"')}
+
+    def presigned_url(self, s3_uri: str) -> str:
+        """Short lived GET url, lets ffmpeg read (and seek in) the object itself."""
+        bucket, _, key = s3_uri.removeprefix('s3://').partition('/')
+        return self.s3_client.generate_presigned_url(
+            'get_object',
+            Params={'Bucket': bucket, 'Key': key},
+            ExpiresIn=self.presign_expires_seconds,
+        )
+
+    def iter_object(
+        self, s3_uri: str, size: int, etag: str | None = None
+    ) -> Iterator[bytes]:
+        """Yield an object in order as ranged GETs of `range_size` bytes.
+
+        The next `download_concurrency` ranges are fetched ahead on a thread pool while
+        the caller consumes the current one, so at most that many ranges are held in
+        memory. With `etag` every range is requested with IfMatch, an object replaced
+        mid read fails instead of producing a spliced stream.
+        """
+        bucket, _, key = s3_uri.removeprefix('s3://').partition('/')
+        conditions = {'IfMatch': f'"{etag}"'} if etag else {}
+
+        def fetch(start: int) -> bytes:
+            end = min(start + self.range_size, size) - 1
+            response = self.s3_client.get_object(
+                Bucket=bucket, Key=key, Range=f'bytes={start}-{end}', **conditions
+            )
+            return response['Body'].read()
+
+        pending = deque()
+        offsets = iter(range(0, size, self.range_size))
+        with ThreadPoolExecutor(
+            max_workers=self.download_concurrency, thread_name_prefix='s3-range'
+        ) as executor:
+            try:
+                for start in islice(offsets, self.download_concurrency):
+                    pending.append(executor.submit(fetch, start))
+                while pending:
+                    block = pending.popleft().result()
+                    for start in islice(offsets, 1):
+                        pending.append(executor.submit(fetch, start))
+                    yield block
+            finally:
+                for future in pending:
+                    future.cancel()
+
+    def delete(self, s3_uris: Iterable[str]) -> None:
+        """Delete objects, e.g. intermediate files.
+
+        Best effort, failures are only logged.
+        """
+        keys = {}
+        for s3_uri in s3_uris:
+            bucket, _, key = s3_uri.removeprefix('s3://').partition('/')
+            keys.setdefault(bucket, []).append(key)
+        for bucket, bucket_keys in keys.items():
+            # delete_objects takes up to 1000 keys per call
+            for first in range(0, len(bucket_keys), 1000):
+                batch = [{'Key': key} for key in bucket_keys[first:first + 1000]]
+                try:
+                    response = self.s3_client.delete_objects(
+                        Bucket=bucket, Delete={'Objects': batch, 'Quiet': True}
+                    )
+                    for error in response.get('Errors', []):
+                        logger.warning(
+                            f"Failed to delete s3://{bucket}/{error['Key']}: "
+                            f"{error.get('Message')}"
+                        )
+                except Exception as e:
+                    logger.warning(
+                        f'Failed to delete {len(batch)} objects in {bucket}: {e}'
+                    )
+
+    def exists(self, s3_uri: str) -> bool:
+        """Check that an object is still there, e.g. before handing out a cached uri."""
+        bucket, _, key = s3_uri.removeprefix('s3://').partition('/')
+        try:
+            self.s3_client.head_object(Bucket=bucket, Key=key)
+            return True
+        except Exception as e:
+            logger.info(f'{s3_uri} is not available: {e}')
+            return False
+
+    def _upload_part(
+        self, s3_key: str, upload_id: str, part_number: int, body: bytes
+    ) -> dict:
+        """Upload a single multipart part and time it."""
+        part_start = time.time()
+        response = self.s3_client.upload_part(
+            Bucket=self.bucket_name,
+            Key=s3_key,
+            UploadId=upload_id,
+            PartNumber=part_number,
+            Body=body,
+        )
+        return {
+            'part_number': part_number,
+            'size_bytes': len(body),
+            'upload_time_seconds': round(time.time() - part_start, 3),
+            'etag': response['ETag'],
+        }
+
+    def upload_stream(
+        self,
+        chunks: Iterable[bytes],
+        original_filename: str,
+        header_factory: Callable[[int], bytes] | None = None,
+        extension: str = '.wav',
+    ) -> tuple[str, dict]:
+        """Upload a byte stream with s3 multipart upload while it is being produced.
+
+        Parts are cut from the stream as soon as `part_size` bytes are available and
+        uploaded on a small thread pool, so the producer (ffmpeg) and the network run
+        concurrently. At most `2 * upload_concurrency` parts are buffered at once.
+
+        Args:
+            chunks: iterable of bytes, e.g. the PCM output of ffmpeg
+            original_filename: name used to build the s3 key
+            header_factory: optional callable that gets the total stream size and
+                returns a fixed size header to prepend (e.g. `wav_header`). The first
+                part is held back until the stream ends so the header can be filled in.
+            extension: extension of the streamed format, used for the key and
+                ContentType
+
+        Returns:
+            Tuple of (s3_uri, metrics_dict)
+        """
+        s3_key = self._build_key(original_filename, extension=extension)
+        logger.info(
+            f"streaming upload to s3://{self.bucket_name}/{s3_key} "
+            f"({self.part_size} byte parts)"
+        )
+
+        upload_start = time.time()
+        upload_id = None
+        first_part = None
+        buffer = bytearray()
+        stream_size = 0
+        part_number = 1
+        futures = []
+        # bounds the number of parts held in memory while waiting for the network
+        slots = threading.BoundedSemaphore(self.upload_concurrency * 2)
+        executor = ThreadPoolExecutor(
+            max_workers=self.upload_concurrency, thread_name_prefix='s3-part'
+        )
+
+        def submit(number: int, body: bytes) -> None:
+            slots.acquire()
+            future = executor.submit(self._upload_part, s3_key, upload_id, number, body)
+            future.add_done_callback(lambda _: slots.release())
+            futures.append(future)
+
+        try:
+            for chunk in chunks:
+                buffer += chunk
+                stream_size += len(chunk)
+                while len(buffer) >= self.part_size:
+                    part = bytes(buffer[:self.part_size])
+                    del buffer[:self.part_size]
+                    if first_part is None:
+                        # held until the end so the header can be written with the final
+                        # size
+                        first_part = part
+                        upload_id = self.s3_client.create_multipart_upload(
+                            Bucket=self.bucket_name,
+                            Key=s3_key,
+                            **self._extra_args(s3_key),
+                        )['UploadId']
+                        continue
+                    part_number += 1
+                    submit(part_number, part)
+                # stop reading early if a part already failed
+                for future in futures:
+                    if future.done() and future.exception():
+                        raise future.exception()
+            stream_end = time.time()
+
+            header = header_factory(stream_size) if header_factory else b''
+            output_size_bytes = len(header) + stream_size
+
+            if first_part is None:
+                # everything fit in one part, a plain put is cheaper
+                put_start = time.time()
+                self.s3_client.put_object(
+                    Bucket=self.bucket_name,
+                    Key=s3_key,
+                    Body=header + bytes(buffer),
+                    **self._extra_args(s3_key),
+                )
+                part_timings = [{
+                    'part_number': 1,
+                    'size_bytes': output_size_bytes,
+                    'upload_time_seconds': round(time.time() - put_start, 3),
+                }]
+            else:
+                if buffer:
+                    part_number += 1
+                    submit(part_number, bytes(buffer))
+                submit(1, header + first_part)
+                wait(futures)
+                part_timings = sorted(
+                    (f.result() for f in futures), key=lambda p: p['part_number']
+                )
+                self.s3_client.complete_multipart_upload(
+                    Bucket=self.bucket_name,
+                    Key=s3_key,
+                    UploadId=upload_id,
+                    MultipartUpload={
+                        'Parts': [
+                            {'PartNumber': p['part_number'], 'ETag': p.pop('etag')}
+                            for p in part_timings
+                        ]
+                    },
+                )
+
+            upload_duration = time.time() - upload_start
+            output_size_mb = output_size_bytes / (1024 * 1024)
+            upload_speed_mbps = (
+                output_size_mb / upload_duration if upload_duration > 0 else 0
+            )
+            s3_uri = f"s3://{self.bucket_name}/{s3_key}"
+
+            metrics = {
+                's3_upload_time_seconds': round(upload_duration, 3),
+                # time spent uploading after the producer finished, i.e. what pipelining
+                # didn't hide
+                's3_upload_tail_seconds': round(time.time() - stream_end, 3),
+                's3_upload_speed_mbps': round(upload_speed_mbps, 2),
+                's3_part_count': len(part_timings),
+                's3_part_timings': part_timings,
+                'output_file_size_bytes': output_size_bytes,
+                'output_file_size_mb': round(output_size_mb, 2)
+            }
+
+            logger.info(
+                f'Streaming upload successful: {s3_uri} ({len(part_timings)} '
+                f'parts, {upload_duration:.2f}s)'
+            )
+            return s3_uri, metrics
+
+        except Exception as e:
+            logger.error(f'Error in s3 streaming upload. key: {s3_key}. error: {e}')
+            executor.shutdown(wait=True, cancel_futures=True)
+            if upload_id:
+                try:
+                    self.s3_client.abort_multipart_upload(
+                        Bucket=self.bucket_name, Key=s3_key, UploadId=upload_id
+                    )
+                except Exception as abort_error:
+                    logger.warning(
+                        f'Failed to abort multipart upload {upload_id}: {abort_error}'
+                    )
+            raise RuntimeError(f"Failed to upload to s3: {e}") from e
+
+        finally:
+            executor.shutdown(wait=False)
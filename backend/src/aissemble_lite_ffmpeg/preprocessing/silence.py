@@ -0,0 +1,259 @@
+# Copyright 2025 Booz Allen Hamilton.
+#
+# Booz Allen Hamilton Confidential Information.
+#
+# The contents of this file are the intellectual property of
+# Booz Allen Hamilton, Inc. ("BAH") and are subject to copyright protection
+# under the laws of the United States and other countries.
+#
+# You acknowledge that misappropriation, misuse, or redistribution of content
+# on the file could cause irreparable harm to BAH and/or to third parties.
+#
+# You may not copy, reproduce, distribute, publish, display, execute, modify,
+# create derivative works of, transmit, sell or offer for resale, or in any way
+# exploit any part of this code or program without BAH's express written permission.
+#
+# The contents of this code or program contains code
+# that is itself or was created using artificial intelligence.
+#
+# To the best of our knowledge, this code does not infringe third-party intellectual
+# property rights, contain errors, inaccuracies, bias, or security concerns.
+#
+# However, Booz Allen does not warrant, claim, or provide any implied
+# or express warranty for the aforementioned, nor of merchantability
+# or fitness for purpose.
+#
+# Booz Allen expressly limits liability, whether by contract, tort or in equity
+# for any damage or harm caused by use of this artificial intelligence code or program.
+#
+# Booz Allen is providing this code or program "as is" with the understanding
+# that any separately negotiated standards of performance for said code
+# or program will be met for the duration of any applicable contract under which
+# the code or program is provided.
+
+"""Energy based silence trimming of the converted PCM stream.
+
+Trimmed audio comes with a map of its times back to the original timeline.
+"""
+
+import bisect
+import copy
+import logging
+import os
+from collections import deque
+from collections.abc import Iterable, Iterator
+from typing import TYPE_CHECKING
+
+import numpy as np
+
+from .ffmpeg_handler import SAMPLE_RATE, SAMPLE_WIDTH
+
+if TYPE_CHECKING:
+    from .s3_handler import S3Handler
+
+logger = logging.getLogger(__name__)
+
+# analysis frame, 20ms of 16kHz mono s16le
+FRAME_SAMPLES = SAMPLE_RATE // 50
+FRAME_BYTES = FRAME_SAMPLES * SAMPLE_WIDTH
+
+# the offset map is stored next to the uploaded audio, input/<name>.offsets.json
+OFFSET_MAP_SUFFIX = ".offsets.json"
+# set on transcripts whose times were mapped back, so they are never mapped twice
+ORIGINAL_TIMELINE = "original_timeline"
+
+
+class SilenceTrimmer:
+    """Drops long stretches of silence from a 16kHz mono s16le PCM stream.
+
+    Frames (20ms) whose RMS level is below `threshold_db` (dBFS) are silent. A run of
+    silent frames at least `min_silence_seconds` long is cut down to `keep_seconds` on
+    each side, so speech keeps its natural onset and decay. Shorter pauses are left
+    alone.
+
+    The stream is processed as it goes: memory is bounded by `min_silence_seconds` of
+    audio, regardless of how long a silence is. After `trim` is exhausted, `breakpoints`
+    maps times in the trimmed audio back to the original (see `to_original_time`).
+    """
+
+    def __init__(
+        self,
+        threshold_db: float | None = None,
+        min_silence_seconds: float | None = None,
+        keep_seconds: float | None = None,
+    ):
+        """Unset settings come from the SILENCE_* environment variables."""
+        self.threshold_db = (
+            threshold_db
+            if threshold_db is not None
+            else float(os.getenv("SILENCE_THRESHOLD_DB", "-40"))
+        )
+        self.min_silence_seconds = (
+            min_silence_seconds
+            if min_silence_seconds is not None
+            else float(os.getenv("SILENCE_MIN_SECONDS", "1.0"))
+        )
+        self.keep_seconds = (
+            keep_seconds
+            if keep_seconds is not None
+            else float(os.getenv("SILENCE_KEEP_SECONDS", "0.2"))
+        )
+        self.min_frames = max(1, round(self.min_silence_seconds * 50))
+        self.keep_frames = min(round(self.keep_seconds * 50), self.min_frames // 2)
+        # (trimmed seconds, original seconds) from which on original = trimmed + offset
+        self.breakpoints: list[tuple[float, float]] = []
+        self.removed_samples = 0
+        self.input_samples = 0
+
+    @property
+    def params(self) -> str:
+        """Identifies the trimming settings, part of the conversion cache key."""
+        return (
+            f"silence{self.threshold_db:g}-{self.min_silence_seconds:g}"
+            f"-{self.keep_seconds:g}"
+        )
+
+    @property
+    def removed_seconds(self) -> float:
+        """Seconds of audio cut so far."""
+        return self.removed_samples / SAMPLE_RATE
+
+    def offset_map(self) -> dict:
+        """Return the breakpoints in a json serializable form."""
+        return {
+            "sample_rate": SAMPLE_RATE,
+            "removed_seconds": round(self.removed_seconds, 3),
+            "breakpoints": [
+                [round(trimmed, 4), round(original, 4)]
+                for trimmed, original in self.breakpoints
+            ],
+        }
+
+    def _silent(self, frames: bytes) -> list[bool]:
+        """Per frame silence decision, vectorized over a whole block."""
+        samples = (
+            np.frombuffer(frames, dtype="<i2")
+            .reshape(-1, FRAME_SAMPLES)
+            .astype(np.float32)
+        )
+        rms = np.sqrt(np.mean(samples * samples, axis=1))
+        level_db = 20 * np.log10(np.maximum(rms, 1e-3) / 32768)
+        return (level_db < self.threshold_db).tolist()
+
+    def trim(self, pcm_blocks: Iterable[bytes]) -> Iterator[bytes]:
+        """Yield the PCM with long silences removed."""
+        pending = b""
+        # frames of the current silent run, until it is long enough to cut
+        run = []
+        # last frames of a run that is being cut
+        tail = deque(maxlen=self.keep_frames)
+        # frames in the current silent run
+        run_length = 0
+        # frames read before the current one
+        position = 0
+
+        def close_run() -> bytes:
+            if run_length < self.min_frames:
+                return b"".join(run)
+            cut_frames = run_length - self.keep_frames - len(tail)
+            self.removed_samples += cut_frames * FRAME_SAMPLES
+            # the cut sits where the kept tail starts
+            original = (position - len(tail)) * FRAME_SAMPLES / SAMPLE_RATE
+            self.breakpoints.append((original - self.removed_seconds, original))
+            return b"".join(tail)
+
+        for block in pcm_blocks:
+            pending += block
+            usable = len(pending) - len(pending) % FRAME_BYTES
+            if not usable:
+                continue
+            frames, pending = pending[:usable], pending[usable:]
+            self.input_samples += usable // SAMPLE_WIDTH
+            out = []
+            for index, silent in enumerate(self._silent(frames)):
+                frame = frames[index * FRAME_BYTES : (index + 1) * FRAME_BYTES]
+                if not silent:
+                    if run_length:
+                        out.append(close_run())
+                        run, run_length = [], 0
+                        tail.clear()
+                    out.append(frame)
+                elif run_length + 1 < self.min_frames:
+                    run_length += 1
+                    run.append(frame)
+                elif run_length + 1 == self.min_frames:
+                    # long enough to cut: keep the head, from now on only the last
+                    # keep_frames are held
+                    run_length += 1
+                    run.append(frame)
+                    out.append(b"".join(run[: self.keep_frames]))
+                    tail.extend(run[self.keep_frames :])
+                    run = []
+                else:
+                    run_length += 1
+                    tail.append(frame)
+                position += 1
+            if out:
+                yield b"".join(out)
+
+        if run_length:
+            yield close_run()
+        if pending:
+            self.input_samples += len(pending) // SAMPLE_WIDTH
+            yield pending
+
+
+def to_original_time(seconds: float, breakpoints: list) -> float:
+    """Map a time in the trimmed audio to the original timeline."""
+    index = bisect.bisect_right([trimmed for trimmed, _ in breakpoints], seconds) - 1
+    if index < 0:
+        return seconds
+    trimmed, original = breakpoints[index]
+    return seconds + (original - trimmed)
+
+
+def load_offset_map(s3_handler: "S3Handler", s3_uri: str) -> dict | None:
+    """Offset map stored next to an uploaded object, None if it was not trimmed."""
+    map_uri = s3_handler.sibling_uri(s3_uri, OFFSET_MAP_SUFFIX)
+    if not s3_handler.exists(map_uri):
+        return None
+    return s3_handler.get_json(map_uri)
+
+
+def remap_segments(segments: list[dict], offset_map: dict) -> list[dict]:
+    """Copy of `{start, end, text}` segments with times on the original timeline."""
+    breakpoints = offset_map["breakpoints"]
+    return [
+        {
+            **segment,
+            "start": round(to_original_time(segment["start"], breakpoints), 3),
+            "end": round(to_original_time(segment["end"], breakpoints), 3),
+        }
+        for segment in segments
+    ]
+
+
+def remap_transcript(transcript: dict, offset_map: dict) -> dict:
+    """Copy of an AWS Transcribe output json with times on the original timeline.
+
+    Item and segment times are mapped. The copy is marked with `ORIGINAL_TIMELINE`, a
+    transcript that already is marked is returned as is.
+    """
+    if transcript.get(ORIGINAL_TIMELINE):
+        return transcript
+    breakpoints = offset_map["breakpoints"]
+    remapped = copy.deepcopy(transcript)
+    remapped[ORIGINAL_TIMELINE] = True
+
+    def remap(entry: dict) -> None:
+        for field in ("start_time", "end_time"):
+            if field in entry:
+                seconds = to_original_time(float(entry[field]), breakpoints)
+                entry[field] = f"{seconds:.3f}"
+
+    results = remapped.get("results", {})
+    for item in results.get("items", []):
+        remap(item)
+    for segment in results.get("audio_segments", []):
+        remap(segment)
+    return remapped
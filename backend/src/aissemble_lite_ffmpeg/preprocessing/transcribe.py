@@ -33,13 +33,45 @@
 
 """AWS Transcribe service for transcription of media files in S3."""
 
+import asyncio
+import logging
 import os
+import random
+import threading
 import time
+import uuid
+from collections.abc import Callable
 from dataclasses import dataclass
-from datetime import datetime
+from datetime import UTC, datetime
 from pathlib import Path
+from typing import TYPE_CHECKING
 
-import boto3
+from ..instrumentation import instrumentation
+from .aws_clients import create_client
+
+if TYPE_CHECKING:
+    from .local_transcribe import LocalTranscriptionService
+
+logger = logging.getLogger(__name__)
+
+# fraction of each poll delay that is randomized so jobs don't poll in lockstep
+POLL_JITTER = 0.3
+
+# MediaFormat values transcribe accepts by s3 key extension, opus is uploaded as ogg
+MEDIA_FORMATS = {
+    "wav": "wav",
+    "flac": "flac",
+    "ogg": "ogg",
+    "opus": "ogg",
+    "mp3": "mp3",
+    "mp4": "mp4",
+    "m4a": "m4a",
+    "webm": "webm",
+    "amr": "amr",
+}
+
+_shared_lock = threading.Lock()
+_shared_service: "TranscriptionService | None" = None
 
 
 @dataclass
@@ -50,17 +82,72 @@ class TranscriptionResult:
     success: bool
     s3_output_uri: str | None = None
     error: str | None = None
+    metrics: dict | None = None
+    # the transcript itself, returned inline by the local engine
+    transcript: dict | None = None
+
+
+def transcription_output_uri(s3_uri: str) -> str:
+    """S3 URI of the transcript json of a media file.
+
+    The transcript is output/<stem>_transcription.json in the bucket of the media.
+    """
+    bucket = s3_uri.removeprefix("s3://").split("/", 1)[0]
+    file_stem = Path(s3_uri.split("/")[-1]).stem
+    return f"s3://{bucket}/output/{file_stem}_transcription.json"
 
 
 class TranscriptionService:
     """Service for transcribing media files using AWS Transcribe."""
 
-    def __init__(self) -> None:
-        """Initialize the transcription service."""
+    def __init__(
+        self,
+        transcribe_client: object | None = None,
+        max_concurrent_jobs: int | None = None,
+        poll_interval: float | None = None,
+    ) -> None:
+        """Initialize the transcription service.
+
+        Args:
+            transcribe_client: Client to use instead of a new boto3 Transcribe client
+                (e.g. a fake in tests).
+            max_concurrent_jobs: Jobs running at once in a batch, should match the
+                account's Transcribe concurrent job quota.
+            poll_interval: Shortest delay between status checks of a job.
+        """
         self.region = os.environ.get("AWS_REGION", "us-east-1")
+        self.max_concurrent_jobs = max_concurrent_jobs or int(
+            os.environ.get("TRANSCRIBE_MAX_CONCURRENT_JOBS", "100")
+        )
+        self.poll_interval = poll_interval or float(
+            os.environ.get("TRANSCRIBE_POLL_INTERVAL_SECONDS", "2")
+        )
+        self.poll_max_interval = float(
+            os.environ.get("TRANSCRIBE_POLL_MAX_INTERVAL_SECONDS", "20")
+        )
+        self.poll_backoff = float(os.environ.get("TRANSCRIBE_POLL_BACKOFF", "1.5"))
+        # expected job runtime = overhead + realtime factor * audio duration
+        self.expected_overhead = float(
+            os.environ.get("TRANSCRIBE_EXPECTED_OVERHEAD_SECONDS", "15")
+        )
+        self.expected_realtime_factor = float(
+            os.environ.get("TRANSCRIBE_EXPECTED_REALTIME_FACTOR", "0.25")
+        )
+        # batches at least this large are polled with list_transcription_jobs
+        self.list_poll_threshold = int(
+            os.environ.get("TRANSCRIBE_LIST_POLL_THRESHOLD", "20")
+        )
+        self.language_code = os.environ.get("TRANSCRIBE_LANGUAGE_CODE", "en-US")
 
         # Initialize AWS Transcribe client
-        self.transcribe_client = boto3.client("transcribe", region_name=self.region)
+        self.transcribe_client = transcribe_client or create_client(
+            "transcribe", self.region
+        )
+
+    @property
+    def cache_params(self) -> str:
+        """Settings that change the transcript, part of the result cache key."""
+        return f"aws-{self.language_code}"
 
     def _parse_s3_uri(self, s3_uri: str) -> tuple[str, str]:
         """Parse an S3 URI into bucket and key components.
@@ -90,6 +177,8 @@ class TranscriptionService:
         """
         # Determine media format from file extension
         file_ext = s3_uri.split(".")[-1].lower()
+        if file_ext not in MEDIA_FORMATS:
+            raise ValueError(f"Unsupported media format for transcription: {file_ext}")
 
         # Parse S3 URI to get bucket and construct output path
         bucket, key = self._parse_s3_uri(s3_uri)
@@ -100,13 +189,52 @@ class TranscriptionService:
         self.transcribe_client.start_transcription_job(
             TranscriptionJobName=job_name,
             Media={"MediaFileUri": s3_uri},
-            MediaFormat=file_ext,
-            LanguageCode="en-US",
+            MediaFormat=MEDIA_FORMATS[file_ext],
+            LanguageCode=self.language_code,
             OutputBucketName=bucket,
             OutputKey=output_key,
         )
         return job_name
 
+    def _job_spec(self, s3_uri: str, tag: str | None = None) -> tuple[str, str]:
+        """Build a unique job name and the output URI for a media file.
+
+        Args:
+            s3_uri: S3 URI of the media file (e.g., s3://bucket/key.mp4).
+            tag: Unique suffix for the job name, random if not given. Jobs of a
+                batch share a prefix in their tag so they can be listed together.
+
+        Returns:
+            Tuple of (job_name, s3_output_uri).
+        """
+        _, key = self._parse_s3_uri(s3_uri)
+        file_stem = Path(key.split("/")[-1]).stem
+
+        # Compute S3 output URI (JSON file in output/ folder)
+        s3_output_uri = transcription_output_uri(s3_uri)
+
+        # Generate unique job name with timestamp (MMDDYYYYHHmmss), the random suffix
+        # keeps names unique when a batch is submitted within the same second
+        timestamp = datetime.now().strftime("%m%d%Y%H%M%S")
+        tag = tag or uuid.uuid4().hex[:8]
+        job_name = f"transcribe-{file_stem}-{timestamp}-{tag}"
+        return job_name, s3_output_uri
+
+    @staticmethod
+    def _check_job_status(response: dict) -> bool:
+        """Return True if the job completed, raise if it failed."""
+        status = response["TranscriptionJob"]["TranscriptionJobStatus"]
+
+        if status == "COMPLETED":
+            return True
+        if status == "FAILED":
+            failure_reason = response["TranscriptionJob"].get(
+                "FailureReason", "Unknown error"
+            )
+            msg = f"Transcription job failed: {failure_reason}"
+            raise RuntimeError(msg)
+        return False
+
     def poll_job_status(self, job_name: str, poll_interval: int = 5) -> dict:
         """Poll for transcription job completion.
 
@@ -121,19 +249,92 @@ class TranscriptionService:
             response = self.transcribe_client.get_transcription_job(
                 TranscriptionJobName=job_name
             )
-            status = response["TranscriptionJob"]["TranscriptionJobStatus"]
-
-            if status == "COMPLETED":
+            if self._check_job_status(response):
                 return response
-            if status == "FAILED":
-                failure_reason = response["TranscriptionJob"].get(
-                    "FailureReason", "Unknown error"
-                )
-                msg = f"Transcription job failed: {failure_reason}"
-                raise RuntimeError(msg)
 
             time.sleep(poll_interval)
 
+    def expected_runtime(self, duration_seconds: float | None) -> float | None:
+        """Estimate how long a job takes from the duration of its audio."""
+        if duration_seconds is None:
+            return None
+        return self.expected_overhead + self.expected_realtime_factor * duration_seconds
+
+    def _next_poll_delay(
+        self, elapsed: float, expected_seconds: float | None, attempt: int
+    ) -> float:
+        """Delay before the next status check.
+
+        Until the expected runtime has passed there is nothing to see, so wait it
+        out, however long that is; after that back off exponentially from
+        `poll_interval` up to `poll_max_interval`. Jitter spreads the calls of a batch
+        out to stay clear of API throttling.
+
+        Args:
+            elapsed: Seconds since the job was started.
+            expected_seconds: Estimated job runtime, if known.
+            attempt: Number of checks made since the estimate passed.
+        """
+        if expected_seconds is not None and elapsed < expected_seconds:
+            # bounded by the estimate, the backoff ceiling is for jobs running late
+            delay = expected_seconds - elapsed
+        else:
+            delay = min(
+                self.poll_interval * self.poll_backoff**attempt, self.poll_max_interval
+            )
+        delay = max(delay, self.poll_interval)
+        return delay * random.uniform(1 - POLL_JITTER, 1)  # noqa: S311
+
+    @staticmethod
+    def _added_latency(completion_time: datetime | None) -> float | None:
+        """Seconds between the job completing and us noticing."""
+        if completion_time is None:
+            return None
+        return round(max(0.0, (datetime.now(UTC) - completion_time).total_seconds()), 3)
+
+    async def poll_job_status_async(
+        self, job_name: str, expected_seconds: float | None = None
+    ) -> tuple[dict, dict]:
+        """Poll for transcription job completion without blocking the event loop.
+
+        Args:
+            job_name: The transcription job name.
+            expected_seconds: Estimated job runtime, used to skip early checks.
+
+        Returns:
+            Tuple of (completed job response, polling metrics).
+        """
+        started = time.time()
+        poll_count = 0
+        attempt = 0
+        while True:
+            if poll_count or expected_seconds is not None:
+                elapsed = time.time() - started
+                in_backoff = expected_seconds is None or elapsed >= expected_seconds
+                await asyncio.sleep(
+                    self._next_poll_delay(elapsed, expected_seconds, attempt)
+                )
+                if in_backoff:
+                    attempt += 1
+
+            response = await asyncio.to_thread(
+                self.transcribe_client.get_transcription_job,
+                TranscriptionJobName=job_name,
+            )
+            poll_count += 1
+            if self._check_job_status(response):
+                poll_metrics = {
+                    "poll_mode": "get",
+                    "poll_count": poll_count,
+                    "expected_seconds": expected_seconds,
+                    "job_wait_seconds": round(time.time() - started, 3),
+                    "poll_added_latency_seconds": self._added_latency(
+                        response["TranscriptionJob"].get("CompletionTime")
+                    ),
+                }
+                logger.info(f"{job_name} completed: {poll_metrics}")
+                return response, poll_metrics
+
     def transcribe_s3_file(self, s3_uri: str) -> TranscriptionResult:
         """Transcribe a media file from S3.
 
@@ -144,17 +345,7 @@ class TranscriptionService:
             TranscriptionResult with status and output path.
         """
         try:
-            # Extract filename for job name
-            bucket, key = self._parse_s3_uri(s3_uri)
-            filename = key.split("/")[-1]
-            file_stem = Path(filename).stem
-
-            # Compute S3 output URI (JSON file in output/ folder)
-            s3_output_uri = f"s3://{bucket}/output/{file_stem}_transcription.json"
-
-            # Generate unique job name with timestamp (MMDDYYYYHHmmss)
-            timestamp = datetime.now().strftime("%m%d%Y%H%M%S")
-            job_name = f"transcribe-{file_stem}-{timestamp}"
+            job_name, s3_output_uri = self._job_spec(s3_uri)
 
             # Start transcription job
             self._start_job(s3_uri, job_name)
@@ -190,4 +381,259 @@ class TranscriptionService:
             result = self.transcribe_s3_file(s3_uri)
             results.append(result)
 
-        return results
\ No newline at end of file
+        return results
+
+    async def transcribe_s3_file_async(
+        self,
+        s3_uri: str,
+        semaphore: asyncio.Semaphore,
+        duration_seconds: float | None = None,
+        poller: "_BatchPoller | None" = None,
+        tag: str | None = None,
+    ) -> TranscriptionResult:
+        """Transcribe a media file from S3 without blocking the event loop.
+
+        Args:
+            s3_uri: S3 URI of the media file (e.g., s3://bucket/key.mp4).
+            semaphore: Limits the number of jobs running at once.
+            duration_seconds: Audio duration, used to estimate when the job is done.
+            poller: Shared batch poller, the job is polled on its own if not given.
+            tag: Unique suffix for the job name.
+
+        Returns:
+            TranscriptionResult with status, output path and polling metrics.
+        """
+        async with semaphore:
+            instrumentation.add("aissemble_transcription_jobs_in_flight", 1)
+            try:
+                job_name, s3_output_uri = self._job_spec(s3_uri, tag)
+                expected_seconds = self.expected_runtime(duration_seconds)
+
+                with instrumentation.timer(
+                    "aissemble_stage_duration_seconds", stage="transcribe_submit"
+                ):
+                    await asyncio.to_thread(self._start_job, s3_uri, job_name)
+                with instrumentation.timer(
+                    "aissemble_stage_duration_seconds", stage="transcribe_wait"
+                ):
+                    if poller:
+                        poll_metrics = await poller.wait(job_name, expected_seconds)
+                    else:
+                        _, poll_metrics = await self.poll_job_status_async(
+                            job_name, expected_seconds
+                        )
+
+                instrumentation.inc(
+                    "aissemble_transcription_jobs_total", outcome="completed"
+                )
+                return TranscriptionResult(
+                    s3_uri=s3_uri,
+                    success=True,
+                    s3_output_uri=s3_output_uri,
+                    metrics=poll_metrics,
+                )
+
+            except Exception as e:
+                instrumentation.inc(
+                    "aissemble_transcription_jobs_total", outcome="failed"
+                )
+                return TranscriptionResult(
+                    s3_uri=s3_uri,
+                    success=False,
+                    error=str(e),
+                )
+
+            finally:
+                instrumentation.add("aissemble_transcription_jobs_in_flight", -1)
+
+    async def transcribe_all_async(
+        self,
+        s3_uris: list[str],
+        on_result: Callable[[TranscriptionResult], None] | None = None,
+        durations: dict[str, float] | None = None,
+    ) -> list[TranscriptionResult]:
+        """Transcribe multiple media files from S3 concurrently.
+
+        All jobs are submitted up front (at most `max_concurrent_jobs` at a time)
+        and polled together, so the batch takes about as long as its slowest job.
+        Batches of `list_poll_threshold` or more jobs are polled with one
+        `list_transcription_jobs` query per status instead of a call per job.
+
+        Args:
+            s3_uris: List of S3 URIs to transcribe.
+            on_result: Optional callback invoked as each file finishes.
+            durations: Optional audio duration in seconds per S3 URI
+                (e.g. `input_metadata.format.duration` from `/audio/process`).
+
+        Returns:
+            List of TranscriptionResult in the same order as `s3_uris`.
+        """
+        semaphore = asyncio.Semaphore(self.max_concurrent_jobs)
+        durations = durations or {}
+        batch_id = uuid.uuid4().hex[:8]
+        poller = (
+            _BatchPoller(self, batch_id)
+            if len(s3_uris) >= self.list_poll_threshold
+            else None
+        )
+
+        async def transcribe(index: int, s3_uri: str) -> TranscriptionResult:
+            result = await self.transcribe_s3_file_async(
+                s3_uri,
+                semaphore,
+                duration_seconds=durations.get(s3_uri),
+                poller=poller,
+                tag=f"{batch_id}-{index}",
+            )
+            if on_result:
+                on_result(result)
+            return result
+
+        return list(
+            await asyncio.gather(
+                *(transcribe(index, uri) for index, uri in enumerate(s3_uris))
+            )
+        )
+
+
+class _BatchPoller:
+    """Resolves the jobs of a large batch with `list_transcription_jobs`.
+
+    All job names of a batch contain the batch id, so one paginated list call per
+    final status covers every job instead of one `get_transcription_job` per job.
+    """
+
+    # consecutive failed list rounds before the waiting jobs are failed
+    MAX_FAILURES = 5
+
+    def __init__(self, service: TranscriptionService, batch_id: str) -> None:
+        """Initialize the poller, it starts polling when the first job waits."""
+        self.service = service
+        self.batch_id = batch_id
+        self._waiting: dict[str, dict] = {}
+        self._task: asyncio.Task | None = None
+
+    async def wait(self, job_name: str, expected_seconds: float | None) -> dict:
+        """Wait for a started job to complete.
+
+        Returns:
+            Polling metrics of the job.
+
+        Raises:
+            RuntimeError: If the job failed.
+        """
+        future = asyncio.get_running_loop().create_future()
+        self._waiting[job_name] = {
+            "future": future,
+            "started": time.time(),
+            "expected": expected_seconds,
+            "poll_count": 0,
+        }
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+        return await future
+
+    def _list_finished(self, status: str) -> list[dict]:
+        """All jobs of the batch currently in `status`."""
+        summaries = []
+        kwargs = {"Status": status, "JobNameContains": self.batch_id, "MaxResults": 100}
+        while True:
+            response = self.service.transcribe_client.list_transcription_jobs(**kwargs)
+            summaries.extend(response.get("TranscriptionJobSummaries", []))
+            if not response.get("NextToken"):
+                return summaries
+            kwargs["NextToken"] = response["NextToken"]
+
+    def _next_delay(self, attempt: int) -> float:
+        """Delay before the next round, driven by the job expected to finish first."""
+        now = time.time()
+        remaining = [
+            info["started"] + info["expected"] - now
+            for info in self._waiting.values()
+            if info["expected"] is not None
+        ]
+        if remaining and len(remaining) == len(self._waiting) and min(remaining) > 0:
+            # capped, jobs that join the batch while this sleeps may finish sooner
+            return min(
+                self.service._next_poll_delay(0, min(remaining), attempt),
+                self.service.poll_max_interval,
+            )
+        return self.service._next_poll_delay(0, None, attempt)
+
+    async def _run(self) -> None:
+        attempt = 0
+        failures = 0
+        while self._waiting:
+            await asyncio.sleep(self._next_delay(attempt))
+            attempt += 1
+            try:
+                finished = []
+                for status in ("COMPLETED", "FAILED"):
+                    finished += await asyncio.to_thread(self._list_finished, status)
+            except Exception as e:
+                failures += 1
+                logger.warning(f"Listing jobs of batch {self.batch_id} failed: {e}")
+                if failures >= self.MAX_FAILURES:
+                    for info in self._waiting.values():
+                        if not info["future"].done():
+                            info["future"].set_exception(e)
+                    self._waiting.clear()
+                continue
+            failures = 0
+
+            for info in self._waiting.values():
+                info["poll_count"] += 1
+            for summary in finished:
+                info = self._waiting.pop(summary["TranscriptionJobName"], None)
+                if info is None or info["future"].done():
+                    continue
+                # jobs keep finishing, look again soon
+                attempt = 0
+                if summary["TranscriptionJobStatus"] == "FAILED":
+                    reason = summary.get("FailureReason", "Unknown error")
+                    info["future"].set_exception(
+                        RuntimeError(f"Transcription job failed: {reason}")
+                    )
+                else:
+                    info["future"].set_result({
+                        "poll_mode": "list",
+                        "poll_count": info["poll_count"],
+                        "expected_seconds": info["expected"],
+                        "job_wait_seconds": round(time.time() - info["started"], 3),
+                        "poll_added_latency_seconds": self.service._added_latency(
+                            summary.get("CompletionTime")
+                        ),
+                    })
+
+
+def shared_transcription_service() -> tuple[
+    "TranscriptionService | LocalTranscriptionService", float
+]:
+    """Process wide service, so every request reuses one client and its connection pool.
+
+    Created on first use; the FastAPI lifespan creates it at startup.
+    TRANSCRIPTION_BACKEND picks the backend: `aws` (default, AWS Transcribe) or
+    `local` (`LocalTranscriptionService`, same interface, model run in process).
+
+    Returns:
+        The service and the seconds spent creating it during this call (0 once it
+        exists).
+    """
+    if os.environ.get("TRANSCRIPTION_BACKEND", "aws").lower() == "local":
+        from .local_transcribe import shared_local_service
+
+        return shared_local_service()
+    if os.environ.get("TRANSCRIPTION_BACKEND", "aws").lower() != "aws":
+        msg = (
+            "Unsupported TRANSCRIPTION_BACKEND: "
+            f"{os.environ['TRANSCRIPTION_BACKEND']}. Use 'aws' or 'local'"
+        )
+        raise ValueError(msg)
+
+    global _shared_service
+    with _shared_lock:
+        if _shared_service is not None:
+            return _shared_service, 0.0
+        start = time.time()
+        _shared_service = TranscriptionService()
+        return _shared_service, time.time() - start
@@ -0,0 +1,435 @@
+# Copyright 2025 Booz Allen Hamilton.
+#
+# Booz Allen Hamilton Confidential Information.
+#
+# The contents of this file are the intellectual property of
+# Booz Allen Hamilton, Inc. ("BAH") and are subject to copyright protection
+# under the laws of the United States and other countries.
+#
+# You acknowledge that misappropriation, misuse, or redistribution of content
+# on the file could cause irreparable harm to BAH and/or to third parties.
+#
+# You may not copy, reproduce, distribute, publish, display, execute, modify,
+# create derivative works of, transmit, sell or offer for resale, or in any way
+# exploit any part of this code or program without BAH's express written permission.
+#
+# The contents of this code or program contains code
+# that is itself or was created using artificial intelligence.
+#
+# To the best of our knowledge, this code does not infringe third-party intellectual
+# property rights, contain errors, inaccuracies, bias, or security concerns.
+#
+# However, Booz Allen does not warrant, claim, or provide any implied
+# or express warranty for the aforementioned, nor of merchantability
+# or fitness for purpose.
+#
+# Booz Allen expressly limits liability, whether by contract, tort or in equity
+# for any damage or harm caused by use of this artificial intelligence code or program.
+#
+# Booz Allen is providing this code or program "as is" with the understanding
+# that any separately negotiated standards of performance for said code
+# or program will be met for the duration of any applicable contract under which
+# the code or program is provided.
+
+"""Caches of transcription results.
+
+Which input was already transcribed, and the parsed transcripts.
+"""
+
+import asyncio
+import functools
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Callable
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+from .input_handler import shared_input_handler
+from .silence import load_offset_map, remap_transcript
+from .transcribe import (
+    TranscriptionResult,
+    TranscriptionService,
+    transcription_output_uri,
+)
+
+if TYPE_CHECKING:
+    from .local_transcribe import LocalTranscriptionService
+
+logger = logging.getLogger(__name__)
+
+
+class TranscriptionCache:
+    """Maps input object ETag + transcription settings to the transcript made for it.
+
+    A second `/transcribe` of the same object (or a copy of it under another key) with
+    the same language settings gets the earlier output instead of a new, paid, job.
+    Entries are kept in LRU order, bounded by count, and persisted as json on local disk
+    like the conversion cache index.
+    """
+
+    def __init__(self, index_path: str | None = None, max_entries: int | None = None):
+        """Open the cache, loading the index from disk if there is one."""
+        self.index_path = Path(
+            index_path
+            or os.getenv(
+                "TRANSCRIPTION_CACHE_INDEX", "output/cache/transcription_index.json"
+            )
+        )
+        self.max_entries = max_entries or int(
+            os.getenv("TRANSCRIPTION_CACHE_MAX_ENTRIES", "10000")
+        )
+        self._lock = threading.Lock()
+        self._entries: OrderedDict[str, dict] = OrderedDict()
+        self._load()
+
+    @staticmethod
+    def _key(etag: str, params: str) -> str:
+        return f"{etag}:{params}"
+
+    def _load(self) -> None:
+        if not self.index_path.exists():
+            return
+        try:
+            with self.index_path.open() as f:
+                self._entries = OrderedDict(json.load(f))
+            logger.info(
+                f"loaded {len(self._entries)} transcription cache entries from "
+                f"{self.index_path}"
+            )
+        except Exception as e:
+            logger.warning(
+                f"ignoring unreadable transcription cache index {self.index_path}: {e}"
+            )
+            self._entries = OrderedDict()
+
+    def _save(self) -> None:
+        """Write the index atomically so a crash never leaves a half written file."""
+        self.index_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.index_path.with_suffix(f".{os.getpid()}.tmp")
+        with tmp_path.open("w") as f:
+            json.dump(self._entries, f, separators=(",", ":"))
+        tmp_path.replace(self.index_path)
+
+    def lookup(self, etag: str, params: str) -> dict | None:
+        """Return the cached entry ({'s3_uri', 's3_output_uri'}), mark it as used."""
+        key = self._key(etag, params)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            self._entries.move_to_end(key)
+            entry["last_used"] = time.time()
+            return dict(entry)
+
+    def store(self, etag: str, params: str, s3_uri: str, s3_output_uri: str) -> None:
+        """Remember a finished transcription, evicting LRU entries over the limit."""
+        key = self._key(etag, params)
+        with self._lock:
+            self._entries.pop(key, None)
+            self._entries[key] = {
+                "s3_uri": s3_uri,
+                "s3_output_uri": s3_output_uri,
+                "created_at": time.time(),
+                "last_used": time.time(),
+            }
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            self._save()
+
+    def evict(self, etag: str, params: str) -> None:
+        """Forget an entry, e.g. when its output no longer exists."""
+        with self._lock:
+            if self._entries.pop(self._key(etag, params), None) is not None:
+                self._save()
+
+
+@functools.cache
+def default_transcription_cache() -> TranscriptionCache:
+    """Process wide cache instance."""
+    return TranscriptionCache()
+
+
+class TranscriptStore:
+    """In-memory LRU of parsed transcript json documents, by s3 uri.
+
+    An entry is only served while the object's ETag is unchanged (one `head_object`), so
+    a re-transcription to the same key is picked up; an unchanged transcript costs a
+    HEAD instead of a GET and parse of the whole document. Bounded by the size of the
+    json, documents larger than the bound are parsed but not kept.
+    """
+
+    def __init__(self, max_bytes: int | None = None):
+        """Empty store of at most `max_bytes`, TRANSCRIPT_CACHE_MAX_MB by default."""
+        self.max_bytes = (
+            max_bytes
+            if max_bytes is not None
+            else int(float(os.getenv("TRANSCRIPT_CACHE_MAX_MB", "256")) * 1024**2)
+        )
+        self._lock = threading.Lock()
+        self._entries: OrderedDict[str, dict] = OrderedDict()
+        self._total_bytes = 0
+
+    def get(self, s3_uri: str) -> tuple[dict, bool]:
+        """Return the parsed transcript and whether it came from memory.
+
+        Raises:
+            FileNotFoundError: if the object does not exist
+            ValueError: if it is not json
+        """
+        s3_handler = shared_input_handler()[0].s3_handler
+        etag = s3_handler.head(s3_uri)["etag"]
+        with self._lock:
+            entry = self._entries.get(s3_uri)
+            if entry is not None and entry["etag"] == etag:
+                self._entries.move_to_end(s3_uri)
+                return entry["document"], True
+
+        body, etag = s3_handler.read(s3_uri)
+        try:
+            document = json.loads(body)
+        except json.JSONDecodeError as e:
+            raise ValueError(f"Not a transcript json: {s3_uri} ({e})") from e
+        with self._lock:
+            if (previous := self._entries.pop(s3_uri, None)) is not None:
+                self._total_bytes -= previous["size"]
+            if len(body) <= self.max_bytes:
+                self._entries[s3_uri] = {
+                    "etag": etag,
+                    "document": document,
+                    "size": len(body),
+                }
+                self._total_bytes += len(body)
+            while self._total_bytes > self.max_bytes:
+                self._total_bytes -= self._entries.popitem(last=False)[1]["size"]
+        return document, False
+
+
+@functools.cache
+def default_transcript_store() -> TranscriptStore:
+    """Process wide store instance."""
+    return TranscriptStore()
+
+
+def transcript_text(document: dict) -> str:
+    """Plain text of a transcribe output json."""
+    transcripts = document.get("results", {}).get("transcripts", [])
+    return " ".join(t["transcript"] for t in transcripts if t.get("transcript"))
+
+
+def restore_original_timeline(result: TranscriptionResult) -> None:
+    """Map the transcript of silence trimmed audio back to the original timeline.
+
+    The result is updated in place.
+
+    Audio uploaded with SILENCE_TRIM has an offset map next to it
+    (`silence.load_offset_map`), the stored output json and the inline transcript are
+    replaced by copies with remapped times. A transcript that can't be remapped fails
+    the result rather than returning trimmed timestamps.
+    """
+    if not result.success or (
+        result.s3_output_uri is None and result.transcript is None
+    ):
+        return
+    s3_handler = shared_input_handler()[0].s3_handler
+    try:
+        offset_map = load_offset_map(s3_handler, result.s3_uri)
+        if offset_map is None:
+            return
+        document = (
+            result.transcript
+            if result.transcript is not None
+            else s3_handler.get_json(result.s3_output_uri)
+        )
+        remapped = remap_transcript(document, offset_map)
+        if result.s3_output_uri:
+            s3_handler.put_json(result.s3_output_uri, remapped)
+    except Exception as e:
+        logger.error(
+            f"could not map the transcript of {result.s3_uri} to the original "
+            f"timeline: {e}"
+        )
+        result.success = False
+        result.error = f"Transcript not mapped to the original timeline: {e}"
+        return
+    if result.transcript is not None:
+        result.transcript = remapped
+
+
+async def _transcribe(
+    service: "TranscriptionService | LocalTranscriptionService",
+    s3_uris: list[str],
+    on_result: Callable[[TranscriptionResult], None] | None = None,
+    durations: dict[str, float] | None = None,
+) -> list[TranscriptionResult]:
+    """`service.transcribe_all_async`, with trimmed audio on the original timeline."""
+    results = await service.transcribe_all_async(
+        s3_uris, on_result=on_result, durations=durations
+    )
+    await asyncio.gather(
+        *(asyncio.to_thread(restore_original_timeline, result) for result in results)
+    )
+    return results
+
+
+# transcriptions running right now by cache key, a concurrent duplicate waits for the
+# first one
+_in_flight: dict[str, asyncio.Future] = {}
+
+
+def _etag(s3_uri: str) -> str | None:
+    try:
+        return shared_input_handler()[0].s3_handler.head(s3_uri)["etag"]
+    except FileNotFoundError:
+        # transcribing it fails with the proper error
+        return None
+
+
+def _cached_result(
+    cache: TranscriptionCache, etag: str, params: str, s3_uri: str
+) -> TranscriptionResult | None:
+    """Result of an earlier transcription of the same content.
+
+    None if there is none or its output no longer exists.
+    """
+    entry = cache.lookup(etag, params)
+    if entry is None:
+        return None
+    if not shared_input_handler()[0].s3_handler.exists(entry["s3_output_uri"]):
+        cache.evict(etag, params)
+        return None
+    return TranscriptionResult(
+        s3_uri=s3_uri,
+        success=True,
+        s3_output_uri=entry["s3_output_uri"],
+        metrics={"cached": True, "cached_from": entry["s3_uri"]},
+    )
+
+
+def output_uri(s3_uri: str, params: str) -> str:
+    """S3 URI of the transcript json of a media file.
+
+    Its own output/ json, or if it has none, the output of the earlier transcription
+    of the same content (ETag and `params`) its transcription was served from.
+    """
+    own_output = transcription_output_uri(s3_uri)
+    if os.getenv("TRANSCRIPTION_CACHE", "true").lower() != "true":
+        return own_output
+    if shared_input_handler()[0].s3_handler.exists(own_output):
+        return own_output
+    etag = _etag(s3_uri)
+    entry = default_transcription_cache().lookup(etag, params) if etag else None
+    return entry["s3_output_uri"] if entry else own_output
+
+
+async def transcribe_all_cached(
+    service: "TranscriptionService | LocalTranscriptionService",
+    s3_uris: list[str],
+    on_result: Callable[[TranscriptionResult], None] | None = None,
+    durations: dict[str, float] | None = None,
+) -> list[TranscriptionResult]:
+    """`service.transcribe_all_async` that skips inputs transcribed before.
+
+    Inputs are identified by their s3 ETag (one `head_object` each) plus
+    `service.cache_params`, the same settings. Duplicates within the batch, and of
+    transcriptions already running for another request, wait for that one
+    transcription instead of starting their own. Only results with an output uri are
+    cached, there is nothing to point to otherwise. Disabled with
+    TRANSCRIPTION_CACHE=false. New transcripts of silence trimmed audio are put on the
+    original timeline before they are returned or cached, see
+    `restore_original_timeline`.
+    """
+    if os.getenv("TRANSCRIPTION_CACHE", "true").lower() != "true":
+        return await _transcribe(
+            service, s3_uris, on_result=on_result, durations=durations
+        )
+
+    cache = default_transcription_cache()
+    params = service.cache_params
+    etags = await asyncio.gather(*(asyncio.to_thread(_etag, uri) for uri in s3_uris))
+    results: list[TranscriptionResult | None] = [None] * len(s3_uris)
+    owned: dict[str, asyncio.Future] = {}  # keys this call transcribes
+    # inputs waiting for a transcription of the same content
+    waiting: dict[int, asyncio.Future] = {}
+    # (index, key) of the inputs this call transcribes
+    to_run = []
+
+    def finish(index: int, result: TranscriptionResult) -> None:
+        results[index] = result
+        if on_result:
+            on_result(result)
+
+    async def run_own() -> None:
+        if not to_run:
+            return
+        returned = await _transcribe(
+            service,
+            [s3_uris[index] for index, _ in to_run],
+            on_result=on_result,
+            durations=durations,
+        )
+        for (index, key), result in zip(to_run, returned, strict=True):
+            results[index] = result
+            if key is None:
+                continue
+            if result.success and result.s3_output_uri:
+                await asyncio.to_thread(
+                    cache.store,
+                    etags[index],
+                    params,
+                    result.s3_uri,
+                    result.s3_output_uri,
+                )
+            owned[key].set_result(result)
+
+    async def wait(index: int, future: asyncio.Future) -> None:
+        try:
+            first = await asyncio.shield(future)
+        except asyncio.CancelledError:
+            if not future.cancelled():
+                raise
+            # the first transcription went away with its request, do this one here
+            [result] = await _transcribe(service, [s3_uris[index]], durations=durations)
+        else:
+            result = TranscriptionResult(
+                s3_uri=s3_uris[index],
+                success=first.success,
+                s3_output_uri=first.s3_output_uri,
+                error=first.error,
+                metrics=first.metrics,
+                transcript=first.transcript,
+            )
+        finish(index, result)
+
+    loop = asyncio.get_running_loop()
+    try:
+        for index, (uri, etag) in enumerate(zip(s3_uris, etags, strict=True)):
+            key = f"{etag}:{params}" if etag else None
+            if key is None:
+                to_run.append((index, None))
+                continue
+            if key in _in_flight:
+                waiting[index] = _in_flight[key]
+                continue
+            # registered before the lookup, so a concurrent request for the same content
+            # waits for this one
+            future = owned[key] = _in_flight[key] = loop.create_future()
+            hit = await asyncio.to_thread(_cached_result, cache, etag, params, uri)
+            if hit is None:
+                to_run.append((index, key))
+                continue
+            future.set_result(hit)
+            finish(index, hit)
+
+        await asyncio.gather(
+            run_own(), *(wait(index, future) for index, future in waiting.items())
+        )
+    finally:
+        for key, future in owned.items():
+            _in_flight.pop(key, None)
+            if not future.done():
+                future.cancel()
+    return results
@@ -1,25 +1,119 @@
 """ Audio processing router for file upload and processing """
 
-from fastapi import APIRouter, File, UploadFile, HTTPException
+from fastapi import APIRouter, File, Form, Request, UploadFile, HTTPException
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
+from starlette.types import Receive, Scope, Send
+from collections.abc import AsyncIterator, Callable, Iterator
+from dataclasses import asdict
 from pathlib import Path
+from typing import BinaryIO
+import asyncio
+import hashlib
+import json
 import os
+import queue
 import tempfile
+import threading
+import time
 
-from ..preprocessing.input_handler import InputHandler
+from ..instrumentation import instrumentation
+from ..preprocessing.input_handler import process_chunks, process_file
+from ..preprocessing.metrics_sink import default_sink
+from ..preprocessing.transcribe import TranscriptionResult, shared_transcription_service
+from ..preprocessing.transcription_cache import transcribe_all_cached
+from ..worker_pool import PoolFullError, WorkerPool
 
 router = APIRouter(prefix="/audio", tags=["audio"])
 
+# conversions/uploads block, they run here so the event loop stays free for requests
+pool = WorkerPool()
+
+instrumentation.gauge(
+    "aissemble_worker_pool_in_flight", lambda: pool.stats()["in_flight"]
+)
+instrumentation.gauge(
+    "aissemble_worker_pool_queue_depth", lambda: pool.stats()["queue_depth"]
+)
+instrumentation.gauge("aissemble_worker_pool_max_workers", lambda: pool.max_workers)
+instrumentation.gauge(
+    "aissemble_worker_pool_rejected_total", lambda: pool.stats()["rejected_total"]
+)
+instrumentation.describe(
+    "aissemble_worker_pool_in_flight",
+    "gauge",
+    "Tasks running or waiting on the conversion worker pool",
+)
+instrumentation.describe(
+    "aissemble_worker_pool_queue_depth",
+    "gauge",
+    "Admitted tasks waiting for a free worker",
+)
+instrumentation.describe(
+    "aissemble_worker_pool_max_workers", "gauge", "Size of the conversion worker pool"
+)
+instrumentation.describe(
+    "aissemble_worker_pool_rejected_total",
+    "counter",
+    "Tasks rejected because the worker pool was full",
+)
+
+# max number of upload chunks buffered between the request body and ffmpeg stdin
+STREAM_QUEUE_CHUNKS = int(os.getenv('STREAM_QUEUE_CHUNKS', '16'))
+# how often the conversion thread checks whether a streamed upload was cancelled
+STREAM_STOP_POLL_SECONDS = 1.0
+# chunk size used when spooling multipart uploads to disk
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+# files of one batch converted at once, the rest wait without taking worker pool slots
+BATCH_CONCURRENCY = int(os.getenv('BATCH_CONCURRENCY', str(pool.max_workers)))
+# local paths in batch manifests have to be below this directory, unset means only s3://
+# sources
+BATCH_LOCAL_ROOT = os.getenv('BATCH_LOCAL_ROOT')
+# delay before a batch item retries when the worker pool is full
+BATCH_RETRY_SECONDS = 0.5
+
 class PerformanceMetrics(BaseModel):
     """Performance metrics for audio processing."""
     total_processing_time_seconds: float
     input_metadata: dict
     ffmpeg_conversion_time_seconds: float
+    # ffprobe before converting (SINGLE_PASS_PROBE=false, or to plan parallel segments)
+    probe_time_seconds: float | None = None
     s3_upload_time_seconds: float
     s3_upload_speed_mbps: float
     input_file_size_mb: float
     output_file_size_mb: float
     size_reduction_percent: float
+    # transcode, passthrough (input already 16kHz mono pcm wav) or cache
+    conversion_path: str | None = None
+    # uploaded codec (OUTPUT_CODEC: flac, opus or pcm), what it saved over a wav upload
+    output_codec: str | None = None
+    encode_time_seconds: float | None = None
+    pcm_size_bytes: int | None = None
+    codec_size_saved_bytes: int | None = None
+    estimated_upload_time_saved_seconds: float | None = None
+    # set when a long input was converted as parallel time range segments
+    ffmpeg_segment_count: int | None = None
+    # silence trimming (SILENCE_TRIM), the offset map maps trimmed times back to the
+    # original timeline
+    silence_removed_seconds: float | None = None
+    silence_bytes_saved: int | None = None
+    silence_cuts: int | None = None
+    silence_offset_map_uri: str | None = None
+    # only reported by the pipelined multipart upload
+    s3_upload_tail_seconds: float | None = None
+    s3_part_count: int | None = None
+    s3_part_timings: list[dict] | None = None
+    # worker pool admission
+    queue_wait_time_seconds: float | None = None
+    queue_depth_at_submit: int | None = None
+    # conversion cache
+    input_sha256: str | None = None
+    # s3 sources are cached by ETag instead of a content hash
+    input_etag: str | None = None
+    cache_hit: bool = False
+    # time spent creating s3 clients for this request, 0 when shared ones were reused
+    client_creation_time_seconds: float | None = None
 
 class AudioProcessResponse(BaseModel):
     """Response model for audio processing."""
@@ -33,32 +127,495 @@ async def process_audio(file: UploadFile = File(...)) -> AudioProcessResponse:
     """
     Upload and process audio/video files 
 
-    Converts to WAV format and uploads to s3. 
+    Converts to 16kHz mono audio (flac by default, see OUTPUT_CODEC) and uploads to s3.
 
     Args:
 
     Returns:
         s3 URI
     """
-    # save file temporarily so we can send it across network
-    with tempfile.NamedTemporaryFile(delete=False, suffix=Path(file.filename).suffix) as tmp_file:
-        content = await file.read()
-        tmp_file.write(content)
-        tmp_file_path = tmp_file.name
+    # save file temporarily so we can send it across network, copied in chunks so the
+    # whole upload is never held in memory, and hashed on the way for the cache
+    tmp_file_path, digest = await asyncio.to_thread(
+        spool_upload, file.file, Path(file.filename).suffix
+    )
 
     try:
-        handler = InputHandler()
-        uri, metrics = handler.process_input(tmp_file_path, file.filename)
+        (uri, metrics), pool_metrics = await pool.run(
+            process_file, tmp_file_path, file.filename, digest
+        )
+        metrics.update(pool_metrics)
+        instrumentation.observe_processing(metrics, "process")
 
         return AudioProcessResponse(
             s3_uri=uri, 
             original_filename=file.filename,
             metrics=PerformanceMetrics(**metrics)
         )
-    
+
+    except PoolFullError as e:
+        instrumentation.inc(
+            "aissemble_failed_requests_total", endpoint="process", status="503"
+        )
+        raise HTTPException(
+            status_code=503, detail=str(e), headers={'Retry-After': '5'}
+        ) from e
+
+    except (FileNotFoundError, ValueError, RuntimeError) as e:
+        instrumentation.inc(
+            "aissemble_failed_requests_total", endpoint="process", status="400"
+        )
+        raise HTTPException(status_code=400, detail=str(e)) from e
+
+    finally:
+        Path(tmp_file_path).unlink(missing_ok=True)
+
+
+def spool_upload(source: BinaryIO, suffix: str) -> tuple[str, str]:
+    """Copy an upload to a temp file in chunks.
+
+    Returns:
+        (temp file path, sha256 of the content)
+    """
+    hasher = hashlib.sha256()
+    with tempfile.NamedTemporaryFile(delete=False, suffix=suffix) as tmp_file:
+        while block := source.read(UPLOAD_CHUNK_SIZE):
+            hasher.update(block)
+            tmp_file.write(block)
+    return tmp_file.name, hasher.hexdigest()
+
+
+def _iter_queue(chunk_queue: queue.Queue, stop: threading.Event) -> Iterator[bytes]:
+    """Yield chunks put on the queue by the request reader until the end marker (None).
+
+    Fails once `stop` is set and the queue ran dry, the reader may be gone without
+    sending the end marker.
+    """
+    while True:
+        try:
+            item = chunk_queue.get(timeout=STREAM_STOP_POLL_SECONDS)
+        except queue.Empty:
+            if stop.is_set():
+                raise ConnectionError("Upload was cancelled midway") from None
+            continue
+        if item is None:
+            return
+        if isinstance(item, BaseException):
+            raise item
+        yield item
+
+
+def _put_waiting(
+    chunk_queue: queue.Queue,
+    item: bytes | BaseException | None,
+    finished: threading.Event,
+) -> bool:
+    """Put an item on the bounded queue once there is room, see `_put_chunk`."""
+    while not finished.is_set():
+        try:
+            chunk_queue.put(item, timeout=STREAM_STOP_POLL_SECONDS)
+            return True
+        except queue.Full:
+            continue
+    return False
+
+
+async def _put_chunk(
+    chunk_queue: queue.Queue,
+    item: bytes | BaseException | None,
+    finished: threading.Event,
+) -> bool:
+    """Put an item on the bounded queue without blocking the event loop.
+
+    Returns False if the conversion already finished (e.g. ffmpeg failed) and nobody is
+    reading anymore.
+    """
+    if finished.is_set():
+        return False
+    try:
+        chunk_queue.put_nowait(item)
+        return True
+    except queue.Full:
+        # ffmpeg is behind, wait for room on a thread instead of polling on the loop
+        return await asyncio.to_thread(_put_waiting, chunk_queue, item, finished)
+
+
+@router.post("/process/stream", response_model=AudioProcessResponse)
+async def process_audio_stream(request: Request, filename: str) -> AudioProcessResponse:
+    """Upload and process audio/video files as a raw request body (streaming mode).
+
+    The body is piped into ffmpeg as it arrives and is never written to disk or held in
+    memory as a whole, e.g.
+    `curl -T video.webm ".../audio/process/stream?filename=video.webm"`. The container
+    must be streamable (webm/mkv, mp3, wav, faststart mp4).
+
+    Args:
+        request: the incoming request, its body is the media file
+        filename: original name of the uploaded file, used for the type check and s3 key
+
+    Returns:
+        s3 URI
+    """
+    chunk_queue = queue.Queue(maxsize=STREAM_QUEUE_CHUNKS)
+    stop = threading.Event()
+    # the request body can't be pickled, so this always runs on a pool thread
+    task = asyncio.ensure_future(
+        pool.run(
+            process_chunks, _iter_queue(chunk_queue, stop), filename, thread_only=True
+        )
+    )
+    finished = threading.Event()
+    task.add_done_callback(lambda _: finished.set())
+
+    try:
+        async for chunk in request.stream():
+            if chunk and not await _put_chunk(chunk_queue, chunk, finished):
+                break
+        await _put_chunk(chunk_queue, None, finished)
+    except Exception as e:
+        # client went away mid upload, fail the conversion instead of converting a
+        # truncated file
+        await _put_chunk(chunk_queue, e, finished)
+    except BaseException:
+        # the request was cancelled (e.g. on disconnect), nothing puts the end marker
+        # anymore and nobody awaits the conversion, its failure is expected
+        stop.set()
+        task.add_done_callback(lambda done: done.cancelled() or done.exception())
+        raise
+
+    try:
+        (uri, metrics), pool_metrics = await task
+        metrics.update(pool_metrics)
+        instrumentation.observe_processing(metrics, "stream")
+
+        return AudioProcessResponse(
+            s3_uri=uri,
+            original_filename=filename,
+            metrics=PerformanceMetrics(**metrics)
+        )
+
+    except PoolFullError as e:
+        instrumentation.inc(
+            "aissemble_failed_requests_total", endpoint="stream", status="503"
+        )
+        raise HTTPException(
+            status_code=503, detail=str(e), headers={'Retry-After': '5'}
+        ) from e
+
+    except (FileNotFoundError, ValueError, RuntimeError) as e:
+        instrumentation.inc(
+            "aissemble_failed_requests_total", endpoint="stream", status="400"
+        )
+        raise HTTPException(status_code=400, detail=str(e)) from e
+
+
+class S3ProcessRequest(BaseModel):
+    """Request model for processing media that already is in s3."""
+    s3_uri: str
+    # name used for the output key, defaults to the name of the source object
+    original_filename: str | None = None
+
+
+@router.post("/process/s3", response_model=AudioProcessResponse)
+async def process_audio_s3(request: S3ProcessRequest) -> AudioProcessResponse:
+    """Process an audio/video file that already is in s3.
+
+    The object is converted server side, read straight from s3 by ffmpeg
+    (S3_INGEST_MODE) and uploaded while it converts, nothing goes through the client.
+
+    Args:
+        request: s3 uri of the source object and optionally the name for the output key
+
+    Returns:
+        s3 URI
+    """
+    if not request.s3_uri.startswith('s3://'):
+        raise HTTPException(status_code=400, detail=f"Not an s3 uri: {request.s3_uri}")
+    filename = request.original_filename or Path(request.s3_uri).name
+
+    try:
+        (uri, metrics), pool_metrics = await pool.run(
+            process_file, request.s3_uri, filename
+        )
+        metrics.update(pool_metrics)
+        instrumentation.observe_processing(metrics, "s3")
+
+        return AudioProcessResponse(
+            s3_uri=uri,
+            original_filename=filename,
+            metrics=PerformanceMetrics(**metrics)
+        )
+
+    except PoolFullError as e:
+        instrumentation.inc(
+            "aissemble_failed_requests_total", endpoint="s3", status="503"
+        )
+        raise HTTPException(
+            status_code=503, detail=str(e), headers={'Retry-After': '5'}
+        ) from e
+
     except (FileNotFoundError, ValueError, RuntimeError) as e:
-        raise HTTPException(status_code=400, detail=str(e))
-    
+        instrumentation.inc(
+            "aissemble_failed_requests_total", endpoint="s3", status="400"
+        )
+        raise HTTPException(status_code=400, detail=str(e)) from e
+
+
+@router.post("/process/batch")
+async def process_audio_batch(
+    *,
+    files: list[UploadFile] = File(default=[]),  # noqa: B008
+    manifest: str | None = Form(default=None),
+    transcribe: bool = False,
+) -> StreamingResponse:
+    """Process many audio/video files in one call.
+
+    Uploaded files and manifest sources are converted and uploaded concurrently (up to
+    BATCH_CONCURRENCY at a time) on the worker pool. The response is NDJSON, one line
+    per event as soon as it happens: `processed` (same fields as `/audio/process`) or
+    `error` per file, `transcribed` per file when `transcribe` is set, and a final
+    `summary`.
+
+    Args:
+        files: media files to process
+        manifest: newline separated (or json list of) `s3://` uris and local paths below
+            BATCH_LOCAL_ROOT
+        transcribe: start a transcription job for each file as soon as it is uploaded
+
+    Returns:
+        NDJSON stream of per file results
+    """
+    sources = _parse_manifest(manifest) if manifest else []
+    if not files and not sources:
+        raise HTTPException(
+            status_code=400, detail="No files or manifest sources given"
+        )
+
+    # uploads are closed once this returns, the streamed response works on spooled
+    # copies
+    uploads = []
+    try:
+        for file in files:
+            tmp_file_path, digest = await asyncio.to_thread(
+                spool_upload, file.file, Path(file.filename).suffix
+            )
+            uploads.append((file.filename, tmp_file_path, digest))
+    except BaseException:
+        _remove_spooled(uploads)
+        raise
+
+    return _BatchResponse(
+        uploads,
+        _batch_events(uploads, sources, transcribe=transcribe),
+        media_type="application/x-ndjson",
+    )
+
+
+def _remove_spooled(uploads: list[tuple[str, str, str]]) -> None:
+    """Delete the spooled copies of batch uploads that still exist."""
+    for _, tmp_file_path, _ in uploads:
+        Path(tmp_file_path).unlink(missing_ok=True)
+
+
+class _BatchResponse(StreamingResponse):
+    """NDJSON response that deletes the spooled batch uploads once it is done.
+
+    Once the event generator runs, its tasks delete the uploads as they finish and it
+    empties `uploads`. It never runs (not even its `finally`) if the client goes away
+    before the first line is sent, the response deletes them then.
+    """
+
+    def __init__(self, uploads: list[tuple[str, str, str]], *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.uploads = uploads
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            _remove_spooled(self.uploads)
+
+
+def _parse_manifest(manifest: str) -> list[str]:
+    """Sources from a manifest, rejects local paths outside BATCH_LOCAL_ROOT."""
+    if manifest.lstrip().startswith('['):
+        try:
+            sources = [str(source) for source in json.loads(manifest)]
+        except json.JSONDecodeError as e:
+            raise HTTPException(
+                status_code=400, detail=f"Invalid manifest: {e}"
+            ) from e
+    else:
+        sources = [line.strip() for line in manifest.splitlines() if line.strip()]
+
+    for source in sources:
+        if source.startswith('s3://'):
+            continue
+        root = Path(BATCH_LOCAL_ROOT).resolve() if BATCH_LOCAL_ROOT else None
+        if root is None or not Path(source).resolve().is_relative_to(root):
+            raise HTTPException(
+                status_code=400,
+                detail=f"Local manifest paths must be below BATCH_LOCAL_ROOT: {source}",
+            )
+    return sources
+
+
+async def _run_admitted(fn: Callable[..., tuple[str, dict]], *args) -> tuple:
+    """`pool.run` that waits for a free slot instead of failing.
+
+    Batch items are not worth a 503.
+    """
+    while True:
+        try:
+            return await pool.run(fn, *args)
+        except PoolFullError:
+            await asyncio.sleep(BATCH_RETRY_SECONDS)
+
+
+async def _transcribe_item(
+    uri: str, metrics: dict, semaphore: asyncio.Semaphore
+) -> TranscriptionResult:
+    """Transcribe one converted file of a batch, reusing earlier transcripts."""
+    service, _ = shared_transcription_service()
+    duration = metrics['input_metadata'].get('format', {}).get('duration')
+    async with semaphore:
+        [result] = await transcribe_all_cached(
+            service, [uri], durations={uri: float(duration)} if duration else None
+        )
+    return result
+
+
+async def _batch_events(
+    uploads: list[tuple[str, str, str]],
+    sources: list[str],
+    *,
+    transcribe: bool,
+) -> AsyncIterator[str]:
+    """Process the batch items concurrently, yield NDJSON results as they complete."""
+    start_time = time.time()
+    events = asyncio.Queue()
+    slots = asyncio.Semaphore(BATCH_CONCURRENCY)
+    transcribe_slots = (
+        asyncio.Semaphore(shared_transcription_service()[0].max_concurrent_jobs)
+        if transcribe
+        else None
+    )
+
+    async def run_item(
+        index: int,
+        filename: str,
+        fn: Callable[..., tuple[str, dict]],
+        *args,
+        tmp_file_path: str | None = None,
+    ) -> None:
+        try:
+            async with slots:
+                (uri, metrics), pool_metrics = await _run_admitted(fn, *args)
+        except Exception as e:
+            instrumentation.inc(
+                "aissemble_failed_requests_total", endpoint="batch", status="error"
+            )
+            await events.put(
+                {
+                    'event': 'error',
+                    'index': index,
+                    'original_filename': filename,
+                    'error': str(e),
+                }
+            )
+            return
+        finally:
+            if tmp_file_path:
+                Path(tmp_file_path).unlink(missing_ok=True)
+
+        metrics.update(pool_metrics)
+        instrumentation.observe_processing(metrics, "batch")
+        response = AudioProcessResponse(
+            s3_uri=uri,
+            original_filename=filename,
+            metrics=PerformanceMetrics(**metrics),
+        )
+        await events.put(
+            {'event': 'processed', 'index': index, **response.model_dump()}
+        )
+        if transcribe:
+            try:
+                result = await _transcribe_item(uri, metrics, transcribe_slots)
+            except Exception as e:
+                result = TranscriptionResult(s3_uri=uri, success=False, error=str(e))
+            await events.put({'event': 'transcribed', 'index': index, **asdict(result)})
+
+    tasks = [
+        asyncio.create_task(
+            run_item(
+                index,
+                filename,
+                process_file,
+                tmp_file_path,
+                filename,
+                digest,
+                tmp_file_path=tmp_file_path,
+            )
+        )
+        for index, (filename, tmp_file_path, digest) in enumerate(uploads)
+    ]
+    tasks += [
+        asyncio.create_task(
+            run_item(
+                len(uploads) + index,
+                Path(source).name,
+                process_file,
+                source,
+                Path(source).name,
+            )
+        )
+        for index, source in enumerate(sources)
+    ]
+    # an upload goes once its item is over, a cancelled item may never get to delete
+    # it and a running conversion still reads it when the client goes away
+    for task, (_, tmp_file_path, _) in zip(tasks, uploads, strict=False):
+        task.add_done_callback(
+            lambda _, path=tmp_file_path: Path(path).unlink(missing_ok=True)
+        )
+    # from here on the tasks delete the uploads, not the response (`_BatchResponse`)
+    uploads.clear()
+    all_done = asyncio.gather(*tasks)
+    all_done.add_done_callback(lambda _: events.put_nowait(None))
+
+    counts = {'processed': 0, 'error': 0, 'transcribed': 0, 'transcription_failed': 0}
+    try:
+        while (event := await events.get()) is not None:
+            if event['event'] == 'transcribed' and not event['success']:
+                counts['transcription_failed'] += 1
+            else:
+                counts[event['event']] += 1
+            yield json.dumps(event) + '\n'
+
+        yield json.dumps({
+            'event': 'summary',
+            'total_files': len(tasks),
+            'successful': counts['processed'],
+            'failed': counts['error'],
+            'transcribed': counts['transcribed'],
+            'transcription_failed': counts['transcription_failed'],
+            'total_processing_time_seconds': round(time.time() - start_time, 3),
+        }) + '\n'
     finally:
-        if os.path.exists(tmp_file_path):
-            os.unlink(tmp_file_path)
\ No newline at end of file
+        # client went away, don't start the files that are still waiting
+        for task in tasks:
+            task.cancel()
+
+
+@router.get("/pool")
+async def pool_stats() -> dict:
+    """Worker pool state: in-flight tasks, queue depth, completed and rejected tasks."""
+    return pool.stats()
+
+
+@router.get("/metrics")
+async def metrics_histograms() -> dict:
+    """Histograms of the stage timings recorded so far.
+
+    Per stage the count, sum, cumulative buckets and p50/p95/p99.
+    """
+    return default_sink().histograms()
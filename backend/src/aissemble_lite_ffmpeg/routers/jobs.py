@@ -0,0 +1,239 @@
+# Copyright 2025 Booz Allen Hamilton.
+#
+# Booz Allen Hamilton Confidential Information.
+#
+# The contents of this file are the intellectual property of
+# Booz Allen Hamilton, Inc. ("BAH") and are subject to copyright protection
+# under the laws of the United States and other countries.
+#
+# You acknowledge that misappropriation, misuse, or redistribution of content
+# on the file could cause irreparable harm to BAH and/or to third parties.
+#
+# You may not copy, reproduce, distribute, publish, display, execute, modify,
+# create derivative works of, transmit, sell or offer for resale, or in any way
+# exploit any part of this code or program without BAH's express written permission.
+#
+# The contents of this code or program contains code
+# that is itself or was created using artificial intelligence.
+#
+# To the best of our knowledge, this code does not infringe third-party intellectual
+# property rights, contain errors, inaccuracies, bias, or security concerns.
+#
+# However, Booz Allen does not warrant, claim, or provide any implied
+# or express warranty for the aforementioned, nor of merchantability
+# or fitness for purpose.
+#
+# Booz Allen expressly limits liability, whether by contract, tort or in equity
+# for any damage or harm caused by use of this artificial intelligence code or program.
+#
+# Booz Allen is providing this code or program "as is" with the understanding
+# that any separately negotiated standards of performance for said code
+# or program will be met for the duration of any applicable contract under which
+# the code or program is provided.
+
+"""Job based API.
+
+Long running conversions and transcriptions are submitted as jobs: the submit call
+returns a job id right away and the client polls `/jobs/{id}` (or follows the
+`/jobs/{id}/events` server-sent events stream) instead of holding a connection open
+for the whole run.
+"""
+
+import asyncio
+import json
+import os
+from collections.abc import AsyncIterator
+from dataclasses import asdict
+from pathlib import Path
+
+from fastapi import APIRouter, File, HTTPException, UploadFile
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel
+
+from ..instrumentation import instrumentation
+from ..jobs import Job, JobRegistry, JobStatus
+from ..preprocessing.input_handler import process_file
+from ..preprocessing.transcribe import shared_transcription_service
+from ..preprocessing.transcription_cache import transcribe_all_cached
+from ..worker_pool import PoolFullError
+from .audio import pool, spool_upload
+from .transcription import TranscriptionRequestModel, build_response
+
+router = APIRouter(prefix="/jobs", tags=["jobs"])
+
+registry = JobRegistry()
+
+# seconds between keep-alive comments on idle event streams, below typical load balancer
+# idle timeouts
+EVENTS_KEEPALIVE_SECONDS = float(os.environ.get("JOB_EVENTS_KEEPALIVE_SECONDS", "15"))
+
+
+class JobSubmittedResponse(BaseModel):
+    """Response model for a job submission."""
+
+    job_id: str
+    status: JobStatus
+    status_url: str
+    events_url: str
+
+
+class JobModel(BaseModel):
+    """Response model for the state of a job."""
+
+    id: str
+    kind: str
+    status: JobStatus
+    created_at: float
+    updated_at: float
+    progress: dict
+    result: dict | None = None
+    error: str | None = None
+
+
+def _submitted(job: Job) -> JobSubmittedResponse:
+    return JobSubmittedResponse(
+        job_id=job.id,
+        status=job.status,
+        status_url=f"{router.prefix}/{job.id}",
+        events_url=f"{router.prefix}/{job.id}/events",
+    )
+
+
+def _get_job(job_id: str) -> Job:
+    job = registry.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job not found: {job_id}")
+    return job
+
+
+@router.post("/audio", response_model=JobSubmittedResponse, status_code=202)
+async def submit_audio_job(
+    *,
+    file: UploadFile = File(...),  # noqa: B008
+    transcribe: bool = False,
+) -> JobSubmittedResponse:
+    """Submit an audio/video file for conversion and upload to S3.
+
+    Args:
+        file: media file to process.
+        transcribe: also transcribe the converted file once it is uploaded.
+
+    Returns:
+        The job id and where to follow its progress.
+    """
+    # the pool slot is taken now, so a job that was accepted is never rejected later
+    try:
+        pool.reserve()
+    except PoolFullError as e:
+        instrumentation.inc(
+            "aissemble_failed_requests_total", endpoint="jobs", status="503"
+        )
+        raise HTTPException(
+            status_code=503, detail=str(e), headers={"Retry-After": "5"}
+        ) from e
+
+    # the upload is closed once this request returns, so keep a copy for the job
+    try:
+        tmp_file_path, digest = await asyncio.to_thread(
+            spool_upload, file.file, Path(file.filename).suffix
+        )
+    except BaseException:
+        pool.release()
+        raise
+
+    filename = file.filename
+    job = registry.create("audio", filename=filename, stage="queued")
+
+    async def work(job: Job) -> dict:
+        try:
+            registry.update(job, progress={**job.progress, "stage": "processing"})
+            (uri, metrics), pool_metrics = await pool.run(
+                process_file, tmp_file_path, filename, digest, reserved=True
+            )
+        finally:
+            Path(tmp_file_path).unlink(missing_ok=True)
+        metrics.update(pool_metrics)
+        instrumentation.observe_processing(metrics, "jobs")
+        result = {"s3_uri": uri, "original_filename": filename, "metrics": metrics}
+
+        if transcribe:
+            registry.update(
+                job, progress={**job.progress, "stage": "transcribing", "s3_uri": uri}
+            )
+            duration = metrics["input_metadata"].get("format", {}).get("duration")
+            service, _ = shared_transcription_service()
+            # same content transcribed before with the same settings is a cache hit
+            [transcription] = await transcribe_all_cached(
+                service, [uri], durations={uri: float(duration)} if duration else None
+            )
+            result["transcription"] = asdict(transcription)
+
+        registry.update(job, progress={**job.progress, "stage": "done"})
+        return result
+
+    registry.run_in_background(job, work)
+    return _submitted(job)
+
+
+@router.post("/transcribe", response_model=JobSubmittedResponse, status_code=202)
+async def submit_transcription_job(
+    request: TranscriptionRequestModel,
+) -> JobSubmittedResponse:
+    """Submit a batch of S3 URIs for transcription.
+
+    Args:
+        request: Request containing list of S3 URIs to transcribe.
+
+    Returns:
+        The job id and where to follow its progress.
+    """
+    total = len(request.s3_uris)
+    job = registry.create("transcribe", completed=0, total=total)
+
+    async def work(job: Job) -> dict:
+        completed = 0
+
+        def on_result(_result: object) -> None:
+            nonlocal completed
+            completed += 1
+            registry.update(job, progress={"completed": completed, "total": total})
+
+        service, _ = shared_transcription_service()
+        results = await transcribe_all_cached(
+            service,
+            request.s3_uris,
+            on_result=on_result,
+            durations=request.durations_seconds,
+        )
+        return build_response(results).model_dump()
+
+    registry.run_in_background(job, work)
+    return _submitted(job)
+
+
+@router.get("/{job_id}", response_model=JobModel)
+async def get_job(job_id: str) -> JobModel:
+    """Status, progress and (once finished) result or error of a job."""
+    return JobModel(**_get_job(job_id).to_dict())
+
+
+@router.get("/{job_id}/events")
+async def job_events(job_id: str) -> StreamingResponse:
+    """Server-sent events with the job state on every change until it finishes."""
+    job = _get_job(job_id)
+
+    async def events() -> AsyncIterator[str]:
+        version = -1
+        while True:
+            if job.version != version:
+                version = job.version
+                yield f"event: {job.status}\ndata: {json.dumps(job.to_dict())}\n\n"
+                if job.finished:
+                    return
+            elif not await registry.wait_for_update(
+                job, version, EVENTS_KEEPALIVE_SECONDS
+            ):
+                # keeps proxies with short idle timeouts from closing the stream
+                yield ": keep-alive\n\n"
+
+    return StreamingResponse(events(), media_type="text/event-stream")
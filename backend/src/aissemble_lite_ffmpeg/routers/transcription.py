@@ -0,0 +1,328 @@
+# Copyright 2025 Booz Allen Hamilton.
+#
+# Booz Allen Hamilton Confidential Information.
+#
+# The contents of this file are the intellectual property of
+# Booz Allen Hamilton, Inc. ("BAH") and are subject to copyright protection
+# under the laws of the United States and other countries.
+#
+# You acknowledge that misappropriation, misuse, or redistribution of content
+# on the file could cause irreparable harm to BAH and/or to third parties.
+#
+# You may not copy, reproduce, distribute, publish, display, execute, modify,
+# create derivative works of, transmit, sell or offer for resale, or in any way
+# exploit any part of this code or program without BAH's express written permission.
+#
+# The contents of this code or program contains code
+# that is itself or was created using artificial intelligence.
+#
+# To the best of our knowledge, this code does not infringe third-party intellectual
+# property rights, contain errors, inaccuracies, bias, or security concerns.
+#
+# However, Booz Allen does not warrant, claim, or provide any implied
+# or express warranty for the aforementioned, nor of merchantability
+# or fitness for purpose.
+#
+# Booz Allen expressly limits liability, whether by contract, tort or in equity
+# for any damage or harm caused by use of this artificial intelligence code or program.
+#
+# Booz Allen is providing this code or program "as is" with the understanding
+# that any separately negotiated standards of performance for said code
+# or program will be met for the duration of any applicable contract under which
+# the code or program is provided.
+
+"""Transcription routes."""
+
+import asyncio
+import json
+from collections.abc import AsyncIterator
+from pathlib import Path
+
+from fastapi import APIRouter, File, HTTPException, UploadFile
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel
+
+from ..instrumentation import instrumentation
+from ..preprocessing.chunked_transcribe import ChunkedTranscriber
+from ..preprocessing.input_handler import ACCEPTABLE_TYPES, shared_input_handler
+from ..preprocessing.local_transcribe import shared_local_service
+from ..preprocessing.silence import ORIGINAL_TIMELINE, load_offset_map, remap_transcript
+from ..preprocessing.transcribe import (
+    TranscriptionResult,
+    shared_transcription_service,
+)
+from ..preprocessing.transcription_cache import (
+    default_transcript_store,
+    output_uri,
+    transcribe_all_cached,
+    transcript_text,
+)
+from .audio import spool_upload
+
+router = APIRouter(tags=["transcription"])
+
+
+class TranscriptionRequestModel(BaseModel):
+    """Request model for batch transcription."""
+
+    s3_uris: list[str]
+    # optional audio duration per s3 uri (e.g. input_metadata.format.duration from
+    # /audio/process), lets the poller skip status checks before the job can be done
+    durations_seconds: dict[str, float] | None = None
+
+
+class StreamTranscriptionRequestModel(BaseModel):
+    """Request model for chunked transcription."""
+
+    s3_uri: str
+
+
+class TranscriptionResultModel(BaseModel):
+    """Result model for a single file transcription."""
+
+    s3_uri: str
+    success: bool
+    s3_output_uri: str | None = None
+    error: str | None = None
+    metrics: dict | None = None
+    # transcript json, inline when the local engine transcribed the file
+    transcript: dict | None = None
+
+
+class TranscriptModel(BaseModel):
+    """A transcript read back from S3."""
+
+    s3_output_uri: str
+    text: str
+    # the whole transcribe output json, left out with text_only
+    transcript: dict | None = None
+    # served from the in-memory store, the object was unchanged
+    cached: bool
+
+
+class TranscriptionResponseModel(BaseModel):
+    """Response model for batch transcription."""
+
+    total_files: int
+    successful: int
+    failed: int
+    results: list[TranscriptionResultModel]
+    # time spent creating the Transcribe client for this request, 0 when reused
+    client_creation_time_seconds: float | None = None
+
+
+@router.post("/transcribe", response_model=TranscriptionResponseModel)
+async def transcribe_files(
+    request: TranscriptionRequestModel,
+) -> TranscriptionResponseModel:
+    """Transcribe media files from S3.
+
+    Accepts a list of S3 URIs, transcribes them using AWS Transcribe,
+    and saves the transcripts to the output/ folder in the same S3 bucket.
+    All jobs of the batch run concurrently (up to TRANSCRIBE_MAX_CONCURRENT_JOBS).
+    Objects transcribed before with the same language settings (same ETag) get the
+    earlier output back without a new job, see TRANSCRIPTION_CACHE.
+
+    Args:
+        request: Request containing list of S3 URIs to transcribe.
+
+    Requires environment variables:
+    - AWS_REGION: AWS region (default: us-east-1)
+    - TRANSCRIBE_MAX_CONCURRENT_JOBS: jobs running at once (default: 100)
+    - TRANSCRIBE_POLL_INTERVAL_SECONDS: shortest delay between checks (default: 2)
+
+    Returns:
+        TranscriptionResponseModel with summary and individual file results.
+    """
+    transcription_service, creation_time = shared_transcription_service()
+    results = await transcribe_all_cached(
+        transcription_service, request.s3_uris, durations=request.durations_seconds
+    )
+    response = build_response(results)
+    response.client_creation_time_seconds = round(creation_time, 3)
+    return response
+
+
+@router.get("/transcribe/result", response_model=TranscriptModel)
+async def get_transcript(s3_uri: str, *, text_only: bool = False) -> TranscriptModel:
+    """Read a transcript from S3.
+
+    Parsed transcripts are kept in memory (TRANSCRIPT_CACHE_MAX_MB) and served again
+    while the S3 object is unchanged, so repeated reads cost a HEAD instead of a GET
+    of the whole json. Transcripts of silence trimmed media are on the timeline of
+    the original audio.
+
+    Args:
+        s3_uri: the transcription output json (`s3_output_uri` of a result), or the
+            transcribed media file, whose output is looked up in the output/ folder
+            or, for a transcription served from the cache, in the transcription cache.
+        text_only: return only the plain text, not the whole output json.
+
+    Returns:
+        TranscriptModel with the text and, unless text_only, the transcript json.
+    """
+    try:
+        if s3_uri.endswith(".json"):
+            transcript_uri = s3_uri
+        else:
+            params = shared_transcription_service()[0].cache_params
+            transcript_uri = await asyncio.to_thread(output_uri, s3_uri, params)
+        document, cached = await asyncio.to_thread(
+            default_transcript_store().get, transcript_uri
+        )
+        if transcript_uri != s3_uri and not document.get(ORIGINAL_TIMELINE):
+            # e.g. a job started outside this api on silence trimmed audio
+            s3_handler = shared_input_handler()[0].s3_handler
+            offset_map = await asyncio.to_thread(load_offset_map, s3_handler, s3_uri)
+            document = (
+                remap_transcript(document, offset_map) if offset_map else document
+            )
+    except FileNotFoundError as e:
+        instrumentation.inc(
+            "aissemble_failed_requests_total",
+            endpoint="transcribe_result",
+            status="404",
+        )
+        raise HTTPException(status_code=404, detail=str(e)) from e
+    except ValueError as e:
+        instrumentation.inc(
+            "aissemble_failed_requests_total",
+            endpoint="transcribe_result",
+            status="400",
+        )
+        raise HTTPException(status_code=400, detail=str(e)) from e
+    return TranscriptModel(
+        s3_output_uri=transcript_uri,
+        text=transcript_text(document),
+        transcript=None if text_only else document,
+        cached=cached,
+    )
+
+
+@router.post("/transcribe/stream")
+async def transcribe_stream(
+    request: StreamTranscriptionRequestModel,
+) -> StreamingResponse:
+    """Transcribe a long media file from S3 in chunks, streaming partial results.
+
+    The audio is cut at quiet points into chunks of up to CHUNKED_CHUNK_SECONDS that are
+    transcribed concurrently with the TRANSCRIPTION_BACKEND while the rest of the file
+    is decoded. The response is NDJSON, one line per event as it happens: `chunk` (text
+    and segments on the file's timeline) or `error` per chunk in completion order, and a
+    final `transcript` with the stitched transcript, also stored in the output/ folder.
+
+    Args:
+        request: Request containing the S3 URI of the media file.
+
+    Returns:
+        NDJSON stream of chunk results.
+    """
+    if Path(request.s3_uri).suffix.lower() not in ACCEPTABLE_TYPES:
+        raise HTTPException(
+            status_code=400,
+            detail=(
+                f"Unsupported file type: {request.s3_uri}. "
+                f"Supported files: {ACCEPTABLE_TYPES}"
+            ),
+        )
+    try:
+        await asyncio.to_thread(
+            shared_input_handler()[0].s3_handler.head, request.s3_uri
+        )
+    except FileNotFoundError as e:
+        instrumentation.inc(
+            "aissemble_failed_requests_total",
+            endpoint="transcribe_stream",
+            status="404",
+        )
+        raise HTTPException(status_code=404, detail=str(e)) from e
+    return StreamingResponse(
+        _stream_events(request.s3_uri), media_type="application/x-ndjson"
+    )
+
+
+async def _stream_events(s3_uri: str) -> AsyncIterator[str]:
+    """NDJSON lines of the chunked transcription."""
+    async for event in ChunkedTranscriber().stream(s3_uri):
+        yield json.dumps(event) + "\n"
+
+
+@router.post("/transcribe/upload", response_model=TranscriptionResultModel)
+async def transcribe_upload(file: UploadFile = File(...)) -> TranscriptionResultModel:  # noqa: B008
+    """Transcribe an uploaded clip with the local engine.
+
+    The upload is converted to 16kHz mono PCM in memory and transcribed in process, the
+    transcript comes back in the response and nothing goes to S3. Meant for short
+    clips: concurrent uploads are batched through the warm model (see
+    LOCAL_TRANSCRIBE_BATCH_SIZE), audio longer than LOCAL_TRANSCRIBE_MAX_SECONDS is
+    rejected. Uses the local engine whatever TRANSCRIPTION_BACKEND is set to.
+
+    Args:
+        file: audio/video file of one of the accepted types.
+
+    Returns:
+        TranscriptionResultModel with the transcript; `s3_uri` is the uploaded filename.
+    """
+    suffix = Path(file.filename or "").suffix.lower()
+    if suffix not in ACCEPTABLE_TYPES:
+        raise HTTPException(
+            status_code=400,
+            detail=(
+                f"Unsupported file type: {suffix}. Supported files: {ACCEPTABLE_TYPES}"
+            ),
+        )
+    try:
+        service, _ = await asyncio.to_thread(shared_local_service)
+    except (ImportError, RuntimeError, ValueError) as e:
+        instrumentation.inc(
+            "aissemble_failed_requests_total",
+            endpoint="transcribe_upload",
+            status="503",
+        )
+        raise HTTPException(
+            status_code=503, detail=f"Local transcription engine unavailable: {e}"
+        ) from e
+
+    async with service.slots:
+        # ffmpeg needs a path to seek in containers like mp4
+        tmp_file_path, _ = await asyncio.to_thread(spool_upload, file.file, suffix)
+        try:
+            pcm = await asyncio.to_thread(service.decode, tmp_file_path)
+        except (ValueError, RuntimeError) as e:
+            instrumentation.inc(
+                "aissemble_failed_requests_total",
+                endpoint="transcribe_upload",
+                status="400",
+            )
+            raise HTTPException(
+                status_code=400, detail=str(e).replace(tmp_file_path, file.filename)
+            ) from e
+        finally:
+            Path(tmp_file_path).unlink(missing_ok=True)
+
+    result = await service.transcribe_pcm_async(pcm, file.filename)
+    return build_response([result]).results[0]
+
+
+def build_response(results: list[TranscriptionResult]) -> TranscriptionResponseModel:
+    """Summarize a batch of transcription results."""
+    result_models = [
+        TranscriptionResultModel(
+            s3_uri=r.s3_uri,
+            success=r.success,
+            s3_output_uri=r.s3_output_uri,
+            error=r.error,
+            metrics=r.metrics,
+            transcript=r.transcript,
+        )
+        for r in results
+    ]
+
+    successful = sum(1 for r in results if r.success)
+
+    return TranscriptionResponseModel(
+        total_files=len(results),
+        successful=successful,
+        failed=len(results) - successful,
+        results=result_models,
+    )
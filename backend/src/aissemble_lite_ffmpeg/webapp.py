@@ -41,15 +41,31 @@ configure the relevant routes to call your project-specific code.
 """
 
 import asyncio
+import inspect
+import logging
 import os
-
+from collections.abc import AsyncIterator, Callable
+from contextlib import asynccontextmanager
 
 from aissemble_open_inference_protocol_fastapi.aissemble_oip_fastapi import (
     AissembleOIPFastAPI,
 )
-from .preprocessing.transcribe import TranscriptionService
+from aissemble_open_inference_protocol_fastapi.rest import endpoints as oip_endpoints
+from aissemble_open_inference_protocol_shared.types.dataplane import InferenceResponse
+from fastapi import APIRouter, FastAPI
+from fastapi.responses import Response
+from fastapi.routing import APIRoute
+
+from .instrumentation import CONTENT_TYPE, instrumentation
 from .modeling.handler import InferenceHandler
+from .preprocessing.input_handler import shared_input_handler
+from .preprocessing.local_transcribe import close_shared_local_service
+from .preprocessing.metrics_sink import default_sink
+from .preprocessing.transcribe import shared_transcription_service
+from .routers.audio import pool
 from .routers.audio import router as audio_router
+from .routers.jobs import router as jobs_router
+from .routers.transcription import router as transcription_router
 
 from pydantic import BaseModel
 
@@ -62,8 +78,6 @@ Users should update this to use their custom handler/adapter as needed.
 For more information, reference the aiSSEMBLE Open Inference Protocol FastAPI README
 (https://github.com/boozallen/aissemble-open-inference-protocol/blob/dev/aissemble-open-inference-protocol-fastapi/README.md).
 """
-import logging
-
 logging.basicConfig(
     level=logging.INFO,
     format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
@@ -71,38 +85,99 @@ logging.basicConfig(
         logging.StreamHandler() 
     ]
 )
-service = AissembleOIPFastAPI(InferenceHandler)
-app = service.server
-app.include_router(audio_router)
-
-class MyResponseModel(BaseModel):
-    """Response model for greeting."""
-
-    content: str = "Hello World"
+logger = logging.getLogger(__name__)
 
 
-class TranscriptionRequestModel(BaseModel):
-    """Request model for batch transcription."""
+@asynccontextmanager
+async def lifespan(app: FastAPI) -> AsyncIterator[None]:
+    """Create the shared handlers and AWS clients once, before the first request.
 
-    s3_uris: list[str]
+    With TRANSCRIPTION_BACKEND=local this also loads the transcription model, so the
+    first request doesn't wait for it, and the inference model (MODEL_PATH) starts
+    loading in the background; /v2/models/{name}/ready reports when it is warm.
 
+    Their creation time is kept on `app.state.client_creation_seconds`.
+    """
+    inference_handler.load()
+    (_, input_seconds), (_, transcribe_seconds) = await asyncio.gather(
+        asyncio.to_thread(shared_input_handler),
+        asyncio.to_thread(shared_transcription_service),
+    )
+    app.state.client_creation_seconds = {
+        "input_handler": round(input_seconds, 3),
+        "transcription_service": round(transcribe_seconds, 3),
+    }
+    logger.info("shared clients ready: %s", app.state.client_creation_seconds)
+    yield
+    await asyncio.to_thread(pool.shutdown)
+    # lets clips queued for the local engine finish
+    await asyncio.to_thread(close_shared_local_service)
+    await asyncio.to_thread(inference_handler.close)
+    # write out buffered metrics records
+    await asyncio.to_thread(default_sink().close)
+
+
+def run_infer_routes_on_threads(router: APIRouter) -> None:
+    """Rebuild the OIP infer routes that are `async def` as plain `def` routes.
+
+    The OIP versioned infer route is declared async but calls the handler's blocking
+    `infer` inline, so every request held the event loop until its clips were
+    transcribed. As plain routes they run on the threadpool like the unversioned one.
+    Has to run before the router is included in an app.
+
+    Raises:
+        RuntimeError: If the router has no versioned infer route, it relies on the
+            OIP router layout and would otherwise silently leave the loop blocked.
+    """
+    infer_paths = []
+    for index, route in enumerate(router.routes):
+        if not (isinstance(route, APIRoute) and route.path.endswith("/infer")):
+            continue
+        infer_paths.append(route.path)
+        if not asyncio.iscoroutinefunction(route.endpoint):
+            continue
+
+        def endpoint(
+            *args, _endpoint: Callable = route.endpoint, **kwargs
+        ) -> InferenceResponse:
+            # the endpoint never awaits anything, its coroutine only wraps blocking code
+            return asyncio.run(_endpoint(*args, **kwargs))
+
+        # not functools.wraps, FastAPI unwraps it and would see the coroutine again
+        endpoint.__signature__ = inspect.signature(route.endpoint)
+        endpoint.__name__ = route.endpoint.__name__
+        endpoint.__doc__ = route.endpoint.__doc__
+
+        router.routes[index] = APIRoute(
+            route.path,
+            endpoint,
+            methods=route.methods,
+            response_model=route.response_model,
+            status_code=route.status_code,
+            summary=route.summary,
+            response_description=route.response_description,
+            responses=route.responses,
+        )
 
-class TranscriptionResultModel(BaseModel):
-    """Result model for a single file transcription."""
+    if not any("/versions/" in path for path in infer_paths):
+        msg = f"No versioned infer route to run on threads, found {infer_paths}"
+        raise RuntimeError(msg)
 
-    s3_uri: str
-    success: bool
-    s3_output_uri: str | None = None
-    error: str | None = None
 
+# the OIP app calls the instance it is given, that one holds the model and its batcher
+inference_handler = InferenceHandler()
+run_infer_routes_on_threads(oip_endpoints.router)
+service = AissembleOIPFastAPI(inference_handler)
+app = service.server
+app.router.lifespan_context = lifespan
+app.include_router(audio_router)
+app.include_router(jobs_router)
+app.include_router(transcription_router)
 
-class TranscriptionResponseModel(BaseModel):
-    """Response model for batch transcription."""
+class MyResponseModel(BaseModel):
+    """Response model for greeting."""
 
-    total_files: int
-    successful: int
-    failed: int
-    results: list[TranscriptionResultModel]
+    content: str = "Hello World"
 
 
 @app.get("/", response_model=MyResponseModel)
@@ -111,45 +186,11 @@ async def root() -> MyResponseModel:
     return MyResponseModel(content="Hello World")
 
 
-@app.post("/transcribe", response_model=TranscriptionResponseModel)
-async def transcribe_files(
-    request: TranscriptionRequestModel,
-) -> TranscriptionResponseModel:
-    """Transcribe media files from S3.
-
-    Accepts a list of S3 URIs, transcribes them using AWS Transcribe,
-    and saves the transcripts to the output/ folder in the same S3 bucket.
-
-    Args:
-        request: Request containing list of S3 URIs to transcribe.
+@app.get("/metrics", include_in_schema=False)
+async def metrics() -> Response:
+    """Stage latency histograms, counters and worker pool gauges for Prometheus."""
+    return Response(content=instrumentation.render(), media_type=CONTENT_TYPE)
 
-    Requires environment variables:
-    - AWS_REGION: AWS region (default: us-east-1)
-
-    Returns:
-        TranscriptionResponseModel with summary and individual file results.
-    """
-    transcription_service = TranscriptionService()
-    results = transcription_service.transcribe_all(request.s3_uris)
-
-    result_models = [
-        TranscriptionResultModel(
-            s3_uri=r.s3_uri,
-            success=r.success,
-            s3_output_uri=r.s3_output_uri,
-            error=r.error,
-        )
-        for r in results
-    ]
-
-    successful = sum(1 for r in results if r.success)
-
-    return TranscriptionResponseModel(
-        total_files=len(results),
-        successful=successful,
-        failed=len(results) - successful,
-        results=result_models,
-    )
 
 def start_app() -> None:
     """Start the AissembleOIPFastAPI webapp."""
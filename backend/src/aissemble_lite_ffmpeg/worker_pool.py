@@ -0,0 +1,272 @@
+# Copyright 2025 Booz Allen Hamilton.
+#
+# Booz Allen Hamilton Confidential Information.
+#
+# The contents of this file are the intellectual property of
+# Booz Allen Hamilton, Inc. ("BAH") and are subject to copyright protection
+# under the laws of the United States and other countries.
+#
+# You acknowledge that misappropriation, misuse, or redistribution of content
+# on the file could cause irreparable harm to BAH and/or to third parties.
+#
+# You may not copy, reproduce, distribute, publish, display, execute, modify,
+# create derivative works of, transmit, sell or offer for resale, or in any way
+# exploit any part of this code or program without BAH's express written permission.
+#
+# The contents of this code or program contains code
+# that is itself or was created using artificial intelligence.
+#
+# To the best of our knowledge, this code does not infringe third-party intellectual
+# property rights, contain errors, inaccuracies, bias, or security concerns.
+#
+# However, Booz Allen does not warrant, claim, or provide any implied
+# or express warranty for the aforementioned, nor of merchantability
+# or fitness for purpose.
+#
+# Booz Allen expressly limits liability, whether by contract, tort or in equity
+# for any damage or harm caused by use of this artificial intelligence code or program.
+#
+# Booz Allen is providing this code or program "as is" with the understanding
+# that any separately negotiated standards of performance for said code
+# or program will be met for the duration of any applicable contract under which
+# the code or program is provided.
+
+"""Bounded worker pool for running blocking pipeline work off the event loop."""
+
+import asyncio
+import logging
+import multiprocessing
+import os
+import threading
+import time
+from collections.abc import Callable
+from concurrent.futures import (
+    Executor,
+    Future,
+    ProcessPoolExecutor,
+    ThreadPoolExecutor,
+)
+from typing import Any
+
+logger = logging.getLogger(__name__)
+
+
+class PoolFullError(RuntimeError):
+    """Raised when the pool already holds the maximum number of admitted tasks."""
+
+
+# calls for the parent collected by the running task, only set in process pool workers
+_parent_calls: list[tuple[Callable, tuple]] | None = None
+
+
+def _init_process_worker() -> None:
+    """Mark a process pool worker, so `run_in_parent` hands its calls back."""
+    global _parent_calls
+    _parent_calls = []
+
+
+def run_in_parent(fn: Callable, *args) -> None:
+    """Call `fn(*args)` in the process that owns the pool.
+
+    Process wide state (e.g. the metrics sink and the conversion cache) must only be
+    updated by one process. In a process pool worker the call is returned with the
+    task's result and made by the parent when the task is done, calls of a failed task
+    are dropped. Everywhere else it is made right away. `fn` and `args` must be
+    picklable.
+    """
+    if _parent_calls is None:
+        fn(*args)
+    else:
+        _parent_calls.append((fn, args))
+
+
+def _run_calls(calls: list[tuple[Callable, tuple]]) -> None:
+    for fn, args in calls:
+        fn(*args)
+
+
+def _timed_call(fn: Callable, *args) -> tuple[float, Any, list]:
+    """Run `fn` in the worker and report when it actually started.
+
+    Also returns the calls it left for the parent (see `run_in_parent`).
+    Module level so it can be pickled for process pools.
+    """
+    started_at = time.time()
+    if _parent_calls is not None:
+        _parent_calls.clear()
+    result = fn(*args)
+    calls = list(_parent_calls) if _parent_calls else []
+    return started_at, result, calls
+
+
+class WorkerPool:
+    """Thread or process pool with an admission limit.
+
+    At most `max_workers` tasks run at once and at most `max_queued` more wait for a
+    worker; anything beyond that is rejected with `PoolFullError` so overload turns into
+    fast 503s instead of an ever-growing backlog.
+
+    Configured with environment variables:
+    - WORKER_POOL_KIND: `thread` (default) or `process`
+    - WORKER_POOL_SIZE: number of workers (default: cpu count)
+    - WORKER_POOL_MAX_QUEUED: tasks allowed to wait for a worker (default: 2 * workers)
+    """
+
+    def __init__(
+        self,
+        kind: str | None = None,
+        max_workers: int | None = None,
+        max_queued: int | None = None,
+    ) -> None:
+        """Initialize the pool, workers are started lazily on first use."""
+        self.kind = kind or os.getenv("WORKER_POOL_KIND", "thread")
+        self.max_workers = max_workers or int(
+            os.getenv("WORKER_POOL_SIZE", str(os.cpu_count() or 1))
+        )
+        self.max_queued = (
+            max_queued
+            if max_queued is not None
+            else int(os.getenv("WORKER_POOL_MAX_QUEUED", str(self.max_workers * 2)))
+        )
+
+        if self.kind == "process":
+            # spawn so workers don't inherit the parent's threads and boto3 clients
+            self._executor: Executor = ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_process_worker,
+            )
+        elif self.kind == "thread":
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.max_workers, thread_name_prefix="pipeline"
+            )
+        else:
+            msg = (
+                f"Unsupported worker pool kind: {self.kind}. Use 'thread' or 'process'"
+            )
+            raise ValueError(msg)
+
+        # unpicklable work (e.g. streamed request bodies) always runs on threads
+        self._thread_executor = (
+            self._executor
+            if self.kind == "thread"
+            else ThreadPoolExecutor(
+                max_workers=self.max_workers, thread_name_prefix="pipeline"
+            )
+        )
+
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._completed = 0
+        self._rejected = 0
+
+    @property
+    def queue_depth(self) -> int:
+        """Number of admitted tasks waiting for a free worker."""
+        return max(0, self._in_flight - self.max_workers)
+
+    @property
+    def is_full(self) -> bool:
+        """True if a new task would be rejected right now."""
+        return self._in_flight >= self.max_workers + self.max_queued
+
+    def stats(self) -> dict:
+        """Snapshot of the pool state."""
+        with self._lock:
+            return {
+                "kind": self.kind,
+                "max_workers": self.max_workers,
+                "max_queued": self.max_queued,
+                "in_flight": self._in_flight,
+                "queue_depth": self.queue_depth,
+                "completed_total": self._completed,
+                "rejected_total": self._rejected,
+            }
+
+    def reserve(self) -> None:
+        """Admit a task now that is started later with `run(..., reserved=True)`.
+
+        The reservation counts as in flight from this call on, so work accepted for
+        the background (e.g. a job) can't be rejected once it starts. A reservation
+        that won't be used has to be given back with `release`.
+
+        Raises:
+            PoolFullError: if the admission limit is reached.
+        """
+        with self._lock:
+            if self.is_full:
+                self._rejected += 1
+                msg = (
+                    f"Worker pool is full ({self._in_flight} tasks in flight), try "
+                    "again later"
+                )
+                raise PoolFullError(msg)
+            self._in_flight += 1
+
+    def release(self) -> None:
+        """Give back a reservation that was not used."""
+        with self._lock:
+            self._in_flight -= 1
+
+    def _task_done(self, _future: Future) -> None:
+        with self._lock:
+            self._in_flight -= 1
+            self._completed += 1
+
+    async def run(
+        self, fn: Callable, *args, thread_only: bool = False, reserved: bool = False
+    ) -> tuple[Any, dict]:
+        """Run `fn(*args)` on the pool without blocking the event loop.
+
+        Args:
+            fn: blocking callable, must be picklable (module level) for process pools.
+            *args: positional arguments for `fn`.
+            thread_only: run on a thread even if this is a process pool.
+            reserved: the task was admitted with `reserve` already.
+
+        Returns:
+            Tuple of (result, pool_metrics) where pool_metrics has the queue wait time
+            and the queue depth seen at submission.
+
+        Raises:
+            PoolFullError: if the admission limit is reached.
+        """
+        if not reserved:
+            self.reserve()
+        with self._lock:
+            queue_depth = self.queue_depth
+
+        executor = self._thread_executor if thread_only else self._executor
+        submitted_at = time.time()
+        try:
+            future = executor.submit(_timed_call, fn, *args)
+        except BaseException:
+            self.release()
+            raise
+        # the slot is held until the work is over, not until the caller stops waiting
+        future.add_done_callback(self._task_done)
+        done = asyncio.wrap_future(future)
+        try:
+            started_at, result, calls = await asyncio.shield(done)
+        except asyncio.CancelledError:
+            # dropped if it still waits for a worker; running work can't be stopped,
+            # so the caller's cleanup (e.g. deleting the input file) waits for it.
+            # Its calls for the parent are dropped like those of a failed task.
+            done.add_done_callback(lambda done: done.cancelled() or done.exception())
+            if not future.cancel():
+                await asyncio.wait([done])
+            raise
+        if calls:
+            await asyncio.to_thread(_run_calls, calls)
+
+        pool_metrics = {
+            "queue_wait_time_seconds": round(max(0.0, started_at - submitted_at), 3),
+            "queue_depth_at_submit": queue_depth,
+        }
+        return result, pool_metrics
+
+    def shutdown(self) -> None:
+        """Stop the workers, waiting for running tasks to finish."""
+        self._executor.shutdown(wait=True, cancel_futures=True)
+        if self._thread_executor is not self._executor:
+            self._thread_executor.shutdown(wait=True, cancel_futures=True)
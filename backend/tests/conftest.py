@@ -42,9 +42,14 @@ Additionally, the test_*.py files can always declare their own fixtures if the u
 of the fixture is limited to a single test module.
 """
 
+from collections.abc import Iterator
+from pathlib import Path
 from typing import Literal
 
 import pytest
+from fastapi.testclient import TestClient
+
+from tests.performance.fakes import FakeS3, FakeTranscribe
 
 
 @pytest.fixture()
@@ -54,3 +59,69 @@ def sample_fixture() -> Literal[True]:
     This is part of the repo template, and can be deleted once used.
     """
     return True
+
+
+@pytest.fixture()
+def fake_s3() -> Iterator[FakeS3]:
+    """In-memory s3 client that keeps object bodies."""
+    s3 = FakeS3(keep_bodies=True)
+    yield s3
+    s3.close()
+
+
+@pytest.fixture()
+def fake_transcribe(fake_s3: FakeS3) -> FakeTranscribe:
+    """Transcribe client whose jobs finish after 0.1s and write to `fake_s3`."""
+    return FakeTranscribe(job_seconds=0.1, s3_client=fake_s3)
+
+
+@pytest.fixture()
+def client(
+    fake_s3: FakeS3,
+    fake_transcribe: FakeTranscribe,
+    tmp_path: Path,
+    monkeypatch: pytest.MonkeyPatch,
+) -> Iterator[TestClient]:
+    """The app on the s3 and transcribe fakes, with caches and metrics in `tmp_path`.
+
+    The shared handler and service the endpoints use are replaced by ones on the
+    fakes. The lifespan is not run, it would create the real clients.
+    """
+    krausening = Path(__file__).parents[1] / "src/resources/krausening/base"
+    monkeypatch.setenv("KRAUSENING_BASE", str(krausening))
+    monkeypatch.setenv("SAVE_METRICS", "false")
+    monkeypatch.setenv("CONVERSION_CACHE_INDEX", str(tmp_path / "conversion.json"))
+    monkeypatch.setenv("TRANSCRIPTION_CACHE_INDEX", str(tmp_path / "tx.json"))
+    monkeypatch.setenv("TRANSCRIBE_POLL_INTERVAL_SECONDS", "0.05")
+    monkeypatch.setenv("TRANSCRIBE_POLL_MAX_INTERVAL_SECONDS", "0.1")
+
+    from aissemble_lite_ffmpeg.preprocessing import (
+        conversion_cache,
+        input_handler,
+        transcribe,
+        transcription_cache,
+    )
+    from aissemble_lite_ffmpeg.preprocessing.s3_handler import S3Handler
+    from aissemble_lite_ffmpeg.webapp import app
+
+    # process wide instances, recreated on the paths set above
+    instances = (
+        conversion_cache.default_cache,
+        transcription_cache.default_transcription_cache,
+        transcription_cache.default_transcript_store,
+    )
+    for instance in instances:
+        instance.cache_clear()
+    monkeypatch.setattr(
+        input_handler,
+        "_shared_handler",
+        input_handler.InputHandler(S3Handler(s3_client=fake_s3)),
+    )
+    monkeypatch.setattr(
+        transcribe,
+        "_shared_service",
+        transcribe.TranscriptionService(transcribe_client=fake_transcribe),
+    )
+    yield TestClient(app)
+    for instance in instances:
+        instance.cache_clear()
@@ -3,22 +3,51 @@ Docstring for aissemble-lite-ffmpeg.backend.tests.performance.baseline_test
 
 process test videos/audio files through endpoints: `audio/process` and `/transcribe` collected end-2-end metrics
 including speeds for the WAV conversion with FFMPEG, S3 upload time, and transcription time
+
+it is also a load generator: files are sent at a configurable concurrency (closed loop) or arrival rate (open loop),
+the run is summarized as p50/p95/p99 and throughput per stage, and compared against the results of an earlier run
+stored in a JSONL file to flag regressions.
+
+usage: `python baseline_test.py [files...] [--concurrency 4] [--rate 2] [--repeat 3] [--synthetic 5,60,600]
+                                [--types .mp3,.mp4] [--audio sine|noise] [--offline] [--no-transcribe] [--baseline results.jsonl] [--threshold 0.2]`
+- `--offline` starts the app in this process with in-memory s3/transcribe fakes (see fakes.py), no aws or server needed
+- `--synthetic` uses generated fixtures (see fixtures.py) of the given durations in seconds instead of test_files
 """
 # imports
+import argparse
 import json
 import os
 import requests
+import statistics
 import sys
+import threading
 import time
+import uuid
 
+from concurrent.futures import ThreadPoolExecutor
 from typing import Any
 from datetime import datetime
 from pathlib import Path
 
+from fixtures import AUDIO_SOURCES, fixture_matrix, parse_list
+
 # configuration set up paths for api url, video directory and result/summary destination files
 API_BASE_URL = os.getenv("API_BASE_URL", "http://localhost:8080")
 TEST_VIDEO_DIR = Path(__file__).parent / "test_files"
 RESULTS_FILE = Path(__file__).parent / "baseline_results.jsonl"
+EXTENSIONS = {".mp4", ".avi", ".mp3", ".wav", ".webm", ".m4a", ".flac"}
+
+# stage name -> where its seconds are in a result record
+STAGES = {
+    "pipeline": lambda r: r.get("total_pipeline_seconds"),
+    "process_request": lambda r: r.get("process_request_seconds"),
+    "server_total": lambda r: r["audio_processing"].get("total_processing_time_seconds"),
+    "queue_wait": lambda r: r["audio_processing"].get("queue_wait_time_seconds"),
+    "ffmpeg": lambda r: r["audio_processing"].get("ffmpeg_conversion_time_seconds"),
+    "s3_upload": lambda r: r["audio_processing"].get("s3_upload_time_seconds"),
+    "transcribe_request": lambda r: r.get("transcribe_request_seconds"),
+    "transcribe_wait": lambda r: ((r.get("transcription") or {}).get("metrics") or {}).get("job_wait_seconds"),
+}
 
 def process_file(file_path: Path) -> dict[str, Any]:
     """Process single file through audio processing endpoint"""
@@ -26,7 +55,7 @@ def process_file(file_path: Path) -> dict[str, Any]:
         files = {"file": (file_path.name, f)} # pass filename, object for files param
         response = requests.post(f"{API_BASE_URL}/audio/process", files=files, timeout=1800)
         response.raise_for_status() # raise so we don't have to check manually
-        return response.json() # parse JSON string into python dictionary 
+        return response.json() # parse JSON string into python dictionary
 
 def transcribe_file(s3_uri: str)-> dict[str, Any]:
     """Transcribe file using transcription endpoint"""
@@ -38,18 +67,23 @@ def transcribe_file(s3_uri: str)-> dict[str, Any]:
     response.raise_for_status()
     return response.json()
 
-def run_pipeline(file_path: str)-> dict[str, Any]:
-    """Run full pipeline for isngle file"""
+def run_pipeline(file_path: Path, transcribe: bool = True)-> dict[str, Any]:
+    """Run full pipeline for single file"""
     # start clock
     start = time.time()
-    # get file information
 
     # process file
     audio_result = process_file(file_path)
     s3_uri = audio_result["s3_uri"]
+    process_seconds = time.time() - start
 
     # transcribe file
-    transcription = transcribe_file(s3_uri)
+    transcription = None
+    transcribe_seconds = None
+    if transcribe:
+        transcribe_start = time.time()
+        transcription = transcribe_file(s3_uri)["results"][0]
+        transcribe_seconds = time.time() - transcribe_start
 
     # end clock
     total_time = time.time() - start
@@ -60,75 +94,235 @@ def run_pipeline(file_path: str)-> dict[str, Any]:
         "filename": file_path.name,
         "s3_uri": s3_uri,
         "audio_processing": audio_result["metrics"],
-        "transcription": transcription["results"][0],
+        "transcription": transcription,
+        "process_request_seconds": round(process_seconds, 3),
+        "transcribe_request_seconds": round(transcribe_seconds, 3) if transcribe_seconds is not None else None,
         "total_pipeline_seconds": round(total_time, 3)
     }
-    
+
     return result
 
-def save_result(result: dict[str, Any])-> None:
+def save_result(result: dict[str, Any], results_file: Path = RESULTS_FILE)-> None:
     """Write result to jsonl file"""
-    with open(RESULTS_FILE, "a") as f:
+    with open(results_file, "a") as f:
         f.write(json.dumps(result) + "\n")
 
-def generate_summary(results: list[dict[str, Any]])->None:
-    """Generate summary from all results jsonl"""
+def load_results(results_file: Path, run_id: str | None = None, exclude_run: str | None = None) -> list[dict[str, Any]]:
+    """Successful records of a results jsonl, optionally of one run only"""
+    results = []
+    if not results_file.exists():
+        return results
+    with open(results_file) as f:
+        for line in f:
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            if record.get("error") or "audio_processing" not in record:
+                continue
+            if run_id and record.get("run_id") != run_id:
+                continue
+            if exclude_run and record.get("run_id") == exclude_run:
+                continue
+            results.append(record)
+    return results
+
+def audio_seconds(result: dict[str, Any]) -> float | None:
+    """Duration of the processed input, from the input metadata the endpoint returned"""
+    try:
+        return float(result["audio_processing"]["input_metadata"]["format"]["duration"])
+    except (KeyError, TypeError, ValueError):
+        return None
+
+def percentiles(values: list[float]) -> dict[str, float]:
+    """p50/p95/p99 (inclusive method, so small runs still get values)"""
+    if len(values) == 1:
+        return {"p50": values[0], "p95": values[0], "p99": values[0]}
+    cuts = statistics.quantiles(values, n=100, method="inclusive")
+    return {"p50": cuts[49], "p95": cuts[94], "p99": cuts[98]}
+
+def stage_stats(results: list[dict[str, Any]]) -> dict[str, dict[str, float]]:
+    """Percentiles per stage, plus throughput as audio seconds processed per second spent in the stage"""
+    stats = {}
+    for stage, read in STAGES.items():
+        pairs = [(value, audio_seconds(r)) for r in results if isinstance(value := read(r), (int, float))]
+        if not pairs:
+            continue
+        values = [value for value, _ in pairs]
+        stats[stage] = {"count": len(values), **percentiles(values)}
+        timed = [(value, duration) for value, duration in pairs if duration is not None]
+        stage_seconds = sum(value for value, _ in timed)
+        if timed and stage_seconds > 0:
+            stats[stage]["audio_seconds_per_second"] = sum(duration for _, duration in timed) / stage_seconds
+    return stats
+
+def generate_summary(results: list[dict[str, Any]], wall_seconds: float | None = None, failed: int = 0)->dict[str, Any]:
+    """Generate summary of a run: per stage percentiles and throughput"""
     if not results:
-        return
-    
+        return {}
+
     print(f"\n{'='*60}")
     print("SUMMARY")
     print(f"{'='*60}")
-    print(f"Total files: {len(results)}")
-    
-    avg_pipeline = sum(r["total_pipeline_seconds"] for r in results) / len(results)
-    avg_ffmpeg = sum(r["audio_processing"]["ffmpeg_conversion_time_seconds"] for r in results) / len(results)
-    avg_s3 = sum(r["audio_processing"]["s3_upload_time_seconds"] for r in results) / len(results)
-    
-    print("\nAverages:")
-    print(f"  Total Pipeline: {avg_pipeline:.1f}s")
-    print(f"  FFmpeg: {avg_ffmpeg:.1f}s")
-    print(f"  S3 Upload: {avg_s3:.1f}s")
+    print(f"Total files: {len(results)} ok, {failed} failed")
 
-def main():
+    stats = stage_stats(results)
+    print(f"\n{'stage':<20} {'n':>5} {'p50':>9} {'p95':>9} {'p99':>9} {'audio s/s':>10}")
+    for stage, s in stats.items():
+        throughput = f"{s['audio_seconds_per_second']:>10.1f}" if "audio_seconds_per_second" in s else f"{'-':>10}"
+        print(f"{stage:<20} {s['count']:>5} {s['p50']:>8.2f}s {s['p95']:>8.2f}s {s['p99']:>8.2f}s {throughput}")
 
-    # print results/write file
-    print("Baseline Testing")
-    print(f"API: {API_BASE_URL}")
-    print(f"Test Dir: {TEST_VIDEO_DIR}\n")
-    
-    if not TEST_VIDEO_DIR.exists():
-        print(f"Error: {TEST_VIDEO_DIR} not found")
-        sys.exit(1)
+    if wall_seconds:
+        total_audio = sum(d for r in results if (d := audio_seconds(r)) is not None)
+        print(f"\nThroughput: {len(results) / wall_seconds:.2f} files/s, {total_audio / wall_seconds:.1f} audio s/s over {wall_seconds:.1f}s wall time")
+    return stats
 
-    extensions = {".mp4", ".avi", ".mp3", ".wav", ".webm", ".m4a"}
+def compare_to_baseline(current: dict[str, dict[str, float]], baseline: dict[str, dict[str, float]], threshold: float, min_delta: float = 0.0) -> list[str]:
+    """Stages whose p50 or p95 got slower than the baseline by more than `threshold` (0.2 = 20%)
 
-    # iterate over files in /test_files
-    files = [f for f in TEST_VIDEO_DIR.rglob("*") if f.suffix.lower() in extensions]
-    
-    if not files:
-        print("No test files found")
-        sys.exit(1)
-    
-    print(f"Found {len(files)} files\n")
+    slowdowns under `min_delta` seconds are ignored so jitter in stages of a few ms isn't reported
+    """
+    regressions = []
+    print(f"\n{'stage':<20} {'metric':>6} {'baseline':>10} {'current':>10} {'change':>8}")
+    for stage, stats in current.items():
+        if stage not in baseline:
+            continue
+        for metric in ("p50", "p95"):
+            before, after = baseline[stage][metric], stats[metric]
+            change = (after - before) / before if before > 0 else 0.0
+            flag = ""
+            if change > threshold and after - before > min_delta:
+                flag = "  REGRESSION"
+                regressions.append(f"{stage} {metric} {before:.2f}s -> {after:.2f}s ({change:+.0%})")
+            print(f"{stage:<20} {metric:>6} {before:>9.2f}s {after:>9.2f}s {change:>+8.0%}{flag}")
+    return regressions
+
+def start_offline_server(s3_mbps: float | None, transcribe_seconds: float) -> str:
+    """Run the app in this process on a free port with fake s3/transcribe clients, returns its base url"""
+    os.environ.setdefault("KRAUSENING_BASE", str(Path(__file__).parents[2] / "src/resources/krausening/base"))
+    os.environ.setdefault("CONVERSION_CACHE", "false")
+    os.environ.setdefault("SAVE_METRICS", "false")
+    os.environ.setdefault("TRANSCRIBE_POLL_INTERVAL_SECONDS", "0.2")
+    os.environ.setdefault("TRANSCRIBE_EXPECTED_OVERHEAD_SECONDS", str(transcribe_seconds))
+    os.environ.setdefault("TRANSCRIBE_EXPECTED_REALTIME_FACTOR", "0")
+    import socket
+
+    import uvicorn
+    from aissemble_lite_ffmpeg.preprocessing import input_handler, transcribe
+    from aissemble_lite_ffmpeg.preprocessing.s3_handler import S3Handler
+    from fakes import FakeS3, FakeTranscribe
 
+    # the shared instances are what the endpoints use, the lifespan keeps them
+    input_handler._shared_handler = input_handler.InputHandler(S3Handler(s3_client=FakeS3(mbps=s3_mbps)))
+    transcribe._shared_service = transcribe.TranscriptionService(transcribe_client=FakeTranscribe(job_seconds=transcribe_seconds))
+    from aissemble_lite_ffmpeg.webapp import app
+
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+    threading.Thread(target=server.run, name="offline-server", daemon=True).start()
+    while not server.started:
+        time.sleep(0.05)
+    return f"http://127.0.0.1:{port}"
+
+def run_load(files: list[Path], concurrency: int, rate: float | None, transcribe: bool, run_id: str, results_file: Path) -> tuple[list, int, float]:
+    """Send every file through the pipeline, returns (results, failed count, wall seconds)
+
+    without `rate` this is a closed loop of `concurrency` clients, with it a new request starts every 1/rate seconds
+    (open loop, up to `concurrency` in flight, later arrivals wait for a free client)
+    """
     results = []
-    # iterate over fiels and pass through pipeline
-    for i, file_path in enumerate(files, 1):
-        print(f"[{i}/{len(files)}] {file_path.name}")
-        
+    failed = 0
+    lock = threading.Lock()
+
+    def one(index: int, file_path: Path):
+        nonlocal failed
         try:
-            result = run_pipeline(file_path)
-            save_result(result)
-            results.append(result)
-            print(f"Done in {result['total_pipeline_seconds']:.1f}s\n")
+            result = run_pipeline(file_path, transcribe)
+            result["run_id"] = run_id
+            with lock:
+                save_result(result, results_file)
+                results.append(result)
+            print(f"[{index}/{len(files)}] {file_path.name} done in {result['total_pipeline_seconds']:.1f}s")
         except Exception as e:
-            print(f"Failed: {e}\n")
-    
-    # read all jsonl files and call generate summary passing the list of jsonl files
-    generate_summary(results)
-    print(f"\nResults saved to: {RESULTS_FILE}")
+            with lock:
+                failed += 1
+                save_result({"timestamp": datetime.now().isoformat(), "run_id": run_id, "filename": file_path.name, "error": str(e)}, results_file)
+            print(f"[{index}/{len(files)}] {file_path.name} failed: {e}")
+
+    start = time.time()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        for index, file_path in enumerate(files, 1):
+            if rate:
+                # fixed arrival schedule, independent of how fast earlier requests finish
+                delay = start + (index - 1) / rate - time.time()
+                if delay > 0:
+                    time.sleep(delay)
+            executor.submit(one, index, file_path)
+    return results, failed, time.time() - start
+
+def main():
+    global API_BASE_URL
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("files", nargs="*", type=Path)
+    parser.add_argument("--concurrency", type=int, default=1, help="requests in flight at once")
+    parser.add_argument("--rate", type=float, help="arrivals per second (open loop), default is closed loop")
+    parser.add_argument("--repeat", type=int, default=1, help="send every file this many times")
+    parser.add_argument("--synthetic", help="comma separated fixture durations in seconds, e.g. 5,60,600")
+    parser.add_argument("--types", default=".mp3", help="(synthetic) comma separated containers, e.g. .mp3,.mp4,.wav")
+    parser.add_argument("--audio", choices=sorted(AUDIO_SOURCES), default="sine", help="(synthetic) audio source")
+    parser.add_argument("--no-transcribe", action="store_true", help="only call /audio/process")
+    parser.add_argument("--offline", action="store_true", help="run the app in process against fake s3/transcribe")
+    parser.add_argument("--fake-s3-mbps", type=float, default=50, help="(offline) simulated upload bandwidth")
+    parser.add_argument("--fake-transcribe-seconds", type=float, default=1, help="(offline) simulated transcription job time")
+    parser.add_argument("--results", type=Path, default=RESULTS_FILE, help="jsonl the results of this run are appended to")
+    parser.add_argument("--baseline", type=Path, help="results jsonl to compare against, e.g. a copy of an earlier run")
+    parser.add_argument("--baseline-run", help="only compare against this run_id of the baseline file")
+    parser.add_argument("--threshold", type=float, default=0.2, help="slowdown of p50/p95 flagged as regression")
+    parser.add_argument("--min-delta", type=float, default=0.1, help="ignore slowdowns smaller than this many seconds")
+    args = parser.parse_args()
+
+    if args.synthetic:
+        files = fixture_matrix(parse_list(args.types), [float(d) for d in parse_list(args.synthetic)], args.audio)
+    elif args.files:
+        files = args.files
+    else:
+        if not TEST_VIDEO_DIR.exists():
+            print(f"Error: {TEST_VIDEO_DIR} not found")
+            sys.exit(1)
+        # iterate over files in /test_files
+        files = [f for f in TEST_VIDEO_DIR.rglob("*") if f.suffix.lower() in EXTENSIONS]
+
+    if not files:
+        print("No test files found")
+        sys.exit(1)
+    files = files * args.repeat
+
+    if args.offline:
+        API_BASE_URL = start_offline_server(args.fake_s3_mbps, args.fake_transcribe_seconds)
+
+    run_id = f"{datetime.now().strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:6]}"
+    # print results/write file
+    print("Baseline Testing")
+    print(f"API: {API_BASE_URL}{' (offline)' if args.offline else ''}")
+    print(f"Run: {run_id}, {len(files)} requests, concurrency {args.concurrency}, rate {args.rate or 'closed loop'}\n")
+
+    results, failed, wall_seconds = run_load(files, args.concurrency, args.rate, not args.no_transcribe, run_id, args.results)
+
+    current = generate_summary(results, wall_seconds, failed)
+    print(f"\nResults saved to: {args.results} (run_id {run_id})")
+
+    if args.baseline:
+        baseline = stage_stats(load_results(args.baseline, args.baseline_run, exclude_run=run_id))
+        if not baseline:
+            print(f"\nNo baseline results in {args.baseline}")
+            return
+        regressions = compare_to_baseline(current, baseline, args.threshold, args.min_delta)
+        if regressions:
+            print("\nRegressions:\n  " + "\n  ".join(regressions))
+            sys.exit(2)
+        print("\nNo regressions")
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
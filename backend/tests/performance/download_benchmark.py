@@ -0,0 +1,149 @@
+"""
+Docstring for aissemble-lite-ffmpeg.backend.tests.performance.download_benchmark
+
+exercises the etl downloader (`etl.download.Downloader`) against a local http server serving generated files, no network:
+- cold: every file downloaded concurrently over the pooled session, compared with one at a time
+  (`--latency-ms` per request and `--mbps` per connection make the local server behave like a remote one)
+- warm: a rerun, every file should come back `unchanged` (304 on ETag / Last-Modified) without transferring data
+- resume: the server drops the connection halfway through a file, the next run finishes it with a Range request
+- checksum: a wrong sha256 fails the file and leaves neither the file nor a partial download behind
+
+the server supports Range/If-Range and conditional GETs, and counts connections so pooling shows in the report.
+usage: `python download_benchmark.py [--files 8] [--size-mb 8] [--concurrency 4] [--latency-ms 50] [--mbps 20]`
+exits with status 1 when a scenario doesn't behave as expected.
+"""
+
+# imports
+import argparse
+import hashlib
+import random
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+from aissemble_lite_ffmpeg.etl.download import Downloader, DownloadSpec
+from fakes import FileServer
+
+
+def make_files(count: int, size_mb: float) -> dict[str, bytes]:
+    rng = random.Random(42)
+    size = int(size_mb * 1024 * 1024)
+    return {f"file_{index:03d}.bin": rng.randbytes(size) for index in range(count)}
+
+
+def run(
+    server: FileServer, directory: Path, specs: list[DownloadSpec], concurrency: int
+):
+    """Download with a fresh downloader, returns (results, seconds, new connections)"""
+    connections = server.connections
+    start = time.perf_counter()
+    results = Downloader(directory, max_workers=concurrency).download_all(specs)
+    return results, time.perf_counter() - start, server.connections - connections
+
+
+def report(
+    name: str, results, seconds: float, connections: int, expected: set[str]
+) -> bool:
+    statuses = sorted({r.status for r in results})
+    transferred = sum(r.bytes_transferred for r in results)
+    ok = set(statuses) <= expected
+    print(
+        f"{name:<12} {seconds:>7.2f}s {transferred / 1024 / 1024:>8.1f} MB {transferred / 1024 / 1024 / max(seconds, 1e-9):>8.1f} MB/s "
+        f"{connections:>5} conn  {','.join(statuses):<20} {'ok' if ok else 'UNEXPECTED'}"
+    )
+    for r in results:
+        if r.status not in expected:
+            print(f"    {r.url}: {r.status} {r.error or ''}")
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--files", type=int, default=8)
+    parser.add_argument("--size-mb", type=float, default=8)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument(
+        "--latency-ms",
+        type=float,
+        default=50,
+        help="server delay before every response",
+    )
+    parser.add_argument(
+        "--mbps",
+        type=float,
+        default=20,
+        help="server bandwidth per connection, 0 for unthrottled",
+    )
+    args = parser.parse_args()
+
+    files = make_files(args.files, args.size_mb)
+    checksums = {name: hashlib.sha256(body).hexdigest() for name, body in files.items()}
+    server = FileServer(files, args.latency_ms / 1000, args.mbps or None)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    specs = [
+        DownloadSpec(f"{server.url}/{name}", sha256=checksums[name]) for name in files
+    ]
+    print(
+        f"{args.files} files of {args.size_mb:g} MB, {args.latency_ms:g}ms latency, "
+        f"{args.mbps or 'unthrottled'} MB/s per connection, concurrency {args.concurrency}\n"
+    )
+
+    all_ok = True
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        sequential_dir, directory = (
+            Path(tmp_dir) / "sequential",
+            Path(tmp_dir) / "concurrent",
+        )
+
+        results, seconds, connections = run(server, sequential_dir, specs, 1)
+        all_ok &= report("sequential", results, seconds, connections, {"downloaded"})
+        sequential_seconds = seconds
+
+        results, seconds, connections = run(server, directory, specs, args.concurrency)
+        all_ok &= report("cold", results, seconds, connections, {"downloaded"})
+        all_ok &= all(
+            hashlib.sha256((directory / name).read_bytes()).hexdigest()
+            == checksums[name]
+            for name in files
+        )
+        print(f"{'':<12} {sequential_seconds / seconds:>7.1f}x faster than sequential")
+
+        results, seconds, connections = run(server, directory, specs, args.concurrency)
+        all_ok &= report("warm", results, seconds, connections, {"unchanged"})
+
+        # first run is cut off halfway and fails, the second continues from the partial file
+        name = next(iter(files))
+        (directory / name).unlink()
+        (directory / f"{name}.meta.json").unlink()
+        server.cut_off.add(name)
+        results, seconds, connections = run(server, directory, specs[:1], 1)
+        all_ok &= report("interrupted", results, seconds, connections, {"failed"})
+        partial = directory / f"{name}.part"
+        print(
+            f"{'':<12} {partial.stat().st_size if partial.exists() else 0} bytes kept in {partial.name}"
+        )
+        results, seconds, connections = run(server, directory, specs[:1], 1)
+        all_ok &= report("resume", results, seconds, connections, {"resumed"})
+        all_ok &= (
+            server.requests[-1][1] is not None
+            and (directory / name).read_bytes() == files[name]
+        )
+
+        wrong = [
+            DownloadSpec(f"{server.url}/{name}", sha256="0" * 64, filename="wrong.bin")
+        ]
+        results, seconds, connections = run(server, directory, wrong, 1)
+        all_ok &= report("checksum", results, seconds, connections, {"failed"})
+        all_ok &= not any(directory.glob("wrong.bin*"))
+
+    server.shutdown()
+    print("\nall scenarios ok" if all_ok else "\nsome scenarios failed")
+    sys.exit(0 if all_ok else 1)
+
+
+if __name__ == "__main__":
+    main()
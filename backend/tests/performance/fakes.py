@@ -0,0 +1,470 @@
+"""
+Docstring for aissemble-lite-ffmpeg.backend.tests.performance.fakes
+
+in-process stand-ins for the boto3 s3 and transcribe clients, so the pipeline can be benchmarked without aws or network.
+they implement only the calls `S3Handler` and `TranscriptionService` make, and are passed in the way those classes take
+a client: `S3Handler(s3_client=FakeS3())`, `TranscriptionService(transcribe_client=FakeTranscribe())`.
+`FakeEngine` stands in for the local transcription model: `LOCAL_TRANSCRIBE_ENGINE=fakes:FakeEngine`.
+`FakeTranscribe(s3_client=...)` also writes placeholder transcripts, for paths that read job output (chunked transcription).
+`FileServer` is a local http server for the etl downloader, with Range/If-Range, conditional GETs and cut off responses.
+it also serves the presigned urls of `FakeS3`, so ffmpeg can read objects over http like it reads real s3.
+
+object bodies are dropped by default (only size and etag are kept) so hour long fixtures don't pile up in memory,
+and both fakes can simulate network cost so offline upload/transcription timings are not just zero.
+"""
+
+# imports
+import hashlib
+import itertools
+import json
+import os
+import threading
+import time
+import uuid
+from datetime import UTC, datetime
+from email.utils import formatdate
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import quote
+
+
+class FakeClientError(Exception):
+    """Raised like botocore's ClientError for missing objects/jobs"""
+
+
+class FakeS3:
+    """boto3 s3 client stand-in keeping objects in memory
+
+    `mbps` and `latency_seconds` simulate the network: every request sleeps for the latency plus its body size at that rate
+
+    presigned urls point at a `FileServer` started on first use, stop it with `close`
+    """
+
+    def __init__(
+        self,
+        keep_bodies: bool = False,
+        mbps: float | None = None,
+        latency_seconds: float = 0.0,
+    ):
+        self.keep_bodies = keep_bodies
+        self.mbps = mbps
+        self.latency_seconds = latency_seconds
+        self.objects = {}
+        self.uploads = {}
+        self.requests = 0
+        self.file_server = None
+        self._lock = threading.Lock()
+
+    def _transfer(self, size: int):
+        with self._lock:
+            self.requests += 1
+        delay = self.latency_seconds + (
+            size / (self.mbps * 1024 * 1024) if self.mbps else 0
+        )
+        if delay:
+            time.sleep(delay)
+
+    def _store(
+        self,
+        bucket: str,
+        key: str,
+        body: bytes,
+        size: int | None = None,
+        etag: str | None = None,
+        **extra,
+    ):
+        with self._lock:
+            self.objects[(bucket, key)] = {
+                "body": body if self.keep_bodies else None,
+                "size": len(body) if size is None else size,
+                # md5 like the etag of a plain s3 put, not for security
+                "etag": etag or hashlib.md5(body).hexdigest(),
+                "content_type": extra.get("ContentType"),
+            }
+
+    def _get(self, bucket: str, key: str) -> dict:
+        try:
+            return self.objects[(bucket, key)]
+        except KeyError:
+            raise FakeClientError(
+                f"An error occurred (404) when calling the HeadObject operation: Not Found ({bucket}/{key})"
+            )
+
+    def put_object(self, Bucket: str, Key: str, Body: bytes, **kwargs) -> dict:
+        self._transfer(len(Body))
+        self._store(Bucket, Key, Body, **kwargs)
+        return {"ETag": f'"{self.objects[(Bucket, Key)]["etag"]}"'}
+
+    def upload_file(
+        self,
+        Filename: str,
+        Bucket: str,
+        Key: str,
+        ExtraArgs: dict | None = None,
+        **kwargs,
+    ):
+        with open(Filename, "rb") as f:
+            body = f.read()
+        self._transfer(len(body))
+        self._store(Bucket, Key, body, **(ExtraArgs or {}))
+
+    def create_multipart_upload(self, Bucket: str, Key: str, **kwargs) -> dict:
+        self._transfer(0)
+        upload_id = uuid.uuid4().hex
+        with self._lock:
+            self.uploads[upload_id] = {
+                "bucket": Bucket,
+                "key": Key,
+                "parts": {},
+                "extra": kwargs,
+            }
+        return {"UploadId": upload_id}
+
+    def upload_part(
+        self, Bucket: str, Key: str, UploadId: str, PartNumber: int, Body: bytes
+    ) -> dict:
+        self._transfer(len(Body))
+        etag = hashlib.md5(Body).hexdigest()
+        with self._lock:
+            self.uploads[UploadId]["parts"][PartNumber] = (
+                Body if self.keep_bodies else b"",
+                len(Body),
+                etag,
+            )
+        return {"ETag": f'"{etag}"'}
+
+    def complete_multipart_upload(
+        self, Bucket: str, Key: str, UploadId: str, MultipartUpload: dict
+    ) -> dict:
+        self._transfer(0)
+        with self._lock:
+            upload = self.uploads.pop(UploadId)
+        parts = [upload["parts"][p["PartNumber"]] for p in MultipartUpload["Parts"]]
+        etag = (
+            hashlib.md5(b"".join(bytes.fromhex(p[2]) for p in parts)).hexdigest()
+            + f"-{len(parts)}"
+        )
+        self._store(
+            Bucket,
+            Key,
+            b"".join(p[0] for p in parts),
+            size=sum(p[1] for p in parts),
+            etag=etag,
+            **upload["extra"],
+        )
+        return {"ETag": f'"{etag}"'}
+
+    def abort_multipart_upload(self, Bucket: str, Key: str, UploadId: str):
+        with self._lock:
+            self.uploads.pop(UploadId, None)
+
+    def head_object(self, Bucket: str, Key: str, **kwargs) -> dict:
+        self._transfer(0)
+        obj = self._get(Bucket, Key)
+        return {
+            "ContentLength": obj["size"],
+            "ETag": f'"{obj["etag"]}"',
+            "ContentType": obj["content_type"],
+        }
+
+    def get_object(
+        self, Bucket: str, Key: str, Range: str | None = None, **kwargs
+    ) -> dict:
+        obj = self._get(Bucket, Key)
+        if obj["body"] is None:
+            raise FakeClientError(
+                f"FakeS3 dropped the body of {Bucket}/{Key}, create it with keep_bodies=True"
+            )
+        body = obj["body"]
+        if Range:
+            start, end = Range.removeprefix("bytes=").split("-")
+            body = body[int(start) : int(end) + 1]
+        self._transfer(len(body))
+        return {
+            "Body": _Body(body),
+            "ContentLength": len(body),
+            "ETag": f'"{obj["etag"]}"',
+        }
+
+    def generate_presigned_url(
+        self, ClientMethod: str, Params: dict, ExpiresIn: int = 3600
+    ) -> str:
+        """url of the object on the local file server, which serves it as it is at this call"""
+        if ClientMethod != "get_object":
+            raise FakeClientError(
+                f"FakeS3 only presigns get_object, not {ClientMethod}"
+            )
+        bucket, key = Params["Bucket"], Params["Key"]
+        obj = self._get(bucket, key)
+        if obj["body"] is None:
+            raise FakeClientError(
+                f"FakeS3 dropped the body of {bucket}/{key}, create it with keep_bodies=True"
+            )
+        with self._lock:
+            if self.file_server is None:
+                self.file_server = FileServer({}, self.latency_seconds, self.mbps)
+                threading.Thread(
+                    target=self.file_server.serve_forever,
+                    kwargs={"poll_interval": 0.05},
+                    name="fake-s3-presigned",
+                    daemon=True,
+                ).start()
+            name = f"{bucket}/{quote(key)}"
+            self.file_server.files[name] = obj["body"]
+        return f"{self.file_server.url}/{name}?X-Amz-Expires={ExpiresIn}"
+
+    def close(self):
+        """stop the file server of the presigned urls, if one was started"""
+        with self._lock:
+            server, self.file_server = self.file_server, None
+        if server:
+            server.shutdown()
+            server.server_close()
+
+
+class _Body:
+    def __init__(self, data: bytes):
+        self.data = data
+
+    def read(self) -> bytes:
+        return self.data
+
+
+class FakeTranscribe:
+    """boto3 transcribe client stand-in, a job completes `job_seconds` after it was started
+
+    with `s3_client` (a FakeS3 with keep_bodies=True or a real client) every job writes a placeholder transcript json
+    to its output key, for code that reads the results
+    """
+
+    def __init__(
+        self, job_seconds: float = 1.0, latency_seconds: float = 0.0, s3_client=None
+    ):
+        self.job_seconds = job_seconds
+        self.latency_seconds = latency_seconds
+        self.s3_client = s3_client
+        self.jobs = {}
+        self.requests = 0
+        self._lock = threading.Lock()
+
+    def _call(self):
+        with self._lock:
+            self.requests += 1
+        if self.latency_seconds:
+            time.sleep(self.latency_seconds)
+
+    def _status(self, job: dict) -> tuple[str, datetime | None]:
+        completion = job["started"] + self.job_seconds
+        if time.time() < completion:
+            return "IN_PROGRESS", None
+        return "COMPLETED", datetime.fromtimestamp(completion, UTC)
+
+    def start_transcription_job(self, TranscriptionJobName: str, **kwargs) -> dict:
+        self._call()
+        with self._lock:
+            self.jobs[TranscriptionJobName] = {
+                "started": time.time(),
+                "request": kwargs,
+            }
+        if self.s3_client and "OutputKey" in kwargs:
+            media = kwargs["Media"]["MediaFileUri"]
+            output = {
+                "jobName": TranscriptionJobName,
+                "status": "COMPLETED",
+                "results": {"transcripts": [{"transcript": f"transcript of {media}"}]},
+            }
+            self.s3_client.put_object(
+                Bucket=kwargs["OutputBucketName"],
+                Key=kwargs["OutputKey"],
+                Body=json.dumps(output).encode(),
+            )
+        return {
+            "TranscriptionJob": {
+                "TranscriptionJobName": TranscriptionJobName,
+                "TranscriptionJobStatus": "IN_PROGRESS",
+            }
+        }
+
+    def get_transcription_job(self, TranscriptionJobName: str) -> dict:
+        self._call()
+        try:
+            job = self.jobs[TranscriptionJobName]
+        except KeyError:
+            raise FakeClientError(
+                f"The requested job couldn't be found: {TranscriptionJobName}"
+            )
+        status, completion = self._status(job)
+        response = {
+            "TranscriptionJobName": TranscriptionJobName,
+            "TranscriptionJobStatus": status,
+        }
+        if completion:
+            response["CompletionTime"] = completion
+        return {"TranscriptionJob": response}
+
+    def list_transcription_jobs(
+        self,
+        Status: str,
+        JobNameContains: str = "",
+        MaxResults: int = 100,
+        NextToken: str | None = None,
+    ) -> dict:
+        self._call()
+        with self._lock:
+            names = sorted(name for name in self.jobs if JobNameContains in name)
+        summaries = []
+        for name in names:
+            status, completion = self._status(self.jobs[name])
+            if status == Status:
+                summaries.append(
+                    {
+                        "TranscriptionJobName": name,
+                        "TranscriptionJobStatus": status,
+                        "CompletionTime": completion,
+                    }
+                )
+        start = int(NextToken or 0)
+        page = list(itertools.islice(summaries, start, start + MaxResults))
+        response = {"TranscriptionJobSummaries": page}
+        if start + MaxResults < len(summaries):
+            response["NextToken"] = str(start + MaxResults)
+        return response
+
+
+class FakeEngine:
+    """Local transcription engine stand-in, a batch takes `FAKE_ENGINE_REALTIME_FACTOR` of its audio duration
+
+    batches cost a fixed overhead plus the audio, like a model whose per call cost is amortized by batching
+    """
+
+    name = "fake"
+
+    def __init__(self, model_path: str | None = None):
+        self.model_path = model_path
+        self.realtime_factor = float(os.getenv("FAKE_ENGINE_REALTIME_FACTOR", "0.01"))
+        self.batch_overhead_seconds = float(
+            os.getenv("FAKE_ENGINE_BATCH_OVERHEAD_SECONDS", "0.1")
+        )
+        self.batches = []
+
+    def transcribe_batch(self, audios: list) -> list[list[dict]]:
+        seconds = [len(audio) / 16000 for audio in audios]
+        self.batches.append(len(audios))
+        time.sleep(self.batch_overhead_seconds + self.realtime_factor * sum(seconds))
+        return [
+            [
+                {
+                    "start": 0.0,
+                    "end": duration,
+                    "text": f"{duration:.1f} seconds of audio",
+                }
+            ]
+            for duration in seconds
+        ]
+
+
+# bytes `FileServer` writes at a time
+BLOCK_SIZE = 64 * 1024
+
+
+class FileServer(ThreadingHTTPServer):
+    """Serves `files` (name -> bytes) with validators, simulated latency/bandwidth and injectable failures"""
+
+    daemon_threads = True
+
+    def __init__(
+        self,
+        files: dict[str, bytes],
+        latency_seconds: float = 0.0,
+        mbps: float | None = None,
+    ):
+        super().__init__(("127.0.0.1", 0), FileHandler)
+        self.files = files
+        self.latency_seconds = latency_seconds
+        self.mbps = mbps
+        self.last_modified = formatdate(time.time() - 3600, usegmt=True)
+        # names whose next response is cut off halfway
+        self.cut_off = set()
+        self.connections = 0
+        self.requests = []
+        self._lock = threading.Lock()
+
+    def etag(self, name: str) -> str:
+        return f'"{hashlib.sha256(self.files[name]).hexdigest()[:16]}"'
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+
+class FileHandler(BaseHTTPRequestHandler):
+    # keep-alive, so the client's connection pool is used
+    protocol_version = "HTTP/1.1"
+
+    def setup(self):
+        super().setup()
+        with self.server._lock:
+            self.server.connections += 1
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        server = self.server
+        # presigned urls carry their signature in the query
+        name = self.path.partition("?")[0].lstrip("/")
+        with server._lock:
+            server.requests.append(
+                (name, self.headers.get("Range"), self.headers.get("If-None-Match"))
+            )
+        if server.latency_seconds:
+            time.sleep(server.latency_seconds)
+        if name not in server.files:
+            self.send_error(404)
+            return
+
+        body, etag = server.files[name], server.etag(name)
+        if self.headers.get("If-None-Match") == etag or (
+            not self.headers.get("If-None-Match")
+            and self.headers.get("If-Modified-Since") == server.last_modified
+        ):
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+
+        start = 0
+        range_header = self.headers.get("Range")
+        if range_header and self.headers.get("If-Range", etag) in (
+            etag,
+            server.last_modified,
+        ):
+            start = int(range_header.removeprefix("bytes=").split("-")[0])
+            if start >= len(body):
+                self.send_response(416)
+                self.send_header("Content-Range", f"bytes */{len(body)}")
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+            self.send_response(206)
+            self.send_header(
+                "Content-Range", f"bytes {start}-{len(body) - 1}/{len(body)}"
+            )
+        else:
+            self.send_response(200)
+        self.send_header("Content-Length", str(len(body) - start))
+        self.send_header("ETag", etag)
+        self.send_header("Last-Modified", server.last_modified)
+        self.end_headers()
+
+        end = len(body)
+        with server._lock:
+            if name in server.cut_off:
+                server.cut_off.discard(name)
+                end = start + (len(body) - start) // 2
+                self.close_connection = True
+        for offset in range(start, end, BLOCK_SIZE):
+            block = body[offset : min(offset + BLOCK_SIZE, end)]
+            if server.mbps:
+                time.sleep(len(block) / (server.mbps * 1024 * 1024))
+            self.wfile.write(block)
@@ -0,0 +1,208 @@
+"""
+Docstring for aissemble-lite-ffmpeg.backend.tests.performance.fixtures
+
+synthetic media fixtures for the benchmarks, generated with ffmpeg's lavfi sources so results don't depend on whatever
+happens to be in test_files: `sine` or seeded `anoisesrc` audio, plus `testsrc` video for the video containers.
+every container of `ACCEPTABLE_TYPES` can be produced at any duration, from seconds to hours.
+
+output is deterministic (bitexact flags, fixed noise seed, no metadata) and cached under FIXTURE_DIR by a hash of the
+generation parameters, so a fixture is only encoded once per machine and the same parameters give the same file.
+
+usage: `python fixtures.py [--types .mp3,.mp4] [--durations 5,60,600,3600] [--audio sine|noise] [--clean]`
+prints the paths of the generated matrix. in other scripts: `fixture('.mp4', 60)` or `fixture_matrix(durations=[5, 60])`
+"""
+
+# imports
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import subprocess
+from pathlib import Path
+
+from aissemble_lite_ffmpeg.preprocessing.input_handler import ACCEPTABLE_TYPES
+
+FIXTURE_DIR = Path(os.getenv("FIXTURE_DIR", Path(__file__).parent / "fixtures"))
+# seconds, a minute, ten minutes, an hour
+DURATIONS = (5, 60, 600, 3600)
+# bump when the generation changes in a way the parameters don't capture, invalidates the cache
+GENERATOR_VERSION = 1
+
+# audio/video encoding per container, video is None for audio only containers
+CONTAINERS = {
+    ".wav": {"audio": ["-c:a", "pcm_s16le"], "video": None},
+    ".flac": {"audio": ["-c:a", "flac"], "video": None},
+    ".mp3": {"audio": ["-c:a", "libmp3lame", "-b:a", "128k"], "video": None},
+    ".m4a": {"audio": ["-c:a", "aac", "-b:a", "128k"], "video": None},
+    ".mp4": {
+        "audio": ["-c:a", "aac", "-b:a", "128k"],
+        "video": ["-c:v", "libx264", "-preset", "ultrafast", "-pix_fmt", "yuv420p"],
+    },
+    ".avi": {
+        "audio": ["-c:a", "libmp3lame", "-b:a", "128k"],
+        "video": ["-c:v", "mpeg4", "-q:v", "10"],
+    },
+    ".webm": {
+        "audio": ["-c:a", "libopus", "-b:a", "64k"],
+        "video": [
+            "-c:v",
+            "libvpx",
+            "-deadline",
+            "realtime",
+            "-cpu-used",
+            "8",
+            "-b:v",
+            "200k",
+        ],
+    },
+}
+
+AUDIO_SOURCES = {
+    # a tone, compresses well, like music or a quiet recording
+    "sine": "sine=frequency=440:sample_rate={sample_rate}:duration={seconds}",
+    # pink noise with a fixed seed, worst case for the lossless and lossy encoders
+    "noise": "anoisesrc=color=pink:amplitude=0.3:seed=42:sample_rate={sample_rate}:duration={seconds}",
+}
+
+
+def fixture_params(
+    extension: str,
+    seconds: float,
+    audio: str = "sine",
+    sample_rate: int = 44100,
+    channels: int = 2,
+    video_size: str = "320x240",
+    video_rate: int = 5,
+) -> dict:
+    """Everything that determines the output file, hashed for the cache key"""
+    extension = (
+        extension.lower() if extension.startswith(".") else f".{extension.lower()}"
+    )
+    if extension not in CONTAINERS:
+        raise ValueError(
+            f"Unsupported fixture type: {extension}. Supported: {sorted(CONTAINERS)}"
+        )
+    if audio not in AUDIO_SOURCES:
+        raise ValueError(
+            f"Unknown audio source: {audio}. Supported: {sorted(AUDIO_SOURCES)}"
+        )
+    params = {
+        "version": GENERATOR_VERSION,
+        "extension": extension,
+        "seconds": float(seconds),
+        "audio": audio,
+        "sample_rate": sample_rate,
+        "channels": channels,
+    }
+    if CONTAINERS[extension]["video"]:
+        params.update(video_size=video_size, video_rate=video_rate)
+    return params
+
+
+def params_hash(params: dict) -> str:
+    return hashlib.sha256(json.dumps(params, sort_keys=True).encode()).hexdigest()[:16]
+
+
+def ffmpeg_command(params: dict, output: Path) -> list[str]:
+    container = CONTAINERS[params["extension"]]
+    audio = AUDIO_SOURCES[params["audio"]].format(**params)
+    command = ["ffmpeg", "-y", "-loglevel", "error", "-f", "lavfi", "-i", audio]
+    if container["video"]:
+        video = f"testsrc=size={params['video_size']}:rate={params['video_rate']}:duration={params['seconds']}"
+        command += [
+            "-f",
+            "lavfi",
+            "-i",
+            video,
+            "-map",
+            "1:v",
+            "-map",
+            "0:a",
+            *container["video"],
+        ]
+    command += ["-ac", str(params["channels"]), *container["audio"]]
+    # no encoder version strings, creation times or random ids in the output, so reruns are byte identical
+    command += [
+        "-map_metadata",
+        "-1",
+        "-fflags",
+        "+bitexact",
+        "-flags:v",
+        "+bitexact",
+        "-flags:a",
+        "+bitexact",
+    ]
+    return command + [str(output)]
+
+
+def fixture(
+    extension: str,
+    seconds: float,
+    audio: str = "sine",
+    directory: Path | None = None,
+    **kwargs,
+) -> Path:
+    """Path of the fixture for these parameters, generated on first use"""
+    params = fixture_params(extension, seconds, audio, **kwargs)
+    directory = Path(directory or FIXTURE_DIR)
+    output = (
+        directory
+        / f"{params['seconds']:g}s_{params['audio']}_{params_hash(params)}{params['extension']}"
+    )
+    if output.exists():
+        return output
+
+    directory.mkdir(parents=True, exist_ok=True)
+    # encode next to the final path and rename, so an interrupted run never leaves a truncated fixture in the cache
+    partial = output.with_name(f".{output.stem}.{os.getpid()}.partial{output.suffix}")
+    try:
+        subprocess.run(ffmpeg_command(params, partial), check=True)
+        os.replace(partial, output)
+    finally:
+        partial.unlink(missing_ok=True)
+    return output
+
+
+def fixture_matrix(
+    extensions=None, durations=DURATIONS, audio: str = "sine", **kwargs
+) -> list[Path]:
+    """Fixtures for every container x duration, in a stable order (by duration, then container)"""
+    extensions = sorted(extensions or ACCEPTABLE_TYPES)
+    return [
+        fixture(extension, seconds, audio, **kwargs)
+        for seconds in durations
+        for extension in extensions
+    ]
+
+
+def parse_list(value: str | None) -> list[str]:
+    return [v.strip() for v in value.split(",") if v.strip()] if value else []
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument(
+        "--types", help="comma separated extensions, default all of ACCEPTABLE_TYPES"
+    )
+    parser.add_argument(
+        "--durations",
+        help=f"comma separated seconds, default {','.join(map(str, DURATIONS))}",
+    )
+    parser.add_argument("--audio", choices=sorted(AUDIO_SOURCES), default="sine")
+    parser.add_argument(
+        "--clean", action="store_true", help=f"delete {FIXTURE_DIR} first"
+    )
+    args = parser.parse_args()
+
+    if args.clean:
+        shutil.rmtree(FIXTURE_DIR, ignore_errors=True)
+    durations = [float(d) for d in parse_list(args.durations)] or DURATIONS
+    for path in fixture_matrix(parse_list(args.types), durations, args.audio):
+        print(f"{path}  {path.stat().st_size / 1024 / 1024:.1f} MB")
+
+
+if __name__ == "__main__":
+    main()
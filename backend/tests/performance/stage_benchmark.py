@@ -0,0 +1,275 @@
+"""
+Docstring for aissemble-lite-ffmpeg.backend.tests.performance.stage_benchmark
+
+times the preprocessing stages one at a time, in process, without the http stack:
+- probe: `InputHandler._probe_file` (ffprobe)
+- convert_to_wav: `FfmpegHandler.convert_to_wav` to a temp wav
+- stream_to_pcm: `FfmpegHandler.stream_to_pcm`, the conversion of the pipelined path, output discarded
+- encode: `FfmpegHandler.encode` of the converted pcm to OUTPUT_CODEC (skipped for pcm)
+- upload_file / upload_stream: `S3Handler.upload_file` of the converted wav and `S3Handler.upload_stream` of its pcm,
+  against the in-memory s3 client from fakes.py (`--s3-mbps` simulates bandwidth, without it only client overhead counts)
+
+inputs are generated fixtures (fixtures.py). throughput is reported as audio seconds processed per wall second, and
+every run is appended to a history jsonl and compared with the previous run of the same stage/fixture/settings, so
+a change to ffmpeg flags or the pipelining can be checked against the numbers before it.
+
+usage: `python stage_benchmark.py [--types .mp3,.mp4,.wav] [--durations 60,600] [--stages probe,encode] [--runs 5]
+                                  [--s3-mbps 50] [--label "flac level 8"]`
+"""
+
+# imports
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import tempfile
+import time
+import uuid
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+
+from aissemble_lite_ffmpeg.preprocessing.ffmpeg_handler import wav_header
+from aissemble_lite_ffmpeg.preprocessing.input_handler import InputHandler
+from aissemble_lite_ffmpeg.preprocessing.s3_handler import S3Handler
+from fakes import FakeS3
+from fixtures import AUDIO_SOURCES, fixture_matrix, parse_list
+
+HISTORY_FILE = Path(__file__).parent / "stage_benchmark_history.jsonl"
+# settings that change what a stage does, results are only compared between runs with the same values
+SETTINGS = (
+    "OUTPUT_CODEC",
+    "OPUS_BITRATE",
+    "S3_MULTIPART_PART_SIZE_MB",
+    "S3_MULTIPART_CONCURRENCY",
+)
+
+
+@contextmanager
+def quiet_stderr():
+    """Point fd 2 at /dev/null, child processes inherit it"""
+    saved = os.dup(2)
+    with open(os.devnull, "w") as devnull:
+        os.dup2(devnull.fileno(), 2)
+    try:
+        yield
+    finally:
+        os.dup2(saved, 2)
+        os.close(saved)
+
+
+def bench_probe(handler: InputHandler, fixture: Path, wav: Path):
+    handler._probe_file(str(fixture))
+
+
+def bench_convert_to_wav(handler: InputHandler, fixture: Path, wav: Path):
+    # convert_to_wav leaves ffmpeg's banner and progress on stderr, keep them out of the report
+    with quiet_stderr():
+        output, _ = handler.ffmpeg_handler.convert_to_wav(str(fixture))
+    os.remove(output)
+
+
+def bench_stream_to_pcm(handler: InputHandler, fixture: Path, wav: Path):
+    for _ in handler.ffmpeg_handler.stream_to_pcm(str(fixture)):
+        pass
+
+
+def bench_encode(handler: InputHandler, fixture: Path, wav: Path):
+    for _ in handler.ffmpeg_handler.encode(handler.ffmpeg_handler.wav_pcm(str(wav))):
+        pass
+
+
+def bench_upload_file(handler: InputHandler, fixture: Path, wav: Path):
+    handler.s3_handler.upload_file(str(wav), fixture.name)
+
+
+def bench_upload_stream(handler: InputHandler, fixture: Path, wav: Path):
+    handler.s3_handler.upload_stream(
+        handler.ffmpeg_handler.wav_pcm(str(wav)), fixture.name, wav_header
+    )
+
+
+STAGES = {
+    "probe": bench_probe,
+    "convert_to_wav": bench_convert_to_wav,
+    "stream_to_pcm": bench_stream_to_pcm,
+    "encode": bench_encode,
+    "upload_file": bench_upload_file,
+    "upload_stream": bench_upload_stream,
+}
+
+
+def time_stage(
+    stage, handler: InputHandler, fixture: Path, wav: Path, runs: int
+) -> list[float]:
+    """Seconds of each of `runs` calls, after one untimed warm up call (page cache, lazy imports)"""
+    stage(handler, fixture, wav)
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        stage(handler, fixture, wav)
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+def run_info(args) -> dict:
+    """What a result depends on besides the stage and fixture"""
+
+    def command(*cmd):
+        try:
+            return subprocess.run(
+                cmd, capture_output=True, text=True, check=True
+            ).stdout.strip()
+        except (OSError, subprocess.CalledProcessError):
+            return None
+
+    ffmpeg_version = command("ffmpeg", "-version")
+    return {
+        "git_commit": command("git", "rev-parse", "--short", "HEAD"),
+        "git_dirty": bool(
+            command("git", "status", "--porcelain", "--untracked-files=no")
+        ),
+        "ffmpeg_version": ffmpeg_version.splitlines()[0] if ffmpeg_version else None,
+        "settings": {name: os.getenv(name) for name in SETTINGS if os.getenv(name)},
+        "s3_mbps": args.s3_mbps,
+        "runs": args.runs,
+        "label": args.label,
+    }
+
+
+def comparable(record: dict, other: dict) -> bool:
+    return all(
+        record[key] == other.get(key)
+        for key in ("stage", "fixture", "settings", "s3_mbps", "ffmpeg_version")
+    )
+
+
+def load_history(history_file: Path) -> list[dict]:
+    if not history_file.exists():
+        return []
+    with open(history_file) as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument(
+        "--types", default=".mp3,.mp4,.wav", help="comma separated fixture containers"
+    )
+    parser.add_argument(
+        "--durations",
+        default="60,600",
+        help="comma separated fixture durations in seconds",
+    )
+    parser.add_argument("--audio", choices=sorted(AUDIO_SOURCES), default="sine")
+    parser.add_argument(
+        "--stages", help=f"comma separated subset of {','.join(STAGES)}"
+    )
+    parser.add_argument(
+        "--runs", type=int, default=5, help="timed calls per stage and fixture"
+    )
+    parser.add_argument(
+        "--s3-mbps", type=float, help="simulated upload bandwidth of the fake s3 client"
+    )
+    parser.add_argument(
+        "--history",
+        type=Path,
+        default=HISTORY_FILE,
+        help="jsonl results are appended to",
+    )
+    parser.add_argument(
+        "--no-history", action="store_true", help="don't record this run"
+    )
+    parser.add_argument(
+        "--label", help="note stored with the results, e.g. what was changed"
+    )
+    args = parser.parse_args()
+
+    stages = parse_list(args.stages) or list(STAGES)
+    unknown = set(stages) - set(STAGES)
+    if unknown:
+        parser.error(f"unknown stages: {', '.join(sorted(unknown))}")
+
+    handler = InputHandler(S3Handler(s3_client=FakeS3(mbps=args.s3_mbps)))
+    if handler.ffmpeg_handler.output_codec == "pcm" and "encode" in stages:
+        stages.remove("encode")
+    fixtures = [
+        f.resolve()
+        for f in fixture_matrix(
+            parse_list(args.types),
+            [float(d) for d in parse_list(args.durations)],
+            args.audio,
+        )
+    ]
+    info = run_info(args)
+    run_id = f"{datetime.now().strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:6]}"
+    history = load_history(args.history)
+    results = []
+
+    print(
+        f"run {run_id} at {info['git_commit']}{' (dirty)' if info['git_dirty'] else ''}, {info['ffmpeg_version']}"
+    )
+    print(
+        f"codec {handler.ffmpeg_handler.output_codec}, fake s3 {args.s3_mbps or 'unthrottled'} MB/s, {args.runs} runs\n"
+    )
+    print(
+        f"{'stage':<15} {'fixture':<36} {'median':>9} {'min':>9} {'audio s/s':>10} {'vs last':>8}"
+    )
+
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        # convert_to_wav writes into the working directory
+        os.chdir(tmp_dir)
+        try:
+            for fixture in fixtures:
+                audio_seconds = float(
+                    handler._probe_file(str(fixture))["format"]["duration"]
+                )
+                # the encode/upload stages start from the converted wav, like the request path does
+                wav = Path(tmp_dir) / f"{fixture.stem}_input.wav"
+                handler.ffmpeg_handler.write_wav(
+                    handler.ffmpeg_handler.stream_to_pcm(str(fixture)), str(wav)
+                )
+                for name in stages:
+                    timings = time_stage(STAGES[name], handler, fixture, wav, args.runs)
+                    median = statistics.median(timings)
+                    record = {
+                        "timestamp": datetime.now().isoformat(),
+                        "run_id": run_id,
+                        "stage": name,
+                        "fixture": fixture.name,
+                        "audio_seconds": audio_seconds,
+                        "median_seconds": round(median, 5),
+                        "min_seconds": round(min(timings), 5),
+                        "audio_seconds_per_second": round(audio_seconds / median, 1),
+                        **info,
+                    }
+                    previous = next(
+                        (r for r in reversed(history) if comparable(record, r)), None
+                    )
+                    change = (
+                        f"{median / previous['median_seconds'] - 1:>+8.0%}"
+                        if previous
+                        else f"{'-':>8}"
+                    )
+                    print(
+                        f"{name:<15} {fixture.name[:36]:<36} {median * 1000:>7.1f}ms {min(timings) * 1000:>7.1f}ms "
+                        f"{record['audio_seconds_per_second']:>10.1f} {change}"
+                    )
+                    results.append(record)
+                wav.unlink()
+        finally:
+            os.chdir(cwd)
+
+    if not args.no_history:
+        with open(args.history, "a") as f:
+            for record in results:
+                f.write(json.dumps(record) + "\n")
+        print(f"\nResults appended to: {args.history} (run_id {run_id})")
+
+
+if __name__ == "__main__":
+    main()
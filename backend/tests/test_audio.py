@@ -0,0 +1,103 @@
+# Copyright 2025 Booz Allen Hamilton.
+#
+# Booz Allen Hamilton Confidential Information.
+#
+# The contents of this file are the intellectual property of
+# Booz Allen Hamilton, Inc. ("BAH") and are subject to copyright protection
+# under the laws of the United States and other countries.
+#
+# You acknowledge that misappropriation, misuse, or redistribution of content
+# on the file could cause irreparable harm to BAH and/or to third parties.
+#
+# You may not copy, reproduce, distribute, publish, display, execute, modify,
+# create derivative works of, transmit, sell or offer for resale, or in any way
+# exploit any part of this code or program without BAH's express written permission.
+#
+# The contents of this code or program contains code
+# that is itself or was created using artificial intelligence.
+#
+# To the best of our knowledge, this code does not infringe third-party intellectual
+# property rights, contain errors, inaccuracies, bias, or security concerns.
+#
+# However, Booz Allen does not warrant, claim, or provide any implied
+# or express warranty for the aforementioned, nor of merchantability
+# or fitness for purpose.
+#
+# Booz Allen expressly limits liability, whether by contract, tort or in equity
+# for any damage or harm caused by use of this artificial intelligence code or program.
+#
+# Booz Allen is providing this code or program "as is" with the understanding
+# that any separately negotiated standards of performance for said code
+# or program will be met for the duration of any applicable contract under which
+# the code or program is provided.
+
+"""Tests of the audio processing routes."""
+
+import asyncio
+import queue
+import shutil
+import threading
+
+import ffmpeg
+import pytest
+from aissemble_lite_ffmpeg.routers.audio import _put_chunk
+
+from tests.performance.fakes import FakeS3
+
+
+@pytest.mark.skipif(shutil.which("ffmpeg") is None, reason="ffmpeg is not installed")
+def test_streamed_upload_is_converted(client, fake_s3: FakeS3, monkeypatch):
+    monkeypatch.setenv("CONVERSION_CACHE", "false")
+    monkeypatch.setattr("aissemble_lite_ffmpeg.routers.audio.STREAM_QUEUE_CHUNKS", 1)
+    mp3, _ = (
+        ffmpeg.input("sine=frequency=440:duration=3", f="lavfi")
+        .output("pipe:", f="mp3")
+        .run(capture_stdout=True, quiet=True)
+    )
+    # small chunks against a one chunk queue, the reader has to wait for ffmpeg
+    chunks = [mp3[start : start + 1024] for start in range(0, len(mp3), 1024)]
+
+    response = client.post(
+        "/audio/process/stream", params={"filename": "tone.mp3"}, content=iter(chunks)
+    )
+
+    assert response.status_code == 200
+    bucket, key = response.json()["s3_uri"].removeprefix("s3://").split("/", 1)
+    assert (bucket, key) in fake_s3.objects
+
+
+def test_put_chunk_gives_up_once_the_conversion_finished():
+    chunk_queue = queue.Queue(maxsize=1)
+    chunk_queue.put(b"waiting")
+    finished = threading.Event()
+
+    async def main():
+        put = asyncio.create_task(_put_chunk(chunk_queue, b"more", finished))
+        await asyncio.sleep(0.05)
+        pending = not put.done()
+        finished.set()
+        return pending, await put
+
+    assert asyncio.run(main()) == (True, False)
+    assert chunk_queue.get_nowait() == b"waiting"
+
+
+@pytest.mark.skipif(shutil.which("ffmpeg") is None, reason="ffmpeg is not installed")
+def test_s3_object_is_converted_from_a_presigned_url(client, fake_s3, monkeypatch):
+    monkeypatch.setenv("CONVERSION_CACHE", "false")
+    mp3, _ = (
+        ffmpeg.input("sine=frequency=440:duration=2", f="lavfi")
+        .output("pipe:", f="mp3")
+        .run(capture_stdout=True, quiet=True)
+    )
+    fake_s3.put_object(Bucket="aissemble-transcribe", Key="raw/tone.mp3", Body=mp3)
+
+    response = client.post(
+        "/audio/process/s3", json={"s3_uri": "s3://aissemble-transcribe/raw/tone.mp3"}
+    )
+
+    assert response.status_code == 200
+    assert fake_s3.file_server.requests
+    bucket, key = response.json()["s3_uri"].removeprefix("s3://").split("/", 1)
+    assert key.endswith("_tone.flac")
+    assert (bucket, key) in fake_s3.objects
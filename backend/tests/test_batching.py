@@ -0,0 +1,82 @@
+# Copyright 2025 Booz Allen Hamilton.
+#
+# Booz Allen Hamilton Confidential Information.
+#
+# The contents of this file are the intellectual property of
+# Booz Allen Hamilton, Inc. ("BAH") and are subject to copyright protection
+# under the laws of the United States and other countries.
+#
+# You acknowledge that misappropriation, misuse, or redistribution of content
+# on the file could cause irreparable harm to BAH and/or to third parties.
+#
+# You may not copy, reproduce, distribute, publish, display, execute, modify,
+# create derivative works of, transmit, sell or offer for resale, or in any way
+# exploit any part of this code or program without BAH's express written permission.
+#
+# The contents of this code or program contains code
+# that is itself or was created using artificial intelligence.
+#
+# To the best of our knowledge, this code does not infringe third-party intellectual
+# property rights, contain errors, inaccuracies, bias, or security concerns.
+#
+# However, Booz Allen does not warrant, claim, or provide any implied
+# or express warranty for the aforementioned, nor of merchantability
+# or fitness for purpose.
+#
+# Booz Allen expressly limits liability, whether by contract, tort or in equity
+# for any damage or harm caused by use of this artificial intelligence code or program.
+#
+# Booz Allen is providing this code or program "as is" with the understanding
+# that any separately negotiated standards of performance for said code
+# or program will be met for the duration of any applicable contract under which
+# the code or program is provided.
+
+"""Tests of the micro-batcher."""
+
+import queue
+import threading
+import time
+
+from aissemble_lite_ffmpeg.batching import MicroBatcher
+
+
+def test_concurrent_items_share_a_batch():
+    batches = []
+
+    def run_batch(items: list) -> list:
+        batches.append(items)
+        return [item * 2 for item in items]
+
+    batcher = MicroBatcher(run_batch, max_batch_size=4, max_wait_seconds=0.2)
+    futures = [batcher.submit(item) for item in range(3)]
+    results = [future.result(timeout=5) for future in futures]
+    batcher.close()
+
+    assert [result for result, _ in results] == [0, 2, 4]
+    assert batches == [[0, 1, 2]]
+    assert all(metrics["batch_size"] == 3 for _, metrics in results)
+
+
+class SlowQueue(queue.Queue):
+    """Queue that takes a while to put an item, widens the window of a race."""
+
+    def put(self, item, *args, **kwargs):
+        if item is not None:
+            time.sleep(0.1)
+        super().put(item, *args, **kwargs)
+
+
+def test_item_submitted_while_closing_is_run():
+    batcher = MicroBatcher(lambda items: items, max_wait_seconds=0)
+    batcher._queue = SlowQueue()
+    futures = []
+    submitter = threading.Thread(target=lambda: futures.append(batcher.submit(1)))
+
+    submitter.start()
+    time.sleep(0.05)
+    batcher.close()
+    submitter.join()
+
+    # nothing is queued behind the stop marker, where it would wait forever
+    [future] = futures
+    assert future.result(timeout=1)[0] == 1
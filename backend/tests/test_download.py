@@ -0,0 +1,190 @@
+# Copyright 2025 Booz Allen Hamilton.
+#
+# Booz Allen Hamilton Confidential Information.
+#
+# The contents of this file are the intellectual property of
+# Booz Allen Hamilton, Inc. ("BAH") and are subject to copyright protection
+# under the laws of the United States and other countries.
+#
+# You acknowledge that misappropriation, misuse, or redistribution of content
+# on the file could cause irreparable harm to BAH and/or to third parties.
+#
+# You may not copy, reproduce, distribute, publish, display, execute, modify,
+# create derivative works of, transmit, sell or offer for resale, or in any way
+# exploit any part of this code or program without BAH's express written permission.
+#
+# The contents of this code or program contains code
+# that is itself or was created using artificial intelligence.
+#
+# To the best of our knowledge, this code does not infringe third-party intellectual
+# property rights, contain errors, inaccuracies, bias, or security concerns.
+#
+# However, Booz Allen does not warrant, claim, or provide any implied
+# or express warranty for the aforementioned, nor of merchantability
+# or fitness for purpose.
+#
+# Booz Allen expressly limits liability, whether by contract, tort or in equity
+# for any damage or harm caused by use of this artificial intelligence code or program.
+#
+# Booz Allen is providing this code or program "as is" with the understanding
+# that any separately negotiated standards of performance for said code
+# or program will be met for the duration of any applicable contract under which
+# the code or program is provided.
+
+"""Tests of the resumable ETL downloader against a local http server."""
+
+import hashlib
+import json
+import random
+import threading
+
+import pytest
+from aissemble_lite_ffmpeg.etl.download import Downloader, DownloadSpec
+
+from tests.performance.fakes import FileServer
+
+SIZE = 256 * 1024
+
+
+@pytest.fixture()
+def server():
+    """Local http server with three random files, stopped after the test."""
+    rng = random.Random(42)
+    files = {f"file_{index}.bin": rng.randbytes(SIZE) for index in range(3)}
+    server = FileServer(files)
+    threading.Thread(
+        target=server.serve_forever, kwargs={"poll_interval": 0.05}, daemon=True
+    ).start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture()
+def downloader(tmp_path, monkeypatch: pytest.MonkeyPatch) -> Downloader:
+    """Downloader into an empty temp directory, reading 16 KB at a time."""
+    monkeypatch.setenv("ETL_DOWNLOAD_CHUNK_KB", "16")
+    (tmp_path / "data").mkdir()
+    return Downloader(tmp_path / "data", max_workers=3)
+
+
+def spec(server: FileServer, name: str, sha256: str | None = None) -> DownloadSpec:
+    """Spec of a served file, with its checksum unless another one is given."""
+    checksum = sha256 or hashlib.sha256(server.files[name]).hexdigest()
+    return DownloadSpec(f"{server.url}/{name}", sha256=checksum)
+
+
+def test_download_all_fetches_every_file(server, downloader):
+    specs = [spec(server, name) for name in server.files]
+
+    results = downloader.download_all(specs)
+
+    assert [result.status for result in results] == ["downloaded"] * 3
+    assert [result.bytes_transferred for result in results] == [SIZE] * 3
+    for name, body in server.files.items():
+        assert (downloader.directory / name).read_bytes() == body
+        assert (downloader.directory / f"{name}.meta.json").exists()
+    assert not list(downloader.directory.glob("*.part*"))
+
+
+def test_rerun_skips_unchanged_files(server, downloader):
+    specs = [spec(server, name) for name in server.files]
+    downloader.download_all(specs)
+
+    results = downloader.download_all(specs)
+
+    assert [result.status for result in results] == ["unchanged"] * 3
+    assert all(result.bytes_transferred == 0 for result in results)
+    assert all(etag is not None for _, _, etag in server.requests[-3:])
+
+
+def test_rerun_downloads_changed_file_again(server, downloader):
+    name = "file_0.bin"
+    downloader.download(spec(server, name))
+    server.files[name] = server.files[name][::-1]
+
+    result = downloader.download(spec(server, name))
+
+    assert result.status == "downloaded"
+    assert (downloader.directory / name).read_bytes() == server.files[name]
+
+
+def test_interrupted_download_is_resumed(server, downloader):
+    name = "file_0.bin"
+    server.cut_off.add(name)
+
+    interrupted = downloader.download(spec(server, name))
+    kept = (downloader.directory / f"{name}.part").stat().st_size
+    resumed = downloader.download(spec(server, name))
+
+    assert interrupted.status == "failed"
+    assert 0 < kept < SIZE
+    assert resumed.status == "resumed"
+    assert resumed.bytes_transferred == SIZE - kept
+    assert server.requests[-1][1] == f"bytes={kept}-"
+    assert (downloader.directory / name).read_bytes() == server.files[name]
+    assert not list(downloader.directory.glob("*.part*"))
+
+
+def test_interrupted_download_of_changed_file_starts_over(server, downloader):
+    name = "file_0.bin"
+    server.cut_off.add(name)
+    downloader.download(spec(server, name))
+    server.files[name] = server.files[name][::-1]
+
+    result = downloader.download(spec(server, name))
+
+    # If-Range doesn't match the new version, the server sends all of it
+    assert result.status == "downloaded"
+    assert result.bytes_transferred == SIZE
+    assert (downloader.directory / name).read_bytes() == server.files[name]
+
+
+def test_checksum_mismatch_fails_and_removes_the_download(server, downloader):
+    result = downloader.download(spec(server, "file_0.bin", sha256="0" * 64))
+
+    assert result.status == "failed"
+    assert "Checksum mismatch" in result.error
+    assert not list(downloader.directory.iterdir())
+
+
+def test_missing_file_fails(server, downloader):
+    result = downloader.download(DownloadSpec(f"{server.url}/missing.bin"))
+
+    assert result.status == "failed"
+    assert "404" in result.error
+    assert not (downloader.directory / "missing.bin").exists()
+
+
+def write_part(downloader: Downloader, server: FileServer, name: str, body: bytes):
+    """Leave a part of `name` behind, as a run stopped while downloading it."""
+    (downloader.directory / f"{name}.part").write_bytes(body)
+    validators = {"url": f"{server.url}/{name}", "etag": server.etag(name)}
+    (downloader.directory / f"{name}.part.json").write_text(json.dumps(validators))
+
+
+def test_complete_part_is_moved_into_place(server, downloader):
+    name = "file_0.bin"
+    write_part(downloader, server, name, server.files[name])
+
+    result = downloader.download(spec(server, name))
+
+    # the server answers the range past the end with 416 and the full size
+    assert result.status == "resumed"
+    assert result.bytes_transferred == 0
+    assert (downloader.directory / name).read_bytes() == server.files[name]
+    meta = json.loads((downloader.directory / f"{name}.meta.json").read_text())
+    assert meta["sha256"] == hashlib.sha256(server.files[name]).hexdigest()
+    assert meta["etag"] == server.etag(name)
+    assert not list(downloader.directory.glob("*.part*"))
+
+
+def test_part_longer_than_the_file_is_discarded(server, downloader):
+    name = "file_0.bin"
+    write_part(downloader, server, name, server.files[name] + b"extra")
+
+    result = downloader.download(spec(server, name))
+
+    assert result.status == "failed"
+    assert "rejected resuming" in result.error
+    assert not list(downloader.directory.iterdir())
@@ -0,0 +1,126 @@
+# Copyright 2025 Booz Allen Hamilton.
+#
+# Booz Allen Hamilton Confidential Information.
+#
+# The contents of this file are the intellectual property of
+# Booz Allen Hamilton, Inc. ("BAH") and are subject to copyright protection
+# under the laws of the United States and other countries.
+#
+# You acknowledge that misappropriation, misuse, or redistribution of content
+# on the file could cause irreparable harm to BAH and/or to third parties.
+#
+# You may not copy, reproduce, distribute, publish, display, execute, modify,
+# create derivative works of, transmit, sell or offer for resale, or in any way
+# exploit any part of this code or program without BAH's express written permission.
+#
+# The contents of this code or program contains code
+# that is itself or was created using artificial intelligence.
+#
+# To the best of our knowledge, this code does not infringe third-party intellectual
+# property rights, contain errors, inaccuracies, bias, or security concerns.
+#
+# However, Booz Allen does not warrant, claim, or provide any implied
+# or express warranty for the aforementioned, nor of merchantability
+# or fitness for purpose.
+#
+# Booz Allen expressly limits liability, whether by contract, tort or in equity
+# for any damage or harm caused by use of this artificial intelligence code or program.
+#
+# Booz Allen is providing this code or program "as is" with the understanding
+# that any separately negotiated standards of performance for said code
+# or program will be met for the duration of any applicable contract under which
+# the code or program is provided.
+
+"""Tests of the server side ingest of s3 objects by `InputHandler`."""
+
+import shutil
+import struct
+from collections.abc import Iterator
+
+import ffmpeg
+import pytest
+from aissemble_lite_ffmpeg.preprocessing.input_handler import InputHandler
+from aissemble_lite_ffmpeg.preprocessing.s3_handler import S3Handler
+
+from tests.performance.fakes import FakeS3
+
+pytestmark = pytest.mark.skipif(
+    shutil.which("ffmpeg") is None, reason="ffmpeg is not installed"
+)
+
+BUCKET = "test-bucket"
+SECONDS = 3
+
+
+@pytest.fixture()
+def s3() -> Iterator[FakeS3]:
+    """In-memory s3 client holding a short mp3 at raw/tone.mp3."""
+    source = f"sine=frequency=440:sample_rate=44100:duration={SECONDS}"
+    mp3, _ = (
+        ffmpeg.input(source, f="lavfi")
+        .output("pipe:", f="mp3", ac=2)
+        .run(capture_stdout=True, quiet=True)
+    )
+    s3 = FakeS3(keep_bodies=True)
+    s3.put_object(Bucket=BUCKET, Key="raw/tone.mp3", Body=mp3)
+    yield s3
+    s3.close()
+
+
+@pytest.fixture()
+def input_handler(s3, monkeypatch: pytest.MonkeyPatch) -> InputHandler:
+    """Handler reading s3 sources with ranged GETs of 4 KB, uploading PCM wavs."""
+    monkeypatch.setenv("S3_INGEST_MODE", "ranged")
+    monkeypatch.setenv("S3_INGEST_RANGE_MB", str(4 / 1024))
+    monkeypatch.setenv("OUTPUT_CODEC", "pcm")
+    monkeypatch.setenv("CONVERSION_CACHE", "false")
+    monkeypatch.setenv("SAVE_METRICS", "false")
+    return InputHandler(S3Handler(bucket_name=BUCKET, s3_client=s3))
+
+
+def test_process_input_converts_s3_object_with_ranged_reads(s3, input_handler):
+    mp3_size = s3.objects[(BUCKET, "raw/tone.mp3")]["size"]
+    requests = s3.requests
+
+    s3_uri, metrics = input_handler.process_input(f"s3://{BUCKET}/raw/tone.mp3", None)
+
+    # one GET per 4 KB range besides the head and the upload
+    assert s3.requests - requests >= mp3_size // 4096 + 2
+
+    key = s3_uri.removeprefix(f"s3://{BUCKET}/")
+    wav = s3.objects[(BUCKET, key)]["body"]
+    assert key.startswith("input/") and key.endswith("_tone.wav")
+    assert wav[:4] == b"RIFF" and wav[8:12] == b"WAVE"
+    data_size = struct.unpack("<I", wav[40:44])[0]
+    assert data_size == len(wav) - 44
+    # 16kHz mono 16-bit, mp3 encoder padding allowed for
+    assert abs(data_size / 32000 - SECONDS) < 0.1
+    assert metrics["input_etag"] == s3.objects[(BUCKET, "raw/tone.mp3")]["etag"]
+    assert metrics["conversion_path"] == "transcode"
+    assert not s3.uploads
+
+
+def test_process_input_reads_s3_object_from_presigned_url(
+    s3, input_handler, monkeypatch
+):
+    monkeypatch.setattr(input_handler, "s3_ingest_mode", "presigned")
+
+    s3_uri, metrics = input_handler.process_input(f"s3://{BUCKET}/raw/tone.mp3", None)
+
+    [(name, _, _), *_] = s3.file_server.requests
+    assert name == f"{BUCKET}/raw/tone.mp3"
+    key = s3_uri.removeprefix(f"s3://{BUCKET}/")
+    assert key.endswith("_tone.wav")
+    data_size = struct.unpack("<I", s3.objects[(BUCKET, key)]["body"][40:44])[0]
+    assert abs(data_size / 32000 - SECONDS) < 0.1
+    assert metrics["conversion_path"] == "transcode"
+
+
+def test_process_input_rejects_missing_s3_object(input_handler):
+    with pytest.raises(FileNotFoundError):
+        input_handler.process_input(f"s3://{BUCKET}/raw/missing.mp3", None)
+
+
+def test_process_input_rejects_unsupported_s3_object(input_handler):
+    with pytest.raises(ValueError, match="txt"):
+        input_handler.process_input(f"s3://{BUCKET}/raw/notes.txt", None)
@@ -0,0 +1,109 @@
+# Copyright 2025 Booz Allen Hamilton.
+#
+# Booz Allen Hamilton Confidential Information.
+#
+# The contents of this file are the intellectual property of
+# Booz Allen Hamilton, Inc. ("BAH") and are subject to copyright protection
+# under the laws of the United States and other countries.
+#
+# You acknowledge that misappropriation, misuse, or redistribution of content
+# on the file could cause irreparable harm to BAH and/or to third parties.
+#
+# You may not copy, reproduce, distribute, publish, display, execute, modify,
+# create derivative works of, transmit, sell or offer for resale, or in any way
+# exploit any part of this code or program without BAH's express written permission.
+#
+# The contents of this code or program contains code
+# that is itself or was created using artificial intelligence.
+#
+# To the best of our knowledge, this code does not infringe third-party intellectual
+# property rights, contain errors, inaccuracies, bias, or security concerns.
+#
+# However, Booz Allen does not warrant, claim, or provide any implied
+# or express warranty for the aforementioned, nor of merchantability
+# or fitness for purpose.
+#
+# Booz Allen expressly limits liability, whether by contract, tort or in equity
+# for any damage or harm caused by use of this artificial intelligence code or program.
+#
+# Booz Allen is providing this code or program "as is" with the understanding
+# that any separately negotiated standards of performance for said code
+# or program will be met for the duration of any applicable contract under which
+# the code or program is provided.
+
+"""Tests of the local transcription engine."""
+
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+from aissemble_lite_ffmpeg.preprocessing.ffmpeg_handler import SAMPLE_RATE
+from aissemble_lite_ffmpeg.preprocessing.local_transcribe import FasterWhisperEngine
+
+
+class FakePipeline:
+    """Stands in for `BatchedInferencePipeline`, one segment per speech window."""
+
+    def __init__(self):
+        self.calls = []
+
+    def transcribe(self, audio, clip_timestamps, batch_size, **_):
+        self.calls.append((len(audio), clip_timestamps, batch_size))
+        segments = [
+            SimpleNamespace(
+                # the window start in frames, rounded down like faster-whisper
+                seek=int(window["start"] * 100),
+                start=round(window["start"] + 0.25, 3),
+                end=round(window["end"], 3),
+                text=f" said at {window['start']:.2f} ",
+            )
+            for window in clip_timestamps
+        ]
+        return iter(segments), None
+
+
+@pytest.fixture
+def engine(monkeypatch):
+    """Engine without a model, speech windows taken from `engine.windows` by clip."""
+    engine = object.__new__(FasterWhisperEngine)
+    engine.language = "en"
+    engine.beam_size = 1
+    engine.decode_batch_size = 8
+    engine.model = SimpleNamespace(frames_per_second=100)
+    engine.pipeline = FakePipeline()
+    engine.windows = {}
+    monkeypatch.setattr(engine, "speech_windows", lambda a: engine.windows[len(a)])
+    return engine
+
+
+def test_clips_of_a_batch_are_decoded_in_one_call(engine):
+    audios = [np.zeros(n * SAMPLE_RATE, dtype=np.float32) for n in (3, 1, 2)]
+    engine.windows = {
+        3 * SAMPLE_RATE: [(0, SAMPLE_RATE), (SAMPLE_RATE + 4000, 3 * SAMPLE_RATE)],
+        1 * SAMPLE_RATE: [],
+        2 * SAMPLE_RATE: [(8000, 2 * SAMPLE_RATE)],
+    }
+
+    results = engine.transcribe_batch(audios)
+
+    [(samples, clip_timestamps, batch_size)] = engine.pipeline.calls
+    assert samples == 6 * SAMPLE_RATE
+    assert len(clip_timestamps) == 3
+    assert batch_size == 8
+    assert results == [
+        [
+            {"start": 0.25, "end": 1.0, "text": "said at 0.00"},
+            {"start": 1.5, "end": 3.0, "text": "said at 1.25"},
+        ],
+        [],
+        [{"start": 0.75, "end": 2.0, "text": "said at 4.50"}],
+    ]
+
+
+def test_batch_without_speech_skips_the_model(engine):
+    engine.windows = {SAMPLE_RATE: []}
+
+    results = engine.transcribe_batch([np.zeros(SAMPLE_RATE, dtype=np.float32)] * 2)
+
+    assert results == [[], []]
+    assert not engine.pipeline.calls
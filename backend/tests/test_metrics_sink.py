@@ -0,0 +1,79 @@
+# Copyright 2025 Booz Allen Hamilton.
+#
+# Booz Allen Hamilton Confidential Information.
+#
+# The contents of this file are the intellectual property of
+# Booz Allen Hamilton, Inc. ("BAH") and are subject to copyright protection
+# under the laws of the United States and other countries.
+#
+# You acknowledge that misappropriation, misuse, or redistribution of content
+# on the file could cause irreparable harm to BAH and/or to third parties.
+#
+# You may not copy, reproduce, distribute, publish, display, execute, modify,
+# create derivative works of, transmit, sell or offer for resale, or in any way
+# exploit any part of this code or program without BAH's express written permission.
+#
+# The contents of this code or program contains code
+# that is itself or was created using artificial intelligence.
+#
+# To the best of our knowledge, this code does not infringe third-party intellectual
+# property rights, contain errors, inaccuracies, bias, or security concerns.
+#
+# However, Booz Allen does not warrant, claim, or provide any implied
+# or express warranty for the aforementioned, nor of merchantability
+# or fitness for purpose.
+#
+# Booz Allen expressly limits liability, whether by contract, tort or in equity
+# for any damage or harm caused by use of this artificial intelligence code or program.
+#
+# Booz Allen is providing this code or program "as is" with the understanding
+# that any separately negotiated standards of performance for said code
+# or program will be met for the duration of any applicable contract under which
+# the code or program is provided.
+
+"""Tests of the background metrics writer."""
+
+import json
+import os
+import threading
+import time
+
+from aissemble_lite_ffmpeg.preprocessing.metrics_sink import MetricsSink
+
+
+def test_rotation_only_prunes_segments_of_this_process(tmp_path):
+    other = tmp_path / "metrics-20250101-000000-0-0001.jsonl"
+    other.write_text("{}\n")
+    sink = MetricsSink(
+        str(tmp_path), max_segment_bytes=1, max_segments=2, flush_records=1
+    )
+
+    for index in range(5):
+        sink.record(f"file{index}.mp3", "s3://bucket/key", {"index": index})
+        # segment names have second resolution, rotation goes by mtime
+        time.sleep(0.02)
+    sink.close()
+
+    own = sorted(tmp_path.glob(f"metrics-*-{os.getpid()}-*.jsonl"))
+    assert other.exists()
+    assert len(own) == 2
+    lines = [json.loads(line) for path in own for line in path.read_text().split()]
+    assert [line["metrics"]["index"] for line in lines] == [3, 4]
+
+
+def test_close_gives_up_on_a_stuck_writer(tmp_path):
+    unblock = threading.Event()
+    sink = MetricsSink(str(tmp_path), flush_records=1, max_queued=2)
+    sink._flush = lambda lines: unblock.wait()
+
+    for index in range(5):
+        sink.record(f"file{index}.mp3", "s3://bucket/key", {})
+    start = time.monotonic()
+    sink.close(timeout=0.3)
+    close_seconds = time.monotonic() - start
+    unblock.set()
+
+    assert close_seconds < 1
+    stats = sink.histograms()
+    assert stats["records"] + stats["dropped"] == 5
+    assert stats["dropped"] >= 2
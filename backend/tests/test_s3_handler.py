@@ -0,0 +1,181 @@
+# Copyright 2025 Booz Allen Hamilton.
+#
+# Booz Allen Hamilton Confidential Information.
+#
+# The contents of this file are the intellectual property of
+# Booz Allen Hamilton, Inc. ("BAH") and are subject to copyright protection
+# under the laws of the United States and other countries.
+#
+# You acknowledge that misappropriation, misuse, or redistribution of content
+# on the file could cause irreparable harm to BAH and/or to third parties.
+#
+# You may not copy, reproduce, distribute, publish, display, execute, modify,
+# create derivative works of, transmit, sell or offer for resale, or in any way
+# exploit any part of this code or program without BAH's express written permission.
+#
+# The contents of this code or program contains code
+# that is itself or was created using artificial intelligence.
+#
+# To the best of our knowledge, this code does not infringe third-party intellectual
+# property rights, contain errors, inaccuracies, bias, or security concerns.
+#
+# However, Booz Allen does not warrant, claim, or provide any implied
+# or express warranty for the aforementioned, nor of merchantability
+# or fitness for purpose.
+#
+# Booz Allen expressly limits liability, whether by contract, tort or in equity
+# for any damage or harm caused by use of this artificial intelligence code or program.
+#
+# Booz Allen is providing this code or program "as is" with the understanding
+# that any separately negotiated standards of performance for said code
+# or program will be met for the duration of any applicable contract under which
+# the code or program is provided.
+
+"""Tests of the streaming multipart upload of `S3Handler`."""
+
+import pytest
+from aissemble_lite_ffmpeg.preprocessing.ffmpeg_handler import wav_header
+from aissemble_lite_ffmpeg.preprocessing.s3_handler import MIN_PART_SIZE, S3Handler
+
+from tests.performance.fakes import FakeClientError, FakeS3
+
+BUCKET = "test-bucket"
+
+
+@pytest.fixture()
+def s3() -> FakeS3:
+    """In-memory s3 client that keeps object bodies."""
+    return FakeS3(keep_bodies=True)
+
+
+@pytest.fixture()
+def handler(s3: FakeS3, monkeypatch: pytest.MonkeyPatch) -> S3Handler:
+    """Handler on the fake client with the smallest part size s3 allows."""
+    monkeypatch.setenv("S3_MULTIPART_PART_SIZE_MB", "5")
+    monkeypatch.setenv("S3_MULTIPART_CONCURRENCY", "2")
+    return S3Handler(bucket_name=BUCKET, s3_client=s3)
+
+
+def chunks(size: int, chunk_size: int = 256 * 1024):
+    """`size` bytes of a repeating pattern, in pieces like the ffmpeg stdout reads."""
+    data = bytes(range(256)) * (size // 256 + 1)
+    for start in range(0, size, chunk_size):
+        end = min(start + chunk_size, size)
+        yield data[start:end]
+
+
+def stored_body(s3: FakeS3, s3_uri: str) -> bytes:
+    """Body of the object the fake stored at `s3_uri`."""
+    key = s3_uri.removeprefix(f"s3://{BUCKET}/")
+    return s3.objects[(BUCKET, key)]["body"]
+
+
+def test_upload_stream_assembles_parts_with_header(s3, handler):
+    size = 2 * MIN_PART_SIZE + 1000
+    s3_uri, metrics = handler.upload_stream(
+        chunks(size), "talk.mp4", header_factory=wav_header
+    )
+
+    assert stored_body(s3, s3_uri) == wav_header(size) + b"".join(chunks(size))
+    assert metrics["s3_part_count"] == 3
+    assert [p["part_number"] for p in metrics["s3_part_timings"]] == [1, 2, 3]
+    assert metrics["output_file_size_bytes"] == size + 44
+    assert not s3.uploads
+
+
+def test_upload_stream_small_output_is_a_single_put(s3, handler):
+    s3_uri, metrics = handler.upload_stream(
+        chunks(1000), "clip.wav", header_factory=wav_header
+    )
+
+    assert stored_body(s3, s3_uri) == wav_header(1000) + b"".join(chunks(1000))
+    assert metrics["s3_part_count"] == 1
+    assert not s3.uploads
+
+
+def test_upload_stream_aborts_multipart_upload_when_producer_fails(s3, handler):
+    def failing_ffmpeg():
+        yield from chunks(2 * MIN_PART_SIZE + 1000)
+        msg = "ffmpeg exited with code 1"
+        raise RuntimeError(msg)
+
+    with pytest.raises(RuntimeError, match="ffmpeg exited with code 1"):
+        handler.upload_stream(failing_ffmpeg(), "broken.mp4")
+
+    assert not s3.uploads
+    assert not s3.objects
+
+
+def test_upload_stream_aborts_multipart_upload_when_a_part_fails(s3, handler):
+    def upload_part(**kwargs):
+        msg = "connection reset"
+        raise ConnectionError(msg)
+
+    s3.upload_part = upload_part
+    with pytest.raises(RuntimeError, match="connection reset"):
+        handler.upload_stream(chunks(4 * MIN_PART_SIZE), "talk.mp4")
+
+    assert not s3.uploads
+    assert not s3.objects
+
+
+class ConditionalS3(FakeS3):
+    """Fake that honours IfMatch on GETs and records the requested ranges."""
+
+    def __init__(self) -> None:
+        super().__init__(keep_bodies=True)
+        self.ranges = []
+
+    def get_object(self, Bucket: str, Key: str, **kwargs) -> dict:
+        etag = f'"{self._get(Bucket, Key)["etag"]}"'
+        if kwargs.get("IfMatch", etag) != etag:
+            msg = "An error occurred (412) when calling the GetObject operation"
+            raise FakeClientError(msg)
+        self.ranges.append(kwargs.get("Range"))
+        return super().get_object(Bucket, Key, **kwargs)
+
+
+@pytest.fixture()
+def ranged_handler(monkeypatch: pytest.MonkeyPatch) -> S3Handler:
+    """Handler reading 1000 byte ranges, three of them ahead."""
+    monkeypatch.setenv("S3_INGEST_RANGE_MB", str(1000 / 1024 / 1024))
+    monkeypatch.setenv("S3_INGEST_CONCURRENCY", "3")
+    return S3Handler(bucket_name=BUCKET, s3_client=ConditionalS3())
+
+
+def test_iter_object_yields_ranges_in_order(ranged_handler):
+    s3 = ranged_handler.s3_client
+    body = b"".join(chunks(10_500))
+    s3.put_object(Bucket=BUCKET, Key="raw/talk.mp3", Body=body)
+    head = ranged_handler.head(f"s3://{BUCKET}/raw/talk.mp3")
+
+    blocks = list(
+        ranged_handler.iter_object(
+            f"s3://{BUCKET}/raw/talk.mp3", head["size"], head["etag"]
+        )
+    )
+
+    assert b"".join(blocks) == body
+    assert [len(block) for block in blocks] == [1000] * 10 + [500]
+    assert sorted(s3.ranges) == sorted(
+        f"bytes={start}-{min(start + 1000, len(body)) - 1}"
+        for start in range(0, len(body), 1000)
+    )
+
+
+def test_iter_object_fails_when_object_is_replaced(ranged_handler):
+    s3 = ranged_handler.s3_client
+    s3.put_object(Bucket=BUCKET, Key="raw/talk.mp3", Body=b"".join(chunks(10_500)))
+    head = ranged_handler.head(f"s3://{BUCKET}/raw/talk.mp3")
+    s3.put_object(Bucket=BUCKET, Key="raw/talk.mp3", Body=b"".join(chunks(10_400)))
+
+    blocks = ranged_handler.iter_object(
+        f"s3://{BUCKET}/raw/talk.mp3", head["size"], head["etag"]
+    )
+    with pytest.raises(FakeClientError, match="412"):
+        list(blocks)
+
+
+def test_head_of_missing_object_raises_file_not_found(handler):
+    with pytest.raises(FileNotFoundError, match="S3 object not available"):
+        handler.head(f"s3://{BUCKET}/raw/missing.mp3")
@@ -0,0 +1,172 @@
+# Copyright 2025 Booz Allen Hamilton.
+#
+# Booz Allen Hamilton Confidential Information.
+#
+# The contents of this file are the intellectual property of
+# Booz Allen Hamilton, Inc. ("BAH") and are subject to copyright protection
+# under the laws of the United States and other countries.
+#
+# You acknowledge that misappropriation, misuse, or redistribution of content
+# on the file could cause irreparable harm to BAH and/or to third parties.
+#
+# You may not copy, reproduce, distribute, publish, display, execute, modify,
+# create derivative works of, transmit, sell or offer for resale, or in any way
+# exploit any part of this code or program without BAH's express written permission.
+#
+# The contents of this code or program contains code
+# that is itself or was created using artificial intelligence.
+#
+# To the best of our knowledge, this code does not infringe third-party intellectual
+# property rights, contain errors, inaccuracies, bias, or security concerns.
+#
+# However, Booz Allen does not warrant, claim, or provide any implied
+# or express warranty for the aforementioned, nor of merchantability
+# or fitness for purpose.
+#
+# Booz Allen expressly limits liability, whether by contract, tort or in equity
+# for any damage or harm caused by use of this artificial intelligence code or program.
+#
+# Booz Allen is providing this code or program "as is" with the understanding
+# that any separately negotiated standards of performance for said code
+# or program will be met for the duration of any applicable contract under which
+# the code or program is provided.
+
+"""Tests of the silence trimming and its map back to the original timeline."""
+
+import numpy as np
+import pytest
+from aissemble_lite_ffmpeg.preprocessing.ffmpeg_handler import SAMPLE_RATE, SAMPLE_WIDTH
+from aissemble_lite_ffmpeg.preprocessing.silence import (
+    ORIGINAL_TIMELINE,
+    SilenceTrimmer,
+    remap_segments,
+    remap_transcript,
+    to_original_time,
+)
+
+
+def tone(seconds: float) -> bytes:
+    """440Hz at half scale, well above the silence threshold."""
+    t = np.arange(round(seconds * SAMPLE_RATE)) / SAMPLE_RATE
+    return (np.sin(2 * np.pi * 440 * t) * 16384).astype("<i2").tobytes()
+
+
+def silence(seconds: float) -> bytes:
+    return bytes(round(seconds * SAMPLE_RATE) * SAMPLE_WIDTH)
+
+
+def seconds(pcm: bytes) -> float:
+    return len(pcm) / SAMPLE_WIDTH / SAMPLE_RATE
+
+
+@pytest.fixture()
+def trimmer() -> SilenceTrimmer:
+    """Cuts silences of 1s or more down to 0.2s on each side."""
+    return SilenceTrimmer(threshold_db=-40, min_silence_seconds=1, keep_seconds=0.2)
+
+
+def trim(trimmer: SilenceTrimmer, pcm: bytes, block_bytes: int = 4096) -> bytes:
+    blocks = (
+        pcm[start : start + block_bytes] for start in range(0, len(pcm), block_bytes)
+    )
+    return b"".join(trimmer.trim(blocks))
+
+
+def test_cut_in_the_middle_keeps_padding_around_speech(trimmer):
+    trimmed = trim(trimmer, tone(1) + silence(3) + tone(1))
+
+    # 0.2s of the silence is kept after and before the speech
+    assert trimmed == tone(1) + silence(0.4) + tone(1)
+    assert trimmer.removed_seconds == pytest.approx(2.6)
+    assert trimmer.breakpoints == [pytest.approx((1.2, 3.8))]
+    # the second tone starts at 1.4s in the trimmed audio, 4s in the original
+    assert to_original_time(1.4, trimmer.breakpoints) == pytest.approx(4.0)
+    assert to_original_time(0.5, trimmer.breakpoints) == pytest.approx(0.5)
+
+
+def test_cut_at_the_start(trimmer):
+    trimmed = trim(trimmer, silence(2) + tone(1))
+
+    assert trimmed == silence(0.4) + tone(1)
+    assert trimmer.breakpoints == [pytest.approx((0.2, 1.8))]
+    assert to_original_time(0.4, trimmer.breakpoints) == pytest.approx(2.0)
+
+
+def test_cut_at_the_end(trimmer):
+    trimmed = trim(trimmer, tone(1) + silence(2))
+
+    assert trimmed == tone(1) + silence(0.4)
+    assert trimmer.breakpoints == [pytest.approx((1.2, 2.8))]
+    assert to_original_time(1.0, trimmer.breakpoints) == pytest.approx(1.0)
+
+
+def test_all_silence_is_cut_down_to_the_padding(trimmer):
+    trimmed = trim(trimmer, silence(3))
+
+    assert seconds(trimmed) == pytest.approx(0.4)
+    assert trimmer.removed_seconds == pytest.approx(2.6)
+    assert trimmer.input_samples == 3 * SAMPLE_RATE
+
+
+def test_short_pauses_are_kept(trimmer):
+    pcm = tone(1) + silence(0.5) + tone(1)
+
+    assert trim(trimmer, pcm) == pcm
+    assert trimmer.breakpoints == []
+
+
+def test_padding_is_at_most_half_the_shortest_cut():
+    trimmer = SilenceTrimmer(threshold_db=-40, min_silence_seconds=0.2, keep_seconds=1)
+
+    trimmed = trim(trimmer, tone(1) + silence(1) + tone(1))
+
+    assert trimmer.keep_frames == 5
+    assert trimmed == tone(1) + silence(0.2) + tone(1)
+
+
+def test_result_does_not_depend_on_the_block_size(trimmer):
+    pcm = silence(1.5) + tone(1) + silence(2.3) + tone(0.5) + silence(1.1)
+    expected = trim(trimmer, pcm)
+    breakpoints = trimmer.breakpoints
+
+    other = SilenceTrimmer(threshold_db=-40, min_silence_seconds=1, keep_seconds=0.2)
+
+    assert trim(other, pcm, block_bytes=333) == expected
+    assert other.breakpoints == breakpoints
+
+
+def test_segment_times_round_trip_to_the_original_timeline(trimmer):
+    trim(trimmer, silence(2) + tone(1) + silence(3) + tone(1))
+    offset_map = trimmer.offset_map()
+    # both tones, as a transcriber sees them in the trimmed audio
+    segments = [
+        {"start": 0.4, "end": 1.4, "text": "first"},
+        {"start": 1.8, "end": 2.8, "text": "second"},
+    ]
+
+    remapped = remap_segments(segments, offset_map)
+
+    assert [(s["start"], s["end"]) for s in remapped] == [(2.0, 3.0), (6.0, 7.0)]
+    assert [s["text"] for s in remapped] == ["first", "second"]
+    assert segments[0]["start"] == 0.4
+
+
+def test_transcript_is_remapped_once(trimmer):
+    trim(trimmer, silence(2) + tone(1))
+    offset_map = trimmer.offset_map()
+    transcript = {
+        "results": {
+            "items": [{"start_time": "0.400", "end_time": "1.400"}],
+            "audio_segments": [{"start_time": "0.400", "end_time": "1.400"}],
+        }
+    }
+
+    remapped = remap_transcript(transcript, offset_map)
+
+    assert remapped[ORIGINAL_TIMELINE]
+    assert remapped["results"]["items"] == [
+        {"start_time": "2.000", "end_time": "3.000"}
+    ]
+    assert remapped["results"]["audio_segments"] == remapped["results"]["items"]
+    assert remap_transcript(remapped, offset_map) is remapped
+    assert ORIGINAL_TIMELINE not in transcript
@@ -0,0 +1,151 @@
+# Copyright 2025 Booz Allen Hamilton.
+#
+# Booz Allen Hamilton Confidential Information.
+#
+# The contents of this file are the intellectual property of
+# Booz Allen Hamilton, Inc. ("BAH") and are subject to copyright protection
+# under the laws of the United States and other countries.
+#
+# You acknowledge that misappropriation, misuse, or redistribution of content
+# on the file could cause irreparable harm to BAH and/or to third parties.
+#
+# You may not copy, reproduce, distribute, publish, display, execute, modify,
+# create derivative works of, transmit, sell or offer for resale, or in any way
+# exploit any part of this code or program without BAH's express written permission.
+#
+# The contents of this code or program contains code
+# that is itself or was created using artificial intelligence.
+#
+# To the best of our knowledge, this code does not infringe third-party intellectual
+# property rights, contain errors, inaccuracies, bias, or security concerns.
+#
+# However, Booz Allen does not warrant, claim, or provide any implied
+# or express warranty for the aforementioned, nor of merchantability
+# or fitness for purpose.
+#
+# Booz Allen expressly limits liability, whether by contract, tort or in equity
+# for any damage or harm caused by use of this artificial intelligence code or program.
+#
+# Booz Allen is providing this code or program "as is" with the understanding
+# that any separately negotiated standards of performance for said code
+# or program will be met for the duration of any applicable contract under which
+# the code or program is provided.
+
+"""Tests of the preprocessing stages the stage benchmark times, run one at a time."""
+
+import shutil
+import wave
+from pathlib import Path
+
+import ffmpeg
+import pytest
+from aissemble_lite_ffmpeg.preprocessing.ffmpeg_handler import wav_header
+from aissemble_lite_ffmpeg.preprocessing.input_handler import InputHandler
+from aissemble_lite_ffmpeg.preprocessing.s3_handler import S3Handler
+
+from tests.performance.fakes import FakeS3
+from tests.performance.fixtures import fixture
+
+pytestmark = pytest.mark.skipif(
+    shutil.which("ffmpeg") is None, reason="ffmpeg is not installed"
+)
+
+BUCKET = "test-bucket"
+SECONDS = 5
+# 16kHz mono 16-bit
+PCM_BYTES_PER_SECOND = 32000
+
+
+@pytest.fixture(scope="module")
+def fixture_dir(tmp_path_factory: pytest.TempPathFactory) -> Path:
+    """Directory the generated fixtures of this module are cached in."""
+    return tmp_path_factory.mktemp("fixtures")
+
+
+@pytest.fixture(params=[".mp3", ".mp4", ".wav"])
+def media(request: pytest.FixtureRequest, fixture_dir: Path) -> Path:
+    """A generated `SECONDS` long fixture per container."""
+    return fixture(request.param, SECONDS, directory=fixture_dir)
+
+
+@pytest.fixture()
+def s3() -> FakeS3:
+    """In-memory s3 client that keeps object bodies."""
+    return FakeS3(keep_bodies=True)
+
+
+@pytest.fixture()
+def handler(s3, tmp_path, monkeypatch: pytest.MonkeyPatch) -> InputHandler:
+    """Input handler on the s3 fake, working in a temp directory."""
+    # convert_to_wav writes into the working directory
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv("OUTPUT_CODEC", "flac")
+    return InputHandler(S3Handler(bucket_name=BUCKET, s3_client=s3))
+
+
+@pytest.fixture()
+def wav(handler: InputHandler, media: Path, tmp_path) -> Path:
+    """The fixture converted like the request path does, the input of later stages."""
+    path = tmp_path / f"{media.stem}_input.wav"
+    pcm = handler.ffmpeg_handler.stream_to_pcm(str(media))
+    handler.ffmpeg_handler.write_wav(pcm, str(path))
+    return path
+
+
+def assert_duration(pcm_bytes: int) -> None:
+    """PCM of about `SECONDS` seconds, encoders pad a few milliseconds."""
+    assert abs(pcm_bytes / PCM_BYTES_PER_SECOND - SECONDS) < 0.1
+
+
+def test_probe(handler, media):
+    metadata = handler._probe_file(str(media))
+
+    assert abs(float(metadata["format"]["duration"]) - SECONDS) < 0.1
+
+
+def test_convert_to_wav(handler, media):
+    output, metrics = handler.ffmpeg_handler.convert_to_wav(str(media))
+
+    with wave.open(output, "rb") as converted:
+        assert converted.getframerate() == 16000
+        assert converted.getnchannels() == 1
+        assert converted.getsampwidth() == 2
+        assert_duration(converted.getnframes() * 2)
+    assert metrics["output_file_size_bytes"] == Path(output).stat().st_size
+
+
+def test_stream_to_pcm(handler, media):
+    pcm = b"".join(handler.ffmpeg_handler.stream_to_pcm(str(media)))
+
+    assert_duration(len(pcm))
+
+
+def test_encode(handler, wav):
+    flac = b"".join(
+        handler.ffmpeg_handler.encode(handler.ffmpeg_handler.wav_pcm(str(wav)))
+    )
+
+    assert flac[:4] == b"fLaC"
+    decoded, _ = (
+        ffmpeg.input("pipe:", f="flac")
+        .output("pipe:", f="s16le", ac=1, ar=16000)
+        .run(input=flac, capture_stdout=True, quiet=True)
+    )
+    assert len(decoded) == wav.stat().st_size - 44
+
+
+def test_upload_file(s3, handler, media, wav):
+    s3_uri, metrics = handler.s3_handler.upload_file(str(wav), media.name)
+
+    key = s3_uri.removeprefix(f"s3://{BUCKET}/")
+    assert s3.objects[(BUCKET, key)]["body"] == wav.read_bytes()
+    assert metrics["output_file_size_bytes"] == wav.stat().st_size
+
+
+def test_upload_stream(s3, handler, media, wav):
+    pcm = handler.ffmpeg_handler.wav_pcm(str(wav))
+    s3_uri, metrics = handler.s3_handler.upload_stream(pcm, media.name, wav_header)
+
+    key = s3_uri.removeprefix(f"s3://{BUCKET}/")
+    assert s3.objects[(BUCKET, key)]["body"] == wav.read_bytes()
+    assert metrics["output_file_size_bytes"] == wav.stat().st_size
@@ -0,0 +1,164 @@
+# Copyright 2025 Booz Allen Hamilton.
+#
+# Booz Allen Hamilton Confidential Information.
+#
+# The contents of this file are the intellectual property of
+# Booz Allen Hamilton, Inc. ("BAH") and are subject to copyright protection
+# under the laws of the United States and other countries.
+#
+# You acknowledge that misappropriation, misuse, or redistribution of content
+# on the file could cause irreparable harm to BAH and/or to third parties.
+#
+# You may not copy, reproduce, distribute, publish, display, execute, modify,
+# create derivative works of, transmit, sell or offer for resale, or in any way
+# exploit any part of this code or program without BAH's express written permission.
+#
+# The contents of this code or program contains code
+# that is itself or was created using artificial intelligence.
+#
+# To the best of our knowledge, this code does not infringe third-party intellectual
+# property rights, contain errors, inaccuracies, bias, or security concerns.
+#
+# However, Booz Allen does not warrant, claim, or provide any implied
+# or express warranty for the aforementioned, nor of merchantability
+# or fitness for purpose.
+#
+# Booz Allen expressly limits liability, whether by contract, tort or in equity
+# for any damage or harm caused by use of this artificial intelligence code or program.
+#
+# Booz Allen is providing this code or program "as is" with the understanding
+# that any separately negotiated standards of performance for said code
+# or program will be met for the duration of any applicable contract under which
+# the code or program is provided.
+
+"""Tests of the asynchronous job orchestration of `TranscriptionService`."""
+
+import asyncio
+import time
+
+import pytest
+from aissemble_lite_ffmpeg.preprocessing.transcribe import TranscriptionService
+
+from tests.performance.fakes import FakeTranscribe
+
+JOB_SECONDS = 0.2
+
+
+class FailingTranscribe(FakeTranscribe):
+    """Fake whose jobs on media with "broken" in the name fail."""
+
+    def _status(self, job):
+        if "broken" in job["request"]["Media"]["MediaFileUri"]:
+            return "FAILED", None
+        return super()._status(job)
+
+    def get_transcription_job(self, TranscriptionJobName: str) -> dict:
+        response = super().get_transcription_job(TranscriptionJobName)
+        if response["TranscriptionJob"]["TranscriptionJobStatus"] == "FAILED":
+            response["TranscriptionJob"]["FailureReason"] = "Unsupported audio"
+        return response
+
+
+@pytest.fixture()
+def client() -> FailingTranscribe:
+    """Transcribe fake whose jobs take `JOB_SECONDS`."""
+    return FailingTranscribe(job_seconds=JOB_SECONDS)
+
+
+@pytest.fixture()
+def service(client, monkeypatch: pytest.MonkeyPatch) -> TranscriptionService:
+    """Service polling the fake every few milliseconds."""
+    monkeypatch.setenv("TRANSCRIBE_POLL_MAX_INTERVAL_SECONDS", "0.05")
+    return TranscriptionService(transcribe_client=client, poll_interval=0.01)
+
+
+@pytest.mark.parametrize(
+    ("elapsed", "expected_seconds", "attempt", "low", "high"),
+    [
+        # before the expected runtime the rest of it is waited out
+        (4, 10, 0, 4.2, 6),
+        # also when that is longer than the max interval
+        (0, 100, 0, 70, 100),
+        # after it the delay grows with the attempt
+        (0, None, 0, 0.7, 1),
+        (0, None, 3, 5.6, 8),
+        (12, 10, 2, 2.8, 4),
+        # and is capped at the max interval
+        (0, None, 10, 14, 20),
+        # but never drops below the poll interval
+        (9.9, 10, 0, 0.7, 1),
+    ],
+)
+def test_next_poll_delay(monkeypatch, elapsed, expected_seconds, attempt, low, high):
+    monkeypatch.setenv("TRANSCRIBE_POLL_MAX_INTERVAL_SECONDS", "20")
+    monkeypatch.setenv("TRANSCRIBE_POLL_BACKOFF", "2")
+    service = TranscriptionService(transcribe_client=FakeTranscribe(), poll_interval=1)
+
+    for _ in range(20):
+        delay = service._next_poll_delay(elapsed, expected_seconds, attempt)
+        assert low <= delay <= high
+
+
+def test_poll_job_status_async_returns_once_completed(client, service):
+    client.start_transcription_job(
+        "job", Media={"MediaFileUri": "s3://bucket/input/talk.wav"}
+    )
+
+    response, metrics = asyncio.run(service.poll_job_status_async("job"))
+
+    assert response["TranscriptionJob"]["TranscriptionJobStatus"] == "COMPLETED"
+    assert metrics["poll_mode"] == "get"
+    assert metrics["poll_count"] > 1
+    assert metrics["job_wait_seconds"] >= JOB_SECONDS
+    assert metrics["poll_added_latency_seconds"] is not None
+
+
+def test_poll_job_status_async_raises_on_failed_job(client, service):
+    client.start_transcription_job(
+        "job", Media={"MediaFileUri": "s3://bucket/input/broken.wav"}
+    )
+
+    with pytest.raises(RuntimeError, match="Unsupported audio"):
+        asyncio.run(service.poll_job_status_async("job"))
+
+
+@pytest.mark.parametrize(("threshold", "poll_mode"), [(100, "get"), (1, "list")])
+def test_transcribe_all_async_reports_each_job(client, service, threshold, poll_mode):
+    service.list_poll_threshold = threshold
+    uris = [f"s3://bucket/input/talk_{index}.wav" for index in range(10)]
+    uris[3] = "s3://bucket/input/broken.wav"
+    finished = []
+
+    start = time.time()
+    results = asyncio.run(service.transcribe_all_async(uris, on_result=finished.append))
+    seconds = time.time() - start
+
+    assert [result.s3_uri for result in results] == uris
+    assert len(finished) == len(uris)
+    assert not results[3].success
+    assert "failed" in results[3].error
+    for result in results[:3] + results[4:]:
+        assert result.success
+        assert result.s3_output_uri.startswith("s3://bucket/output/talk_")
+        assert result.metrics["poll_mode"] == poll_mode
+    # all jobs run at once, the batch takes about as long as one job
+    assert seconds < JOB_SECONDS * len(uris) / 2
+
+
+def test_transcribe_all_async_caps_concurrent_jobs(client, service):
+    service.max_concurrent_jobs = 2
+    uris = [f"s3://bucket/input/talk_{index}.wav" for index in range(4)]
+
+    start = time.time()
+    results = asyncio.run(service.transcribe_all_async(uris))
+
+    assert all(result.success for result in results)
+    # two rounds of two jobs
+    assert time.time() - start >= 2 * JOB_SECONDS
+
+
+def test_transcribe_all_async_rejects_unsupported_format(service):
+    results = asyncio.run(service.transcribe_all_async(["s3://bucket/input/notes.txt"]))
+
+    assert not results[0].success
+    assert "Unsupported media format" in results[0].error
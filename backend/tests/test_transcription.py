@@ -0,0 +1,114 @@
+# Copyright 2025 Booz Allen Hamilton.
+#
+# Booz Allen Hamilton Confidential Information.
+#
+# The contents of this file are the intellectual property of
+# Booz Allen Hamilton, Inc. ("BAH") and are subject to copyright protection
+# under the laws of the United States and other countries.
+#
+# You acknowledge that misappropriation, misuse, or redistribution of content
+# on the file could cause irreparable harm to BAH and/or to third parties.
+#
+# You may not copy, reproduce, distribute, publish, display, execute, modify,
+# create derivative works of, transmit, sell or offer for resale, or in any way
+# exploit any part of this code or program without BAH's express written permission.
+#
+# The contents of this code or program contains code
+# that is itself or was created using artificial intelligence.
+#
+# To the best of our knowledge, this code does not infringe third-party intellectual
+# property rights, contain errors, inaccuracies, bias, or security concerns.
+#
+# However, Booz Allen does not warrant, claim, or provide any implied
+# or express warranty for the aforementioned, nor of merchantability
+# or fitness for purpose.
+#
+# Booz Allen expressly limits liability, whether by contract, tort or in equity
+# for any damage or harm caused by use of this artificial intelligence code or program.
+#
+# Booz Allen is providing this code or program "as is" with the understanding
+# that any separately negotiated standards of performance for said code
+# or program will be met for the duration of any applicable contract under which
+# the code or program is provided.
+
+"""Tests of the transcription routes."""
+
+import shutil
+import tempfile
+
+import ffmpeg
+import pytest
+from aissemble_lite_ffmpeg.preprocessing import local_transcribe
+
+from tests.performance.fakes import FakeEngine, FakeS3, FakeTranscribe
+
+BUCKET = "aissemble-transcribe"
+
+
+def put_media(fake_s3: FakeS3, key: str, body: bytes = b"fLaC audio") -> str:
+    """Store a media object, returns its uri."""
+    fake_s3.put_object(Bucket=BUCKET, Key=key, Body=body)
+    return f"s3://{BUCKET}/{key}"
+
+
+def test_transcribe_then_fetch_result(client, fake_s3):
+    uri = put_media(fake_s3, "input/a.flac")
+
+    [result] = client.post("/transcribe", json={"s3_uris": [uri]}).json()["results"]
+    response = client.get("/transcribe/result", params={"s3_uri": uri})
+
+    assert result["success"]
+    assert response.status_code == 200
+    assert response.json()["s3_output_uri"] == result["s3_output_uri"]
+    assert response.json()["text"] == f"transcript of {uri}"
+
+
+def test_cached_transcription_result_can_be_fetched(
+    client, fake_s3, fake_transcribe: FakeTranscribe
+):
+    first = put_media(fake_s3, "input/a.flac")
+    copy = put_media(fake_s3, "input/copy_of_a.flac")
+    client.post("/transcribe", json={"s3_uris": [first]})
+
+    [result] = client.post("/transcribe", json={"s3_uris": [copy]}).json()["results"]
+    response = client.get("/transcribe/result", params={"s3_uri": copy})
+
+    assert result["success"]
+    assert result["metrics"]["cached"]
+    assert len(fake_transcribe.jobs) == 1
+    assert response.status_code == 200
+    assert response.json()["s3_output_uri"] == result["s3_output_uri"]
+    assert response.json()["text"] == f"transcript of {first}"
+
+
+def test_result_of_untranscribed_media_is_not_found(client, fake_s3):
+    uri = put_media(fake_s3, "input/a.flac")
+
+    response = client.get("/transcribe/result", params={"s3_uri": uri})
+
+    assert response.status_code == 404
+
+
+@pytest.mark.skipif(shutil.which("ffmpeg") is None, reason="ffmpeg is not installed")
+def test_upload_is_transcribed_by_the_local_engine(client, tmp_path, monkeypatch):
+    spool = tmp_path / "spool"
+    spool.mkdir()
+    monkeypatch.setattr(tempfile, "tempdir", str(spool))
+    service = local_transcribe.LocalTranscriptionService(engine=FakeEngine())
+    monkeypatch.setattr(local_transcribe, "_shared_service", service)
+    wav, _ = (
+        ffmpeg.input("sine=frequency=440:duration=2", f="lavfi")
+        .output("pipe:", f="wav")
+        .run(capture_stdout=True, quiet=True)
+    )
+
+    response = client.post("/transcribe/upload", files={"file": ("tone.wav", wav)})
+    service.close()
+
+    assert response.status_code == 200
+    assert response.json()["s3_uri"] == "tone.wav"
+    assert response.json()["transcript"]["results"]["transcripts"] == [
+        {"transcript": "2.0 seconds of audio"}
+    ]
+    # the spooled copy of the upload is gone
+    assert not list(spool.iterdir())
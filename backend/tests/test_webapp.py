@@ -0,0 +1,142 @@
+# Copyright 2025 Booz Allen Hamilton.
+#
+# Booz Allen Hamilton Confidential Information.
+#
+# The contents of this file are the intellectual property of
+# Booz Allen Hamilton, Inc. ("BAH") and are subject to copyright protection
+# under the laws of the United States and other countries.
+#
+# You acknowledge that misappropriation, misuse, or redistribution of content
+# on the file could cause irreparable harm to BAH and/or to third parties.
+#
+# You may not copy, reproduce, distribute, publish, display, execute, modify,
+# create derivative works of, transmit, sell or offer for resale, or in any way
+# exploit any part of this code or program without BAH's express written permission.
+#
+# The contents of this code or program contains code
+# that is itself or was created using artificial intelligence.
+#
+# To the best of our knowledge, this code does not infringe third-party intellectual
+# property rights, contain errors, inaccuracies, bias, or security concerns.
+#
+# However, Booz Allen does not warrant, claim, or provide any implied
+# or express warranty for the aforementioned, nor of merchantability
+# or fitness for purpose.
+#
+# Booz Allen expressly limits liability, whether by contract, tort or in equity
+# for any damage or harm caused by use of this artificial intelligence code or program.
+#
+# Booz Allen is providing this code or program "as is" with the understanding
+# that any separately negotiated standards of performance for said code
+# or program will be met for the duration of any applicable contract under which
+# the code or program is provided.
+
+"""Tests of the app setup."""
+
+import asyncio
+import threading
+import time
+from collections.abc import Iterator
+
+import httpx
+import pytest
+import uvicorn
+from aissemble_lite_ffmpeg.batching import MicroBatcher
+from fastapi import APIRouter
+from fastapi.routing import APIRoute
+
+from tests.performance.fakes import FakeEngine
+
+
+@pytest.fixture()
+def slow_model(monkeypatch: pytest.MonkeyPatch) -> Iterator[FakeEngine]:
+    """A loaded model of the app's inference handler whose batches take 1s."""
+    from aissemble_lite_ffmpeg.webapp import inference_handler
+
+    monkeypatch.setenv("FAKE_ENGINE_BATCH_OVERHEAD_SECONDS", "1")
+    engine = FakeEngine()
+    batcher = MicroBatcher(engine.transcribe_batch, max_batch_size=1, name="test")
+    monkeypatch.setattr(inference_handler, "engine", engine)
+    monkeypatch.setattr(inference_handler, "batcher", batcher)
+    monkeypatch.setattr(inference_handler, "_ready", threading.Event())
+    inference_handler._ready.set()
+    yield engine
+    batcher.close()
+
+
+@pytest.fixture()
+def server_url() -> Iterator[str]:
+    """The app served by uvicorn on a free port, without its lifespan."""
+    from aissemble_lite_ffmpeg.webapp import app
+
+    server = uvicorn.Server(
+        uvicorn.Config(app, port=0, lifespan="off", log_level="warning")
+    )
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.01)
+    port = server.servers[0].sockets[0].getsockname()[1]
+    yield f"http://127.0.0.1:{port}"
+    server.should_exit = True
+    thread.join()
+
+
+def test_pending_inference_does_not_block_metrics(slow_model, server_url):
+    request = {
+        "inputs": [
+            {"name": "audio", "shape": [1600], "datatype": "FP32", "data": [0.0] * 1600}
+        ]
+    }
+    responses = []
+    infer = threading.Thread(
+        target=lambda: responses.append(
+            httpx.post(
+                f"{server_url}/v2/models/whisper/versions/1/infer",
+                json=request,
+                timeout=10,
+            )
+        )
+    )
+    infer.start()
+    while not slow_model.batches:
+        time.sleep(0.01)
+
+    start = time.time()
+    metrics = httpx.get(f"{server_url}/metrics", timeout=10)
+    metrics_seconds = time.time() - start
+    infer.join()
+
+    assert metrics.status_code == 200
+    assert metrics_seconds < 0.5
+    assert responses[0].status_code == 200
+
+
+def test_router_without_versioned_infer_route_is_rejected():
+    from aissemble_lite_ffmpeg.webapp import run_infer_routes_on_threads
+
+    router = APIRouter()
+
+    @router.post("/v2/models/{model_name}/infer")
+    async def infer(model_name: str) -> str:
+        return model_name
+
+    with pytest.raises(RuntimeError, match="No versioned infer route"):
+        run_infer_routes_on_threads(router)
+
+
+def test_async_infer_routes_are_rebuilt_as_plain_routes():
+    from aissemble_lite_ffmpeg.webapp import run_infer_routes_on_threads
+
+    router = APIRouter()
+
+    @router.post("/v2/models/{model_name}/versions/{model_version}/infer")
+    async def infer(model_name: str, model_version: str) -> str:
+        return model_name + model_version
+
+    run_infer_routes_on_threads(router)
+
+    [route] = router.routes
+    assert isinstance(route, APIRoute)
+    assert not asyncio.iscoroutinefunction(route.endpoint)
+    assert route.endpoint("a", "1") == "a1"
@@ -0,0 +1,94 @@
+# Copyright 2025 Booz Allen Hamilton.
+#
+# Booz Allen Hamilton Confidential Information.
+#
+# The contents of this file are the intellectual property of
+# Booz Allen Hamilton, Inc. ("BAH") and are subject to copyright protection
+# under the laws of the United States and other countries.
+#
+# You acknowledge that misappropriation, misuse, or redistribution of content
+# on the file could cause irreparable harm to BAH and/or to third parties.
+#
+# You may not copy, reproduce, distribute, publish, display, execute, modify,
+# create derivative works of, transmit, sell or offer for resale, or in any way
+# exploit any part of this code or program without BAH's express written permission.
+#
+# The contents of this code or program contains code
+# that is itself or was created using artificial intelligence.
+#
+# To the best of our knowledge, this code does not infringe third-party intellectual
+# property rights, contain errors, inaccuracies, bias, or security concerns.
+#
+# However, Booz Allen does not warrant, claim, or provide any implied
+# or express warranty for the aforementioned, nor of merchantability
+# or fitness for purpose.
+#
+# Booz Allen expressly limits liability, whether by contract, tort or in equity
+# for any damage or harm caused by use of this artificial intelligence code or program.
+#
+# Booz Allen is providing this code or program "as is" with the understanding
+# that any separately negotiated standards of performance for said code
+# or program will be met for the duration of any applicable contract under which
+# the code or program is provided.
+
+"""Tests of the worker pool admission."""
+
+import asyncio
+import threading
+from collections.abc import Iterator
+
+import pytest
+from aissemble_lite_ffmpeg.worker_pool import PoolFullError, WorkerPool
+
+
+@pytest.fixture()
+def pool() -> Iterator[WorkerPool]:
+    """Thread pool with one worker and one queued task."""
+    pool = WorkerPool(kind="thread", max_workers=1, max_queued=1)
+    yield pool
+    pool.shutdown()
+
+
+def test_cancelled_caller_keeps_the_slot_until_the_work_is_over(pool):
+    release = threading.Event()
+    events = []
+
+    async def main():
+        task = asyncio.create_task(pool.run(release.wait))
+        await asyncio.sleep(0.05)
+        task.cancel()
+        await asyncio.sleep(0.05)
+        # the caller is still waiting for the running work, it holds its slot
+        events.append((task.done(), pool.stats()["in_flight"]))
+        release.set()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        events.append((task.done(), pool.stats()["in_flight"]))
+
+    asyncio.run(main())
+
+    assert events == [(False, 1), (True, 0)]
+
+
+def test_queued_work_of_a_cancelled_caller_is_dropped(pool):
+    release = threading.Event()
+    ran = []
+
+    async def main():
+        running = asyncio.create_task(pool.run(release.wait))
+        queued = asyncio.create_task(pool.run(ran.append, "queued"))
+        await asyncio.sleep(0.05)
+        with pytest.raises(PoolFullError):
+            await pool.run(ran.append, "rejected")
+
+        queued.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await queued
+        in_flight = pool.stats()["in_flight"]
+        release.set()
+        await running
+        return in_flight
+
+    assert asyncio.run(main()) == 1
+    assert ran == []
+    assert pool.stats()["in_flight"] == 0